@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ContactsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "contacts"
+
+    def ready(self):
+        # Keep the duplicate-detection blocking keys in step with contact edits.
+        from .signals import connect_dedupe_signals
+        connect_dedupe_signals()
@@ -0,0 +1,291 @@
+"""
+Duplicate contact detection and merging.
+
+Every contact gets a few normalised blocking keys (ContactBlockingKey), kept
+current by a post_save signal:
+
+* email - lower-cased, "+tag" removed, dots dropped for Gmail addresses
+* phone - the last 9 digits, so "+44 7700 900123" and "07700 900123" agree
+* name  - Soundex of the surname plus the first initial for individuals
+          ("Jon Smyth" and "John Smith" share S530:j), the normalised name
+          for organisations
+
+Candidate pairs are only generated inside a block (contacts sharing a key),
+and blocks larger than MAX_BLOCK_SIZE are skipped as too common to mean
+anything, so the work grows with the number of real look-alikes rather than
+with n². Each candidate pair is then scored on the contacts' own fields.
+
+merge_contacts() folds duplicates into a surviving contact: every row pointing
+at a duplicate (donations, notes, volunteer records and anything else with a
+foreign key to Contact) is moved with one bulk UPDATE per relation, all inside
+a single transaction.
+"""
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations, groupby
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, UniqueConstraint, Window
+from rest_framework.exceptions import ValidationError
+
+from .models import Contact, ContactBlockingKey, ContactNote, ContactType
+from .search import fold
+
+# Blocks with more members than this (a shared office number, a very common
+# surname) are not compared pair by pair.
+MAX_BLOCK_SIZE = 50
+DEFAULT_MIN_SCORE = 0.5
+
+# Field weights for score_pair. A name alone is never enough to flag a pair.
+EMAIL_WEIGHT = 0.45
+PHONE_WEIGHT = 0.35
+NAME_WEIGHT = 0.4
+ADDRESS_WEIGHT = 0.1
+MIN_NAME_SIMILARITY = 0.75
+
+# Fields copied from a duplicate when the survivor has them blank.
+MERGE_FILL_FIELDS = ['last_name', 'email', 'phone', 'address']
+
+NAME_NOISE = {
+    'mr', 'mrs', 'ms', 'miss', 'dr', 'prof', 'jr', 'sr', 'ii', 'iii',
+    'the', 'inc', 'ltd', 'llc', 'plc', 'co', 'corp', 'company', 'limited',
+}
+GMAIL_DOMAINS = {'gmail.com', 'googlemail.com'}
+SOUNDEX_CODES = {
+    letter: code
+    for letters, code in (('bfpv', '1'), ('cgjkqsxz', '2'), ('dt', '3'), ('l', '4'), ('mn', '5'), ('r', '6'))
+    for letter in letters
+}
+
+
+def soundex(word):
+    """American Soundex: 'Robert' and 'Rupert' -> 'R163'."""
+    word = re.sub(r'[^a-z]', '', fold(word))
+    if not word:
+        return ''
+    code, previous = word[0].upper(), SOUNDEX_CODES.get(word[0], '')
+    for letter in word[1:]:
+        digit = SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+        if letter not in 'hw': # Vowels separate repeated codes; h and w do not.
+            previous = digit
+    return (code + '000')[:4]
+
+
+def name_words(contact):
+    words = re.findall(r'[a-z0-9]+', fold(f"{contact.first_name} {contact.last_name}"))
+    return [word for word in words if word not in NAME_NOISE]
+
+
+def email_key(email):
+    local, _, domain = fold(email or '').strip().rpartition('@')
+    local = local.split('+', 1)[0]
+    if not local or not domain:
+        return None
+    if domain in GMAIL_DOMAINS:
+        local, domain = local.replace('.', ''), 'gmail.com'
+    return f"{local}@{domain}"[:255]
+
+
+def phone_key(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-9:] if len(digits) >= 7 else None
+
+
+def name_key(contact):
+    words = name_words(contact)
+    if not words:
+        return None
+    if contact.contact_type == ContactType.ORGANIZATION:
+        return ' '.join(words)[:255]
+    return f"{soundex(words[-1]) or words[-1]}:{words[0][0]}"
+
+
+def address_key(address):
+    return ' '.join(re.findall(r'[a-z0-9]+', fold(address or '')))
+
+
+def blocking_keys(contact):
+    """The (key_type, key) pairs for ``contact``; works on historical models in migrations too."""
+    keys = [
+        (ContactBlockingKey.EMAIL, email_key(contact.email)),
+        (ContactBlockingKey.PHONE, phone_key(contact.phone)),
+        (ContactBlockingKey.NAME, name_key(contact)),
+    ]
+    return {(key_type, key) for key_type, key in keys if key}
+
+
+def refresh_blocking_keys(contacts):
+    """Replace the stored blocking keys of ``contacts`` (two queries however many there are)."""
+    contacts = [contact for contact in contacts if contact.pk is not None]
+    with transaction.atomic():
+        ContactBlockingKey.objects.filter(contact__in=[contact.pk for contact in contacts]).delete()
+        ContactBlockingKey.objects.bulk_create([
+            ContactBlockingKey(contact_id=contact.pk, key_type=key_type, key=key)
+            for contact in contacts
+            for key_type, key in sorted(blocking_keys(contact))
+        ])
+
+
+def candidate_pairs(contact_ids=None, max_block_size=MAX_BLOCK_SIZE):
+    """
+    Return {(lower_id, higher_id): {key types shared}} for contacts that share a block.
+    With ``contact_ids``, only pairs involving one of those contacts are returned.
+    """
+    keys = ContactBlockingKey.objects.alias(
+        block_size=Window(Count('id'), partition_by=[F('key_type'), F('key')]),
+    ).filter(block_size__gte=2, block_size__lte=max_block_size)
+    if contact_ids is not None:
+        keys = keys.filter(Exists(ContactBlockingKey.objects.filter(
+            key_type=OuterRef('key_type'), key=OuterRef('key'), contact__in=contact_ids,
+        )))
+    rows = keys.order_by('key_type', 'key', 'contact_id').values_list('key_type', 'key', 'contact_id')
+
+    pairs = defaultdict(set)
+    for (key_type, _), block in groupby(rows.iterator(), key=lambda row: row[:2]):
+        for first, second in combinations([row[2] for row in block], 2):
+            if contact_ids is None or first in contact_ids or second in contact_ids:
+                pairs[first, second].add(key_type)
+    return pairs
+
+
+def score_pair(first, second):
+    """Return (score between 0 and 1, [reasons]) for how likely two contacts are the same."""
+    if first.contact_type != second.contact_type:
+        return 0.0, []
+    score, reasons = 0.0, []
+    if email_key(first.email) and email_key(first.email) == email_key(second.email):
+        score += EMAIL_WEIGHT
+        reasons.append('email')
+    if phone_key(first.phone) and phone_key(first.phone) == phone_key(second.phone):
+        score += PHONE_WEIGHT
+        reasons.append('phone')
+    first_name, second_name = ' '.join(name_words(first)), ' '.join(name_words(second))
+    if first_name and second_name:
+        similarity = 1.0 if first_name == second_name else SequenceMatcher(None, first_name, second_name).ratio()
+        if similarity >= MIN_NAME_SIMILARITY:
+            score += NAME_WEIGHT * similarity
+            reasons.append('name' if similarity == 1.0 else 'similar name')
+    if address_key(first.address) and address_key(first.address) == address_key(second.address):
+        score += ADDRESS_WEIGHT
+        reasons.append('address')
+    return min(round(score, 2), 1.0), reasons
+
+
+def find_duplicates(contact_ids=None, min_score=DEFAULT_MIN_SCORE):
+    """
+    Scored duplicate candidates, best first: a list of
+    {"contacts": (Contact, Contact), "score": float, "reasons": [...]}.
+    """
+    pairs = candidate_pairs(contact_ids)
+    contacts = Contact.objects.in_bulk({contact_id for pair in pairs for contact_id in pair})
+    duplicates = []
+    for first_id, second_id in pairs:
+        first, second = contacts[first_id], contacts[second_id]
+        score, reasons = score_pair(first, second)
+        if score >= min_score:
+            duplicates.append({"contacts": (first, second), "score": score, "reasons": reasons})
+    duplicates.sort(key=lambda duplicate: (-duplicate["score"], duplicate["contacts"][0].pk, duplicate["contacts"][1].pk))
+    return duplicates
+
+
+def _drop_unique_conflicts(model, field, survivor_pk, duplicate_pk):
+    """
+    Delete the duplicate's rows that would collide with one of the survivor's under a
+    unique constraint once re-pointed (e.g. both assigned to the same project).
+    """
+    unique_sets = [list(fields) for fields in model._meta.unique_together] + [
+        list(constraint.fields) for constraint in model._meta.constraints
+        if isinstance(constraint, UniqueConstraint) and constraint.fields and constraint.condition is None
+    ]
+    for fields in unique_sets:
+        if field.name not in fields:
+            continue
+        clash = model._base_manager.filter(
+            **{field.name: survivor_pk},
+            **{name: OuterRef(name) for name in fields if name != field.name},
+        )
+        model._base_manager.filter(**{field.name: duplicate_pk}).filter(Exists(clash)).delete()
+
+
+def _repoint_relations(model, survivor_pk, duplicate_pk, skip=()):
+    """
+    Move every row that references ``model`` row ``duplicate_pk`` onto ``survivor_pk``,
+    one UPDATE per relation, and return Counter({related model label: rows moved}).
+
+    A one-to-one dependant (Volunteer) is moved only if the survivor has none; otherwise
+    the duplicate's dependant is folded into the survivor's and then deleted. When the
+    one-to-one is also the dependant's primary key, rows referencing it follow along.
+    """
+    moved = Counter()
+    for relation in model._meta.related_objects:
+        related_model, field = relation.related_model, relation.field
+        if relation.many_to_many or related_model in skip:
+            continue
+        manager = related_model._base_manager
+        rows = manager.filter(**{field.name: duplicate_pk})
+        if relation.one_to_one:
+            duplicate_child = rows.first()
+            if duplicate_child is None:
+                continue
+            survivor_child = manager.filter(**{field.name: survivor_pk}).first()
+            if survivor_child is not None:
+                moved += _repoint_relations(related_model, survivor_child.pk, duplicate_child.pk)
+                rows.delete()
+                continue
+            rows.update(**{field.name: survivor_pk})
+            moved[related_model._meta.label_lower] += 1
+            if field.primary_key:
+                moved += _repoint_relations(related_model, survivor_pk, duplicate_pk)
+            continue
+        _drop_unique_conflicts(related_model, field, survivor_pk, duplicate_pk)
+        moved[related_model._meta.label_lower] += rows.update(**{field.name: survivor_pk})
+    return +moved
+
+
+def merge_contacts(survivor, duplicate_ids, user=None):
+    """
+    Merge the ``duplicate_ids`` contacts into ``survivor`` in one transaction and
+    return {related model label: rows moved}.
+
+    Related rows are re-pointed in bulk, blank survivor fields are filled from the
+    duplicates, the duplicates are deleted and a note recording the merge is added.
+    """
+    duplicate_ids = sorted(set(duplicate_ids) - {survivor.pk})
+    if not duplicate_ids:
+        raise ValidationError({"duplicates": ["Give at least one other contact to merge into this one."]})
+
+    with transaction.atomic():
+        # Lock in primary key order so two overlapping merges cannot deadlock.
+        locked = Contact.objects.select_for_update().filter(pk__in=[survivor.pk, *duplicate_ids]).order_by('pk')
+        contacts = {contact.pk: contact for contact in locked}
+        missing = [pk for pk in duplicate_ids if pk not in contacts]
+        if missing:
+            raise ValidationError({"duplicates": [f"Contact {pk} does not exist." for pk in missing]})
+        survivor = contacts[survivor.pk]
+        duplicates = [contacts[pk] for pk in duplicate_ids]
+
+        moved = Counter()
+        for duplicate in duplicates:
+            moved += _repoint_relations(Contact, survivor.pk, duplicate.pk, skip=(ContactBlockingKey,))
+
+        filled = []
+        for name in MERGE_FILL_FIELDS:
+            value = next((getattr(d, name) for d in duplicates if getattr(d, name)), None)
+            if not getattr(survivor, name) and value:
+                setattr(survivor, name, value)
+                filled.append(name)
+
+        # Delete first: a copied email would otherwise clash with the duplicate's unique email.
+        Contact.objects.filter(pk__in=duplicate_ids).delete()
+        survivor.save(update_fields=filled + ['updated_at'])
+        ContactNote.objects.create(
+            contact=survivor,
+            created_by=user,
+            note_text="Merged duplicate contacts: " + "; ".join(
+                f"#{d.pk} {d}" + (f" <{d.email}>" if d.email else "") for d in duplicates
+            ),
+        )
+    return dict(moved)
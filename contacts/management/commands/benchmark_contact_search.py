@@ -0,0 +1,112 @@
+import random
+import string
+import time
+from statistics import quantiles
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from contacts.models import Contact
+from contacts.search import SearchResults
+
+FIRST_NAMES = [
+    'james', 'mary', 'john', 'patricia', 'robert', 'jennifer', 'michael', 'linda', 'william', 'elizabeth',
+    'david', 'barbara', 'richard', 'susan', 'joseph', 'jessica', 'thomas', 'sarah', 'charles', 'karen',
+    'amina', 'chen', 'fatima', 'hiroshi', 'ingrid', 'jose', 'kwame', 'lucia', 'mohammed', 'nadia',
+    'olga', 'pedro', 'priya', 'rahul', 'sofia', 'tariq', 'wei', 'yara', 'zainab', 'andre',
+]
+SYLLABLES = ['an', 'ber', 'cal', 'dor', 'el', 'fen', 'gar', 'hal', 'is', 'jor', 'kin', 'lan', 'mor', 'nor',
+             'ol', 'par', 'quin', 'ros', 'san', 'tor', 'ul', 'van', 'wen', 'yor', 'zan', 'son', 'ton', 'ley']
+STREETS = ['High Street', 'Station Road', 'Church Lane', 'Mill Road', 'Harbour Road', 'Park Avenue', 'Market Square']
+DOMAINS = ['example.org', 'mail.test', 'post.example', 'charity.test']
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark contact search on a throwaway database of synthetic contacts. Reports latency "
+        "percentiles per query kind for what /api/contacts/search/ does per request (match, count, one "
+        "page of contacts). The real database is never touched. Use --contacts 1000000 for the 1M target."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contacts', type=int, default=100000, help="Synthetic contacts to index (default: 100000)")
+        parser.add_argument('--queries', type=int, default=100, help="Queries per kind (default: 100)")
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--target-ms', type=float, default=50.0, help="p95 budget in milliseconds (default: 50)")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("The benchmark builds an SQLite FTS5 test database; run it with the SQLite settings.")
+        rng = random.Random(options['seed'])
+        surnames = sorted({''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(20000)})
+
+        # Always in memory: with a file test database, autoclobber would delete the file under a running test suite.
+        connection.settings_dict['TEST'] = {**connection.settings_dict['TEST'], 'NAME': ':memory:'}
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            started = time.perf_counter()
+            people = self.seed_contacts(rng, surnames, options['contacts'])
+            self.stdout.write(f"Indexed {options['contacts']} contacts in {time.perf_counter() - started:.1f}s")
+            failed = self.run_queries(rng, people, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        if failed:
+            raise CommandError(f"p95 above {options['target_ms']}ms for: {', '.join(failed)}")
+
+    def seed_contacts(self, rng, surnames, count, batch_size=20000):
+        """Insert synthetic rows with raw SQL (the FTS triggers index them). Returns a sample to build queries from."""
+        sample = []
+        with transaction.atomic(), connection.cursor() as cursor:
+            for start in range(0, count, batch_size):
+                rows = []
+                for pk in range(start + 1, min(start + batch_size, count) + 1):
+                    first, last = rng.choice(FIRST_NAMES), rng.choice(surnames)
+                    phone = f"+1 ({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}"
+                    email = f"{first}.{last}{pk}@{rng.choice(DOMAINS)}"
+                    address = f"{rng.randint(1, 300)} {rng.choice(STREETS)}"
+                    rows.append((pk, first.title(), last.title(), email, phone, address, 'IND'))
+                    if len(sample) < 5000 and rng.random() < 0.05:
+                        sample.append((first, last, email, phone, address))
+                cursor.executemany(
+                    "INSERT INTO contacts_contact (id, first_name, last_name, email, phone, address, contact_type, "
+                    "created_at, updated_at) VALUES (%s, %s, %s, %s, %s, %s, %s, datetime('now'), datetime('now'))",
+                    rows,
+                )
+            cursor.execute("INSERT INTO contacts_contact_search(contacts_contact_search) VALUES ('optimize')")
+        return sample
+
+    def queries(self, rng, people, kind, count):
+        for _ in range(count):
+            first, last, email, phone, address = rng.choice(people)
+            if kind == 'surname':
+                yield last
+            elif kind == 'name prefixes':
+                yield f"{first[:3]} {last[:4]}"
+            elif kind == 'email':
+                yield email.split('@')[0]
+            elif kind == 'phone':
+                yield phone[-8:] # Local number, e.g. "123-4567"
+            elif kind == 'typo':
+                i = rng.randint(2, len(last) - 2)
+                yield last[:i] + last[i + 1] + last[i] + last[i + 2:] if rng.random() < 0.5 else last[:i] + rng.choice(string.ascii_lowercase) + last[i + 1:]
+            elif kind == 'address':
+                yield address.split(' ', 1)[1]
+
+    def run_queries(self, rng, people, options):
+        failed = []
+        self.stdout.write(f"{'kind':<15}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'avg hits':>10}")
+        for kind in ('surname', 'name prefixes', 'email', 'phone', 'typo', 'address'):
+            timings, hits = [], []
+            for query in self.queries(rng, people, kind, options['queries']):
+                started = time.perf_counter()
+                results = SearchResults(query, Contact.objects.all())
+                hits.append(results.count())
+                list(results[:options['page_size']])
+                timings.append((time.perf_counter() - started) * 1000)
+            cuts = quantiles(timings, n=100, method='inclusive')
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+            self.stdout.write(f"{kind:<15}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}{max(timings):>9.1f}{sum(hits) / len(hits):>10.0f}")
+            if p95 > options['target_ms']:
+                failed.append(kind)
+        return failed
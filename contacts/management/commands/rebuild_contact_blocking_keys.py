@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from contacts.dedupe import refresh_blocking_keys
+from contacts.models import Contact
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the duplicate-detection blocking keys of every contact. Contact saves keep them "
+        "current; run this after imports that write contacts with bulk_create, update() or raw SQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help="Contacts per delete/insert round trip (default: 2000)")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        contacts = Contact.objects.only('first_name', 'last_name', 'email', 'phone', 'contact_type').order_by('pk')
+        total, last_pk = 0, 0
+        while True:
+            batch = list(contacts.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            refresh_blocking_keys(batch)
+            total += len(batch)
+            last_pk = batch[-1].pk
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt blocking keys for {total} contact(s)."))
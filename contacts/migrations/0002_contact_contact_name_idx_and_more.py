@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['first_name', 'last_name'], name='contact_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactnote',
+            index=models.Index(fields=['contact', '-created_at'], name='contactnote_contact_idx'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+from django.db import migrations
+
+# A frozen copy of the SQLite FTS5 index as contacts.search defined it when this migration was
+# written. Later changes to the index belong in a migration of their own, so that databases
+# migrated through this one and freshly created ones end up with the same schema.
+
+# Phone numbers are indexed with separators stripped, plus every suffix from the 2nd to the 12th
+# digit so that searches for the end of a number match.
+PHONE_DIGITS = (
+    "replace(replace(replace(replace(replace(replace(replace({column}, ' ', ''), '-', ''), '(', ''), ')', ''), '+', ''), '.', ''), '/', '')"
+)
+NEW_PHONE = " || ' ' || ".join(
+    [PHONE_DIGITS.format(column='new.phone')]
+    + [f"substr({PHONE_DIGITS.format(column='new.phone')}, {start})" for start in range(2, 13)]
+)
+PHONE = " || ' ' || ".join(
+    [PHONE_DIGITS.format(column='phone')]
+    + [f"substr({PHONE_DIGITS.format(column='phone')}, {start})" for start in range(2, 13)]
+)
+
+INDEX_NEW_ROW = (
+    "INSERT INTO contacts_contact_search(rowid, first_name, last_name, email, phone, address) "
+    f"VALUES (new.id, new.first_name, new.last_name, coalesce(new.email, ''), {NEW_PHONE}, new.address); "
+    "INSERT INTO contacts_contact_names(rowid, first_name, last_name) VALUES (new.id, new.first_name, new.last_name);"
+)
+UNINDEX_OLD_ROW = (
+    "DELETE FROM contacts_contact_search WHERE rowid = old.id; "
+    "INSERT INTO contacts_contact_names(contacts_contact_names, rowid, first_name, last_name) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name);"
+)
+
+CREATE_SEARCH_INDEX = [
+    "CREATE VIRTUAL TABLE contacts_contact_search USING fts5("
+    "first_name, last_name, email, phone, address, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE VIRTUAL TABLE contacts_contact_names USING fts5("
+    "first_name, last_name, content='', detail='none', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE contacts_contact_names_vocab USING fts5vocab(contacts_contact_names, row)",
+    f"CREATE TRIGGER contacts_contact_search_ai AFTER INSERT ON contacts_contact BEGIN {INDEX_NEW_ROW} END",
+    f"CREATE TRIGGER contacts_contact_search_ad AFTER DELETE ON contacts_contact BEGIN {UNINDEX_OLD_ROW} END",
+    "CREATE TRIGGER contacts_contact_search_au AFTER UPDATE OF first_name, last_name, email, phone, address "
+    f"ON contacts_contact BEGIN {UNINDEX_OLD_ROW} {INDEX_NEW_ROW} END",
+    # Index the contacts that already exist.
+    "INSERT INTO contacts_contact_search(rowid, first_name, last_name, email, phone, address) "
+    f"SELECT id, first_name, last_name, coalesce(email, ''), {PHONE}, address FROM contacts_contact",
+    "INSERT INTO contacts_contact_names(rowid, first_name, last_name) SELECT id, first_name, last_name FROM contacts_contact",
+]
+
+DROP_SEARCH_INDEX = [
+    "DROP TRIGGER IF EXISTS contacts_contact_search_au",
+    "DROP TRIGGER IF EXISTS contacts_contact_search_ad",
+    "DROP TRIGGER IF EXISTS contacts_contact_search_ai",
+    "DROP TABLE IF EXISTS contacts_contact_names_vocab",
+    "DROP TABLE IF EXISTS contacts_contact_names",
+    "DROP TABLE IF EXISTS contacts_contact_search",
+]
+
+
+class SQLiteRunSQL(migrations.RunSQL):
+    """RunSQL that only runs on SQLite; other databases use their own search backend (see contacts.search)."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'sqlite':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contacts", "0002_contact_contact_name_idx_and_more"),
+    ]
+
+    operations = [
+        SQLiteRunSQL(CREATE_SEARCH_INDEX, DROP_SEARCH_INDEX),
+    ]
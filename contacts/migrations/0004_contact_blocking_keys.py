@@ -0,0 +1,108 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:10
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of the blocking key rules in contacts.dedupe as they were when this migration was
+# written, so that re-running it later builds the same keys. Contacts saved afterwards get their
+# keys from the live rules.
+NAME_NOISE = {
+    'mr', 'mrs', 'ms', 'miss', 'dr', 'prof', 'jr', 'sr', 'ii', 'iii',
+    'the', 'inc', 'ltd', 'llc', 'plc', 'co', 'corp', 'company', 'limited',
+}
+GMAIL_DOMAINS = {'gmail.com', 'googlemail.com'}
+SOUNDEX_CODES = {
+    letter: code
+    for letters, code in (('bfpv', '1'), ('cgjkqsxz', '2'), ('dt', '3'), ('l', '4'), ('mn', '5'), ('r', '6'))
+    for letter in letters
+}
+
+
+def fold(text):
+    return ''.join(char for char in unicodedata.normalize('NFKD', text.lower()) if not unicodedata.combining(char))
+
+
+def soundex(word):
+    word = re.sub(r'[^a-z]', '', fold(word))
+    if not word:
+        return ''
+    code, previous = word[0].upper(), SOUNDEX_CODES.get(word[0], '')
+    for letter in word[1:]:
+        digit = SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+        if letter not in 'hw':
+            previous = digit
+    return (code + '000')[:4]
+
+
+def email_key(email):
+    local, _, domain = fold(email or '').strip().rpartition('@')
+    local = local.split('+', 1)[0]
+    if not local or not domain:
+        return None
+    if domain in GMAIL_DOMAINS:
+        local, domain = local.replace('.', ''), 'gmail.com'
+    return f"{local}@{domain}"[:255]
+
+
+def phone_key(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-9:] if len(digits) >= 7 else None
+
+
+def name_key(contact):
+    words = re.findall(r'[a-z0-9]+', fold(f"{contact.first_name} {contact.last_name}"))
+    words = [word for word in words if word not in NAME_NOISE]
+    if not words:
+        return None
+    if contact.contact_type == 'ORG':
+        return ' '.join(words)[:255]
+    return f"{soundex(words[-1]) or words[-1]}:{words[0][0]}"
+
+
+def blocking_keys(contact):
+    keys = [('email', email_key(contact.email)), ('phone', phone_key(contact.phone)), ('name', name_key(contact))]
+    return {(key_type, key) for key_type, key in keys if key}
+
+
+def build_blocking_keys(apps, schema_editor):
+    Contact = apps.get_model('contacts', 'Contact')
+    ContactBlockingKey = apps.get_model('contacts', 'ContactBlockingKey')
+    batch = []
+    for contact in Contact.objects.only('first_name', 'last_name', 'email', 'phone', 'contact_type').iterator(chunk_size=2000):
+        batch.extend(
+            ContactBlockingKey(contact_id=contact.pk, key_type=key_type, key=key)
+            for key_type, key in blocking_keys(contact)
+        )
+        if len(batch) >= 2000:
+            ContactBlockingKey.objects.bulk_create(batch)
+            batch = []
+    ContactBlockingKey.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0003_contact_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContactBlockingKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key_type', models.CharField(choices=[('email', 'Email'), ('phone', 'Phone'), ('name', 'Name')], max_length=10)),
+                ('key', models.CharField(max_length=255)),
+                ('contact', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocking_keys', to='contacts.contact')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key_type', 'key', 'contact'], name='contact_block_key_idx')],
+                'constraints': [models.UniqueConstraint(fields=('contact', 'key_type', 'key'), name='contact_block_key_uniq')],
+            },
+        ),
+        migrations.RunPython(build_blocking_keys, migrations.RunPython.noop),
+    ]
@@ -21,6 +21,9 @@ class Contact(models.Model):
 
     class Meta:
         ordering = ['first_name', 'last_name']
+        indexes = [
+            models.Index(fields=['first_name', 'last_name'], name='contact_name_idx'),
+        ]
 
     def __str__(self):
         if self.contact_type == ContactType.ORGANIZATION:
@@ -36,6 +39,36 @@ class ContactNote(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['contact', '-created_at'], name='contactnote_contact_idx'),
+        ]
 
     def __str__(self):
         return f"Note for {self.contact} by {self.created_by or 'System'} on {self.created_at.strftime('%Y-%m-%d')}"
+
+
+class ContactBlockingKey(models.Model):
+    """
+    Normalised keys used to find likely duplicate contacts (see contacts.dedupe).
+    Contacts sharing a (key_type, key) form a block; only contacts within a block
+    are ever compared, so duplicate detection never looks at all pairs.
+    """
+    EMAIL = 'email'
+    PHONE = 'phone'
+    NAME = 'name'
+    KEY_TYPES = [(EMAIL, 'Email'), (PHONE, 'Phone'), (NAME, 'Name')]
+
+    contact = models.ForeignKey(Contact, related_name='blocking_keys', on_delete=models.CASCADE)
+    key_type = models.CharField(max_length=10, choices=KEY_TYPES)
+    key = models.CharField(max_length=255)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['key_type', 'key', 'contact'], name='contact_block_key_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['contact', 'key_type', 'key'], name='contact_block_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.key_type}:{self.key} -> {self.contact_id}"
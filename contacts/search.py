@@ -0,0 +1,347 @@
+"""
+Full-text contact search.
+
+A search backend turns free text into ranked contact ids. ContactViewSet.search
+wraps the backend in SearchResults, which the standard page-number paginator
+can count and slice like a queryset, so only one page of contacts is ever
+loaded from contacts_contact.
+
+The default backend (SQLiteFTS5Backend) searches an FTS5 table,
+contacts_contact_search, created by migration 0003. Triggers on
+contacts_contact keep it in step, so bulk_create, queryset.update() and raw SQL
+are indexed too, not just model saves. Point CONTACT_SEARCH_BACKEND at another
+class (e.g. PostgreSQLBackend) to switch.
+"""
+import os
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+SEARCH_TABLE = 'contacts_contact_search'
+NAMES_TABLE = 'contacts_contact_names' # Names only, for the typo-correction term list
+VOCAB_TABLE = 'contacts_contact_names_vocab'
+
+
+def _digits_sql(expression):
+    """SQL stripping the usual phone punctuation: '+1 (555) 123-4567' becomes '15551234567'."""
+    for char in (' ', '-', '(', ')', '+', '.', '/'):
+        expression = f"replace({expression}, '{char}', '')"
+    return expression
+
+
+def _phone_tokens_sql(expression):
+    """
+    The phone's digits plus their suffixes, so a prefix query finds a number from any
+    starting point: '555 123' and '123 45' both match '+1 (555) 123-4567'.
+    """
+    digits = _digits_sql(expression)
+    return " || ' ' || ".join([digits] + [f"substr({digits}, {start})" for start in range(2, 13)])
+
+
+def _index_row_sql(row):
+    return (
+        f"INSERT INTO {SEARCH_TABLE}(rowid, first_name, last_name, email, phone, address) "
+        f"VALUES ({row}.id, {row}.first_name, {row}.last_name, coalesce({row}.email, ''), "
+        f"{_phone_tokens_sql(f'{row}.phone')}, {row}.address); "
+        f"INSERT INTO {NAMES_TABLE}(rowid, first_name, last_name) VALUES ({row}.id, {row}.first_name, {row}.last_name);"
+    )
+
+
+def _unindex_row_sql(row):
+    # The names table is contentless, so deleting from it means replaying the indexed values.
+    return (
+        f"DELETE FROM {SEARCH_TABLE} WHERE rowid = {row}.id; "
+        f"INSERT INTO {NAMES_TABLE}({NAMES_TABLE}, rowid, first_name, last_name) "
+        f"VALUES ('delete', {row}.id, {row}.first_name, {row}.last_name);"
+    )
+
+
+# DDL for the SQLite backend, used by migration 0003 and the benchmark command.
+# prefix='2 3' builds prefix indexes so that 'jo*' / 'joh*' queries don't scan the term list.
+SQLITE_SCHEMA = [
+    f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+    f"first_name, last_name, email, phone, address, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    # A small contentless copy of just the names: its term list is where spelling corrections come
+    # from. Reading the main table's term list would also walk every (near-unique) email token.
+    f"CREATE VIRTUAL TABLE {NAMES_TABLE} USING fts5("
+    f"first_name, last_name, content='', detail='none', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE VIRTUAL TABLE {VOCAB_TABLE} USING fts5vocab({NAMES_TABLE}, row)",
+    f"CREATE TRIGGER contacts_contact_search_ai AFTER INSERT ON contacts_contact BEGIN {_index_row_sql('new')} END",
+    f"CREATE TRIGGER contacts_contact_search_ad AFTER DELETE ON contacts_contact BEGIN {_unindex_row_sql('old')} END",
+    f"CREATE TRIGGER contacts_contact_search_au AFTER UPDATE OF first_name, last_name, email, phone, address "
+    f"ON contacts_contact BEGIN {_unindex_row_sql('old')} {_index_row_sql('new')} END",
+    # Index the contacts that already exist.
+    f"INSERT INTO {SEARCH_TABLE}(rowid, first_name, last_name, email, phone, address) "
+    f"SELECT id, first_name, last_name, coalesce(email, ''), {_phone_tokens_sql('phone')}, address FROM contacts_contact",
+    f"INSERT INTO {NAMES_TABLE}(rowid, first_name, last_name) SELECT id, first_name, last_name FROM contacts_contact",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS contacts_contact_search_au",
+    "DROP TRIGGER IF EXISTS contacts_contact_search_ad",
+    "DROP TRIGGER IF EXISTS contacts_contact_search_ai",
+    f"DROP TABLE IF EXISTS {VOCAB_TABLE}",
+    f"DROP TABLE IF EXISTS {NAMES_TABLE}",
+    f"DROP TABLE IF EXISTS {SEARCH_TABLE}",
+]
+
+PHONE_QUERY = re.compile(r'[\d\s()+./-]+')
+
+
+def fold(text):
+    """Lower-case and strip accents, as the FTS5 tokenizer does ('José' -> 'jose')."""
+    return ''.join(char for char in unicodedata.normalize('NFKD', text.lower()) if not unicodedata.combining(char))
+
+
+def query_tokens(query):
+    """Folded word tokens; single characters are dropped unless nothing else is left."""
+    tokens = re.findall(r'\w+', fold(query))
+    return [token for token in tokens if len(token) > 1] or tokens
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions), computed
+    only within ``limit`` of the diagonal and returning limit + 1 as soon as it must exceed ``limit``.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # A shared prefix or suffix never changes the distance; candidates share at least two leading letters.
+    prefix = len(os.path.commonprefix([a, b]))
+    a, b = a[prefix:], b[prefix:]
+    while a and b and a[-1] == b[-1]:
+        a, b = a[:-1], b[:-1]
+    too_far = limit + 1
+    previous2, previous = None, [j if j <= limit else too_far for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [too_far] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        best = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            value = previous[j - 1] + (a[i - 1] != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1] and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            current[j] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return too_far
+        previous2, previous = previous, current
+    return min(previous[-1], too_far)
+
+
+class BaseSearchBackend:
+    """
+    Interface for contact search backends.
+
+    ``compile`` prepares a query once per request (the SQLite backend runs it there and
+    then); ``count`` and ``ranked_ids`` answer the paginator from the compiled query, and
+    ``truncated`` tells whether some matches were left out of it.
+    """
+
+    def compile(self, query):
+        raise NotImplementedError
+
+    def count(self, compiled):
+        raise NotImplementedError
+
+    def truncated(self, compiled):
+        return False
+
+    def ranked_ids(self, compiled, offset, limit):
+        raise NotImplementedError
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """
+    FTS5 search with prefix matching on every token ("jan smi" finds "Jane Smith"),
+    digit-only phone matching from any position ("555-12" and "1234567" both find
+    "+1 (555) 123-4567"), and results ranked by how well they match on name.
+
+    When no contact matches exactly, each word is widened to the indexed name
+    terms within one typo (two for words over five letters) that share its first two
+    letters, read from the fts5vocab term list rather than by scanning contacts.
+    Typos within the first two letters are therefore not corrected.
+
+    At most ``max_results`` contacts are returned; ``truncated`` is true when more
+    contacts matched than were ranked.
+    """
+    max_fuzzy_candidates = 5000
+    max_results = 500
+
+    def _execute(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _matching_ids(self, expression, tokens=()):
+        """
+        Ids matching ``expression``, best first, from one FTS5 query.
+
+        Up to max_results matches are read newest first along with their names, then ranked in
+        Python: for each query word, a name word equal to it scores 3 and one starting with it
+        scores 2; a hit in another field (email, phone, address) scores 1. Ties go to the newer
+        contact. bm25 is deliberately not used. It needs statistics over every match of every
+        prefix, which costs tens of milliseconds for common prefixes at a million contacts.
+        For a query matching more than max_results contacts, only the newest max_results are ranked.
+        """
+        rows = self._execute(
+            f"SELECT rowid, first_name, last_name FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+            f"ORDER BY rowid DESC LIMIT %s",
+            [expression, self.max_results],
+        )
+
+        def score(row):
+            names = re.findall(r"\w+", fold(f"{row[1]} {row[2]}"))
+            return sum(3 if token in names else 2 if any(name.startswith(token) for name in names) else 1 for token in tokens)
+
+        return [row[0] for row in sorted(rows, key=score, reverse=True)] # Stable, so ties stay newest first
+
+    def compile(self, query):
+        """(ranked ids, truncated): truncated when a pass hit max_results, so more contacts match."""
+        digits = re.sub(r'\D', '', query)
+        if PHONE_QUERY.fullmatch(query) and len(digits) >= 3:
+            ids = self._matching_ids(f'phone : "{digits}"*')
+            return ids, len(ids) >= self.max_results
+        tokens = query_tokens(query)
+        if not tokens:
+            return [], False
+        # Tokens are \w-only, so quoting them can't break out of the FTS5 query syntax.
+        # Whole words first: FTS5 streams a single term's doclist but has to merge every term
+        # under a prefix before it can return anything, which is slow for common words
+        # ("road"*). If the whole words alone fill max_results, the prefix query is skipped.
+        ids = self._matching_ids(' AND '.join(f'"{token}"' for token in tokens), tokens)
+        truncated = len(ids) >= self.max_results
+        if not truncated:
+            # The prefix pass only reads the newest max_results matches, which need not include
+            # every whole-word match found above: keep those first and add the prefix-only ones.
+            prefixed = self._matching_ids(' AND '.join(f'"{token}"*' for token in tokens), tokens)
+            exact = set(ids)
+            ids += [pk for pk in prefixed if pk not in exact]
+            truncated = len(prefixed) >= self.max_results or len(ids) > self.max_results
+            ids = ids[:self.max_results]
+        if not ids:
+            ids = self._matching_ids(' AND '.join(self._fuzzy_clause(token) for token in tokens), tokens)
+            truncated = len(ids) >= self.max_results
+        return ids, truncated
+
+    def _fuzzy_clause(self, token):
+        if len(token) < 3:
+            return f'"{token}"*'
+        limit = 1 if len(token) <= 5 else 2
+        block = token[:2]
+        upper = block[:-1] + chr(ord(block[-1]) + 1)
+        # Candidates for whole-word typos ("jonh" -> "john") are terms of about the same length;
+        # for typos in a prefix ("smiht" -> "smith"*, finding "smithson") each distinct
+        # prefix of a longer term is compared once, however many terms share it.
+        rows = self._execute(
+            f"SELECT DISTINCT CASE WHEN length(term) > %s THEN substr(term, 1, %s) || '*' ELSE term END "
+            f"FROM {VOCAB_TABLE} WHERE term >= %s AND term < %s AND length(term) >= %s LIMIT %s",
+            [len(token) + limit, len(token), block, upper, len(token) - limit, self.max_fuzzy_candidates],
+        )
+        words = {term for (term,) in rows if not term.endswith('*')}
+        prefixes = {term[:-1] for (term,) in rows if term.endswith('*')}
+        prefixes.update(word[:len(token)] for word in words if len(word) > len(token))
+        alternatives = {f'"{token}"*'}
+        alternatives.update(f'"{term}"' for term in words if edit_distance(token, term, limit) <= limit)
+        alternatives.update(f'"{prefix}"*' for prefix in prefixes if edit_distance(token, prefix, limit) <= limit)
+        return '(' + ' OR '.join(sorted(alternatives)) + ')'
+
+    def count(self, compiled):
+        return len(compiled[0])
+
+    def truncated(self, compiled):
+        return compiled[1]
+
+    def ranked_ids(self, compiled, offset, limit):
+        return compiled[0][offset:offset + limit]
+
+
+class PostgreSQLBackend(BaseSearchBackend):
+    """
+    tsvector prefix search ranked by ts_rank, widened with pg_trgm word similarity on
+    names for typos. Requires 'django.contrib.postgres' in INSTALLED_APPS and the pg_trgm
+    extension; add a GIN index on the same weighted vector before relying on it at scale.
+    """
+    similarity_threshold = 0.4
+
+    def compile(self, query):
+        tokens = query_tokens(query)
+        return (query, tokens) if tokens else None
+
+    def _queryset(self, compiled):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+        from django.db.models import Q
+        from django.db.models.functions import Greatest
+        from .models import Contact
+
+        query, tokens = compiled
+        vector = (
+            SearchVector('first_name', weight='A') + SearchVector('last_name', weight='A')
+            + SearchVector('email', weight='B') + SearchVector('phone', weight='B')
+            + SearchVector('address', weight='D')
+        )
+        tsquery = SearchQuery(' & '.join(f'{token}:*' for token in tokens), search_type='raw')
+        return (
+            Contact.objects.annotate(
+                rank=SearchRank(vector, tsquery),
+                similarity=Greatest(TrigramWordSimilarity(query, 'first_name'), TrigramWordSimilarity(query, 'last_name')),
+            )
+            .filter(Q(rank__gt=0) | Q(similarity__gte=self.similarity_threshold))
+            .order_by('-rank', '-similarity', 'pk')
+        )
+
+    def count(self, compiled):
+        return 0 if compiled is None else self._queryset(compiled).count()
+
+    def ranked_ids(self, compiled, offset, limit):
+        if compiled is None:
+            return []
+        return list(self._queryset(compiled).values_list('pk', flat=True)[offset:offset + limit])
+
+
+def get_search_backend():
+    return import_string(settings.CONTACT_SEARCH_BACKEND)()
+
+
+class SearchResults:
+    """
+    Lazy, paginator-friendly view of a search: ``count()`` and slicing work like a
+    queryset, and a slice loads just those contacts from ``queryset`` in rank order.
+    """
+
+    def __init__(self, query, queryset, backend=None):
+        self.backend = backend or get_search_backend()
+        self.queryset = queryset
+        self.compiled = self.backend.compile(query)
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.compiled)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    @property
+    def truncated(self):
+        """True when more contacts matched than the backend ranked (see SQLiteFTS5Backend.max_results)."""
+        return self.backend.truncated(self.compiled)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start = key.start or 0
+        stop = self.count() if key.stop is None else key.stop
+        ids = self.backend.ranked_ids(self.compiled, start, max(stop - start, 0))
+        contacts = self.queryset.in_bulk(ids)
+        return [contacts[pk] for pk in ids if pk in contacts]
@@ -1,13 +1,14 @@
 from rest_framework import serializers
 from .models import Contact, ContactNote
 from django.contrib.auth.models import User
+from ngo_crm.serializers import DynamicFieldsMixin
 
 class UserSimpleSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'first_name', 'last_name']
 
-class ContactNoteSerializer(serializers.ModelSerializer):
+class ContactNoteSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     created_by = UserSimpleSerializer(read_only=True)
     created_by_id = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.all(), source='created_by', write_only=True, required=False, allow_null=True
@@ -18,8 +19,20 @@ class ContactNoteSerializer(serializers.ModelSerializer):
         fields = ['id', 'contact', 'note_text', 'created_by', 'created_by_id', 'created_at']
         read_only_fields = ['contact', 'created_at'] # Contact is set by view context typically
 
-class ContactSerializer(serializers.ModelSerializer):
-    notes = ContactNoteSerializer(many=True, read_only=True)
+class ContactSummarySerializer(serializers.ModelSerializer):
+    """
+    Lightweight, read-only contact representation for embedding in other resources
+    (e.g. Donation.donor_contact). Never touches related tables.
+    """
+    contact_type_display = serializers.CharField(source='get_contact_type_display', read_only=True)
+
+    class Meta:
+        model = Contact
+        fields = ['id', 'first_name', 'last_name', 'email', 'phone', 'contact_type', 'contact_type_display']
+        read_only_fields = fields
+
+class ContactSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    notes = ContactNoteSerializer(many=True, read_only=True) # Only included with ?expand=notes
     contact_type_display = serializers.CharField(source='get_contact_type_display', read_only=True)
 
     class Meta:
@@ -28,6 +41,7 @@ class ContactSerializer(serializers.ModelSerializer):
             'id', 'first_name', 'last_name', 'email', 'phone', 'address',
             'contact_type', 'contact_type_display', 'created_at', 'updated_at', 'notes'
         ]
+        expandable_fields = ['notes']
 
     def validate(self, data):
         contact_type = data.get('contact_type')
@@ -42,3 +56,15 @@ class ContactSerializer(serializers.ModelSerializer):
         # if contact_type == 'ORG' and last_name:
         #     raise serializers.ValidationError({"last_name": "Last name should be blank for organizations."})
         return data
+
+class ContactDuplicateSerializer(serializers.Serializer):
+    """A scored pair of likely duplicate contacts (see contacts.dedupe.find_duplicates)."""
+    contacts = ContactSummarySerializer(many=True, read_only=True)
+    score = serializers.FloatField(read_only=True)
+    reasons = serializers.ListField(child=serializers.CharField(), read_only=True)
+
+class ContactMergeSerializer(serializers.Serializer):
+    duplicates = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=50,
+        help_text="IDs of the contacts to fold into this one; they are deleted after the merge.",
+    )
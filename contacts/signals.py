@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save
+
+from .dedupe import refresh_blocking_keys
+from .models import Contact
+
+# Changes to these fields change a contact's duplicate-detection blocking keys.
+BLOCKING_KEY_FIELDS = {'first_name', 'last_name', 'email', 'phone', 'contact_type'}
+
+
+def refresh_contact_blocking_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not BLOCKING_KEY_FIELDS & set(update_fields)):
+        return
+    refresh_blocking_keys([instance])
+
+
+def connect_dedupe_signals():
+    # bulk_create and queryset.update() skip this; run rebuild_contact_blocking_keys after raw imports.
+    post_save.connect(refresh_contact_blocking_keys, sender=Contact, dispatch_uid='contacts.dedupe.blocking_keys')
@@ -1,9 +1,12 @@
+from datetime import date
+from unittest import mock
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth.models import User
 from .models import Contact, ContactNote, ContactType
-from rest_framework.authtoken.models import Token
+from .search import SQLiteFTS5Backend
+from users.models import Token
 
 class ContactModelTests(APITestCase):
     def test_create_individual_contact(self):
@@ -101,6 +104,49 @@ class ContactAPITests(APITestCase):
         self.assertEqual(self.contact1.first_name, 'Alicia')
         self.assertEqual(self.contact1.email, 'alicia.smithy@example.com')
 
+    def test_notes_only_included_when_expanded(self):
+        ContactNote.objects.create(contact=self.contact1, note_text="Prefers email.", created_by=self.user)
+        url = reverse('contact-detail', kwargs={'pk': self.contact1.pk})
+
+        response = self.client.get(url, format='json')
+        self.assertNotIn('notes', response.data)
+
+        response = self.client.get(url, {'expand': 'notes'}, format='json')
+        self.assertEqual(response.data['notes'][0]['note_text'], "Prefers email.")
+        self.assertEqual(response.data['notes'][0]['created_by']['id'], self.user.pk)
+
+    def test_expanded_contact_list_query_count_is_constant(self):
+        for i in range(5):
+            contact = Contact.objects.create(first_name=f'Noted{i}', email=f'noted{i}@example.com')
+            ContactNote.objects.create(contact=contact, note_text="Note", created_by=self.user)
+        url = reverse('contact-list')
+        # Token lookup + page count + contacts + notes (with authors)
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'expand': 'notes'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_sparse_fieldset(self):
+        url = reverse('contact-detail', kwargs={'pk': self.contact1.pk})
+        response = self.client.get(url, {'fields': 'id,email'}, format='json')
+        self.assertEqual(set(response.data), {'id', 'email'})
+
+    def test_contact_list_is_paginated(self):
+        for i in range(3):
+            Contact.objects.create(first_name=f'Paged{i}', email=f'paged{i}@example.com')
+        url = reverse('contact-list')
+        response = self.client.get(url, {'page_size': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_export_contacts_csv(self):
+        response = self.client.get(reverse('contact-export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(lines[0], 'id,first_name,last_name,email,phone,address,contact_type,created_at,updated_at')
+        self.assertTrue(lines[1].startswith(f'{self.contact1.pk},Alice,Smith,alice.smith@example.com'))
+
     def test_delete_contact(self):
         contact_to_delete = Contact.objects.create(first_name='Delete', last_name='Me', email='delete@example.com')
         url = reverse('contact-detail', kwargs={'pk': contact_to_delete.pk})
@@ -163,3 +209,182 @@ class ContactNoteAPITests(APITestCase):
         self.assertTrue(ContactNote.objects.filter(contact=self.contact, note_text='A direct note created via notes endpoint.').exists())
         self.assertEqual(response.data['contact'], self.contact.pk) # Check if contact FK is correctly set
         self.assertEqual(response.data['created_by']['id'], self.user.id)
+
+
+class ContactSearchAPITests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='frontdesk', password='testpassword123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('contact-search')
+
+        self.jane = Contact.objects.create(first_name="Jane", last_name="Smith", email="jane.smith@example.org", phone="+1 (555) 123-4567")
+        self.john = Contact.objects.create(first_name="John", last_name="Smithson", email="jsmithson@mail.test", address="12 Harbour Road")
+        self.jose = Contact.objects.create(first_name="José", last_name="Álvarez", email="jose@example.org")
+        Contact.objects.create(first_name="Food Bank", contact_type=ContactType.ORGANIZATION, email="info@foodbank.test")
+
+    def search(self, q, **params):
+        response = self.client.get(self.url, {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [contact['id'] for contact in response.data['results']]
+
+    def test_prefix_match_on_every_token(self):
+        self.assertEqual(self.search("jan smi"), [self.jane.pk])
+        self.assertEqual(set(self.search("smith")), {self.jane.pk, self.john.pk})
+
+    def test_ranks_name_matches_above_other_fields(self):
+        # "harbour" appears only in John's address; "smith" is in both names, ranked above an address hit.
+        Contact.objects.create(first_name="Harbour", last_name="Master", email="hm@port.test")
+        self.assertEqual(self.search("harbour")[0], Contact.objects.get(first_name="Harbour").pk)
+
+    def test_email_phone_and_address(self):
+        self.assertEqual(self.search("jsmithson@mail"), [self.john.pk])
+        self.assertEqual(self.search("555-123"), [self.jane.pk])
+        self.assertEqual(self.search("15551234567"), [self.jane.pk])
+        self.assertEqual(self.search("123 4567"), [self.jane.pk])
+        self.assertEqual(self.search("harbour road"), [self.john.pk])
+
+    def test_diacritics_and_typos(self):
+        self.assertEqual(self.search("jose alvarez"), [self.jose.pk])
+        self.assertEqual(self.search("jaen"), [self.jane.pk]) # Transposition
+        self.assertEqual(set(self.search("smiht")), {self.jane.pk, self.john.pk}) # Also a typo in "smithson"'s prefix
+        self.assertEqual(self.search("alvarex"), [self.jose.pk])
+        self.assertEqual(self.search("qqqq"), [])
+
+    def test_index_follows_updates_deletes_and_bulk_writes(self):
+        Contact.objects.filter(pk=self.jose.pk).update(last_name="Doe") # Bypasses signals; the triggers still fire
+        self.assertEqual(self.search("doe"), [self.jose.pk])
+        self.assertEqual(self.search("alvarez"), [])
+        Contact.objects.bulk_create([Contact(first_name="Bulk", last_name="Imported")])
+        self.assertEqual(len(self.search("imported")), 1)
+        self.john.delete()
+        self.assertEqual(self.search("smithson"), [])
+
+    def test_results_are_paginated(self):
+        Contact.objects.bulk_create([Contact(first_name=f"Sam{i:02d}", last_name="Walker") for i in range(30)])
+        response = self.client.get(self.url, {'q': 'walker', 'page_size': 10, 'page': 2})
+        self.assertEqual(response.data['count'], 30)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNotNone(response.data['next'])
+        # Whole-word and prefix FTS5 queries for the ranked ids, one page of contacts (the token is cached by now).
+        with self.assertNumQueries(3):
+            self.client.get(self.url, {'q': 'walker', 'page_size': 10})
+
+    def test_broad_queries_are_capped_and_flagged(self):
+        # An older whole-word match survives newer prefix-only matches beyond the cap.
+        Contact.objects.bulk_create([Contact(first_name=f"Kim{i}", last_name="Smithers") for i in range(6)])
+        with mock.patch.object(SQLiteFTS5Backend, 'max_results', 5):
+            response = self.client.get(self.url, {'q': 'smith'})
+            ids = [contact['id'] for contact in response.data['results']]
+            self.assertEqual(ids[0], self.jane.pk)
+            self.assertNotIn(self.john.pk, ids) # "Smithson" is older than every "Smithers"
+            self.assertEqual((response.data['count'], len(ids)), (5, 5))
+            self.assertIs(response.data['truncated'], True)
+
+            response = self.client.get(self.url, {'q': 'smithers', 'page_size': 2})
+            self.assertEqual(response.data['count'], 5)
+            self.assertIs(response.data['truncated'], True)
+            # Under the cap nothing is left out.
+            self.assertIs(self.client.get(self.url, {'q': 'jane'}).data['truncated'], False)
+
+    def test_query_must_have_two_characters(self):
+        response = self.client.get(self.url, {'q': 'j'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('q', response.data)
+
+
+class DuplicateContactTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='datasteward', password='testpassword123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+        self.jane = Contact.objects.create(first_name="Jane", last_name="Smith", email="jane.smith@gmail.com", phone="+44 7700 900123")
+        # Same person from another import: dotless Gmail, national phone format, misspelt surname.
+        self.jane_import = Contact.objects.create(first_name="Jane", last_name="Smyth", email="JaneSmith+news@gmail.com", phone="07700 900123", address="4 Mill Road")
+        # Same name, nothing else in common: not enough to be flagged.
+        self.other_jane = Contact.objects.create(first_name="Jane", last_name="Smith", email="jane@example.org")
+
+    def test_blocking_keys_are_normalised_and_follow_edits(self):
+        keys = set(self.jane_import.blocking_keys.values_list('key_type', 'key'))
+        self.assertEqual(keys, {('email', 'janesmith@gmail.com'), ('phone', '700900123'), ('name', 'S530:j')})
+        self.jane_import.phone = ''
+        self.jane_import.save()
+        self.assertFalse(self.jane_import.blocking_keys.filter(key_type='phone').exists())
+
+    def test_duplicates_endpoint_scores_pairs_within_blocks(self):
+        response = self.client.get(reverse('contact-duplicates'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        pair = response.data['results'][0]
+        self.assertEqual([c['id'] for c in pair['contacts']], [self.jane.pk, self.jane_import.pk])
+        self.assertEqual(pair['reasons'], ['email', 'phone', 'similar name'])
+        self.assertGreater(pair['score'], 0.9)
+
+        response = self.client.get(reverse('contact-duplicates'), {'min_score': 0.4, 'contact': self.other_jane.pk})
+        self.assertEqual([[c['id'] for c in p['contacts']] for p in response.data['results']], [[self.jane.pk, self.other_jane.pk]])
+        self.assertEqual(response.data['results'][0]['reasons'], ['name'])
+
+        response = self.client.get(reverse('contact-duplicates'), {'min_score': 2})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('min_score', response.data)
+
+    def test_oversized_blocks_are_not_compared(self):
+        from .dedupe import candidate_pairs
+        self.assertIn((self.jane.pk, self.other_jane.pk), candidate_pairs())
+        # The three share a name block; a cap of 2 drops it, leaving only the email/phone blocks.
+        self.assertEqual(dict(candidate_pairs(max_block_size=2)), {(self.jane.pk, self.jane_import.pk): {'email', 'phone'}})
+
+    def test_merge_repoints_related_rows_in_one_transaction(self):
+        from donations.models import Donation
+        from projects.models import Project, ProjectVolunteerAssignment, VolunteerHoursLog
+        from volunteers.models import Volunteer
+        donation = Donation.objects.create(donor_contact=self.jane_import, donation_date=date(2026, 1, 5), amount='25.00')
+        ContactNote.objects.create(contact=self.jane_import, note_text="Prefers email")
+        volunteer = Volunteer.objects.create(contact=self.jane_import, skills="Driving")
+        project = Project.objects.create(name="Food drive")
+        ProjectVolunteerAssignment.objects.create(project=project, volunteer=volunteer)
+        VolunteerHoursLog.objects.create(volunteer=volunteer, project=project, date=date(2026, 1, 6), hours_worked='3.00')
+
+        url = reverse('contact-merge', kwargs={'pk': self.jane.pk})
+        response = self.client.post(url, {'duplicates': [self.jane_import.pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data['moved'], {
+            'donations.donation': 1, 'contacts.contactnote': 1, 'volunteers.volunteer': 1,
+            'projects.projectvolunteerassignment': 1, 'projects.volunteerhourslog': 1,
+        })
+        self.assertEqual(response.data['contact']['address'], "4 Mill Road") # Blank field filled in
+
+        self.assertFalse(Contact.objects.filter(pk=self.jane_import.pk).exists())
+        donation.refresh_from_db()
+        self.assertEqual(donation.donor_contact_id, self.jane.pk)
+        self.assertEqual(Volunteer.objects.get().pk, self.jane.pk)
+        self.assertEqual(VolunteerHoursLog.objects.get().volunteer_id, self.jane.pk)
+        self.assertEqual(ProjectVolunteerAssignment.objects.get().volunteer_id, self.jane.pk)
+        self.assertEqual(self.jane.notes.count(), 2) # The moved note plus the merge record
+        self.assertTrue(self.jane.notes.filter(note_text__startswith="Merged duplicate contacts: #%d" % self.jane_import.pk).exists())
+
+    def test_merge_folds_volunteer_records_when_both_have_one(self):
+        from projects.models import Project, ProjectVolunteerAssignment, VolunteerHoursLog
+        from volunteers.models import Volunteer
+        project = Project.objects.create(name="Food drive")
+        for contact in (self.jane, self.jane_import):
+            volunteer = Volunteer.objects.create(contact=contact)
+            ProjectVolunteerAssignment.objects.create(project=project, volunteer=volunteer)
+            VolunteerHoursLog.objects.create(volunteer=volunteer, date=date(2026, 1, 6), hours_worked='2.00')
+
+        response = self.client.post(reverse('contact-merge', kwargs={'pk': self.jane.pk}), {'duplicates': [self.jane_import.pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(list(Volunteer.objects.values_list('pk', flat=True)), [self.jane.pk])
+        self.assertEqual(ProjectVolunteerAssignment.objects.count(), 1) # The clashing assignment was dropped
+        self.assertEqual(VolunteerHoursLog.objects.filter(volunteer=self.jane.pk).count(), 2)
+
+    def test_merge_validation(self):
+        url = reverse('contact-merge', kwargs={'pk': self.jane.pk})
+        for payload in ({'duplicates': []}, {'duplicates': [self.jane.pk]}, {'duplicates': [999999]}):
+            response = self.client.post(url, payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, payload)
+            self.assertIn('duplicates', response.data)
+        self.assertEqual(Contact.objects.count(), 3)
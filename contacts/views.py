@@ -1,13 +1,28 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from django.db.models import Prefetch
+from ngo_crm.views import ExpandablePrefetchMixin, ThrottleScopeMixin
+from ngo_crm.exports import EXPORT_RENDERER_CLASSES, streaming_export_response
 from .models import Contact, ContactNote
-from .serializers import ContactSerializer, ContactNoteSerializer
+from .serializers import ContactSerializer, ContactNoteSerializer, ContactDuplicateSerializer, ContactMergeSerializer
+from .search import SearchResults
+from .dedupe import DEFAULT_MIN_SCORE, find_duplicates, merge_contacts
 
-class ContactViewSet(viewsets.ModelViewSet):
-    queryset = Contact.objects.prefetch_related('notes').all()
+class ContactViewSet(ExpandablePrefetchMixin, ThrottleScopeMixin, viewsets.ModelViewSet):
+    queryset = Contact.objects.all()
     serializer_class = ContactSerializer
     permission_classes = [permissions.IsAuthenticated] # Adjust as needed
+    filterset_fields = {
+        'contact_type': ['exact'],
+        'created_at': ['gte', 'lte'],
+    }
+    # Notes (and their authors) are only loaded when requested with ?expand=notes.
+    expand_prefetches = {
+        'notes': Prefetch('notes', queryset=ContactNote.objects.select_related('created_by')),
+    }
 
     # Example: custom action to add a note to a specific contact
     @action(detail=True, methods=['post'], serializer_class=ContactNoteSerializer)
@@ -23,7 +38,7 @@ class ContactViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'], serializer_class=ContactNoteSerializer)
     def notes(self, request, pk=None):
         contact = self.get_object()
-        notes = contact.notes.all() # Or ContactNote.objects.filter(contact=contact)
+        notes = contact.notes.select_related('created_by') # Or ContactNote.objects.filter(contact=contact)
         page = self.paginate_queryset(notes)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -32,11 +47,90 @@ class ContactViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(notes, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked full-text search over name, email, phone and address: `?q=` (at least 2 characters).
+        Every word is a prefix ("jan smi"), phone numbers match on digits alone, and when
+        nothing matches exactly, words within a typo or two are tried instead.
+        """
+        query = request.query_params.get('q', '').strip()
+        if len(query) < 2:
+            raise ValidationError({"q": "Enter at least 2 characters to search."})
+        results = SearchResults(query, self.get_queryset())
+        page = self.paginate_queryset(results)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        response.data['truncated'] = results.truncated # `count` then covers only the ranked matches
+        return response
+
+    @action(detail=False, methods=['get'], serializer_class=ContactDuplicateSerializer)
+    def duplicates(self, request):
+        """
+        Likely duplicate pairs, best first. `?min_score=` (0-1, default 0.5) sets the cut-off and
+        `?contact=<id>` limits the list to one contact's look-alikes. Only contacts sharing a
+        normalised email, phone or name key are compared; see contacts.dedupe.
+        """
+        try:
+            min_score = serializers.FloatField(min_value=0, max_value=1).run_validation(
+                request.query_params.get('min_score', DEFAULT_MIN_SCORE)
+            )
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({"min_score": exc.detail})
+        contact_ids = None
+        if 'contact' in request.query_params:
+            try:
+                contact_ids = {serializers.IntegerField(min_value=1).run_validation(request.query_params['contact'])}
+            except serializers.ValidationError as exc:
+                raise serializers.ValidationError({"contact": exc.detail})
+        page = self.paginate_queryset(find_duplicates(contact_ids, min_score=min_score))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['post'], serializer_class=ContactMergeSerializer)
+    def merge(self, request, pk=None):
+        """
+        Merge the contacts listed in `duplicates` into this one. Their donations, notes,
+        volunteer records and other references are moved here in one transaction, blank
+        fields are filled from them, and they are deleted.
+        """
+        contact = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        moved = merge_contacts(contact, serializer.validated_data['duplicates'], user=request.user)
+        contact.refresh_from_db()
+        return Response({"contact": ContactSerializer(contact).data, "moved": moved})
+
+    export_columns = [
+        ('id', 'id'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('email', 'email'),
+        ('phone', 'phone'),
+        ('address', 'address'),
+        ('contact_type', 'contact_type'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ]
+
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERER_CLASSES, throttle_scope='exports')
+    def export(self, request):
+        """
+        Stream every contact as CSV (default) or NDJSON (?format=ndjson).
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return streaming_export_response(request, queryset, self.export_columns, 'contacts')
+
 
 class ContactNoteViewSet(viewsets.ModelViewSet):
     queryset = ContactNote.objects.select_related('contact', 'created_by').all()
     serializer_class = ContactNoteSerializer
     permission_classes = [permissions.IsAuthenticated] # Adjust as needed
+    filterset_fields = {
+        'contact': ['exact', 'in'],
+        'created_by': ['exact'],
+        'created_at': ['gte', 'lte'],
+    }
 
     def perform_create(self, serializer):
         # If contact_id is provided in the request data, use it.
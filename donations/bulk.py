@@ -0,0 +1,151 @@
+"""
+Bulk donation import.
+
+Rows (from CSV or JSON) are validated with DonationImportRowSerializer, which
+applies the same rules as DonationSerializer.validate. Donor contacts and
+campaigns are resolved with one `in_bulk` query per batch, and donations (plus
+any in-kind details) are inserted with bulk_create in batches inside a single
+transaction. Campaign progress totals get one UPDATE per campaign for the
+whole import.
+"""
+import csv
+import io
+import json
+
+from django.db import transaction
+
+from contacts.models import Contact
+from fundraising.models import Campaign
+from fundraising.progress import apply_progress_changes, donation_contribution
+from .models import Donation, DonationType, InKindDonationDetail
+from .serializers import DonationImportRowSerializer
+from .signals import donations_bulk_created
+
+DEFAULT_BATCH_SIZE = 500
+
+# CSV columns with this prefix fill the nested in_kind_details object,
+# e.g. in_kind_item_name -> in_kind_details.item_name
+IN_KIND_PREFIX = 'in_kind_'
+
+
+class DonationImportError(Exception):
+    """Raised when the uploaded file cannot be parsed at all."""
+
+
+def parse_csv_rows(text):
+    rows = []
+    for raw in csv.DictReader(io.StringIO(text)):
+        row = {}
+        in_kind = {}
+        for key, value in raw.items():
+            if key is None or value is None or value.strip() == '':
+                continue # Empty cells are treated as "not provided"
+            key = key.strip()
+            if key.startswith(IN_KIND_PREFIX):
+                in_kind[key[len(IN_KIND_PREFIX):]] = value.strip()
+            else:
+                row[key] = value.strip()
+        if in_kind:
+            row['in_kind_details'] = in_kind
+        rows.append(row)
+    return rows
+
+
+def parse_json_rows(text):
+    try:
+        data = json.loads(text)
+    except ValueError as exc:
+        raise DonationImportError(f"Invalid JSON: {exc}")
+    return json_rows(data)
+
+
+def json_rows(data):
+    """The rows of parsed JSON, either a list of donation objects or {"rows": [...]}."""
+    if isinstance(data, dict):
+        data = data.get('rows')
+    if not isinstance(data, list):
+        raise DonationImportError("JSON imports must be a list of donation objects (or {\"rows\": [...]}).")
+    return data
+
+
+def parse_rows(text, file_format):
+    if file_format == 'csv':
+        return parse_csv_rows(text)
+    if file_format == 'json':
+        return parse_json_rows(text)
+    raise DonationImportError(f"Unsupported import format '{file_format}'. Use 'csv' or 'json'.")
+
+
+def _build_batch(batch, first_row_number, received_by, errors):
+    """
+    Validate one batch of rows and return the unsaved (Donation, in_kind_details) pairs
+    for the valid ones. Errors are appended to ``errors`` keyed by 1-based row number.
+    """
+    validated = []
+    for offset, row in enumerate(batch):
+        row_number = first_row_number + offset
+        if not isinstance(row, dict):
+            errors.append({'row': row_number, 'errors': {'non_field_errors': ["Row must be an object."]}})
+            continue
+        serializer = DonationImportRowSerializer(data=row)
+        if serializer.is_valid():
+            validated.append((row_number, serializer.validated_data))
+        else:
+            errors.append({'row': row_number, 'errors': serializer.errors})
+
+    contacts = Contact.objects.in_bulk({data['donor_contact_id'] for _, data in validated})
+    campaign_ids = {data['campaign_id'] for _, data in validated if data.get('campaign_id')}
+    campaigns = Campaign.objects.in_bulk(campaign_ids) if campaign_ids else {}
+
+    pending = []
+    for row_number, data in validated:
+        data = dict(data)
+        row_errors = {}
+        donor = contacts.get(data.pop('donor_contact_id'))
+        if donor is None:
+            row_errors['donor_contact_id'] = ["Contact not found."]
+        campaign_id = data.pop('campaign_id', None)
+        campaign = campaigns.get(campaign_id) if campaign_id else None
+        if campaign_id and campaign is None:
+            row_errors['campaign_id'] = ["Campaign not found."]
+        if row_errors:
+            errors.append({'row': row_number, 'errors': row_errors})
+            continue
+        in_kind_details = data.pop('in_kind_details', None)
+        donation = Donation(donor_contact=donor, campaign=campaign, received_by=received_by, **data)
+        pending.append((donation, in_kind_details))
+    return pending
+
+
+def import_donations(rows, received_by=None, batch_size=DEFAULT_BATCH_SIZE, allow_partial=False):
+    """
+    Validate and insert ``rows`` (a list of dicts shaped like a POST /api/donations/ body).
+
+    Returns ``{"created": n, "errors": [{"row": i, "errors": {...}}, ...]}``. Unless
+    ``allow_partial`` is set, nothing is inserted when any row is invalid.
+    """
+    errors = []
+    pending = []
+    for start in range(0, len(rows), batch_size):
+        pending.extend(_build_batch(rows[start:start + batch_size], start + 1, received_by, errors))
+
+    errors.sort(key=lambda error: error['row'])
+    if errors and not allow_partial:
+        return {'created': 0, 'errors': errors}
+
+    created = []
+    with transaction.atomic():
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            donations = Donation.objects.bulk_create([donation for donation, _ in chunk])
+            InKindDonationDetail.objects.bulk_create([
+                InKindDonationDetail(donation=donation, **details)
+                for donation, (_, details) in zip(donations, chunk)
+                if details and donation.donation_type == DonationType.IN_KIND
+            ])
+            created.extend(donations)
+        if created:
+            apply_progress_changes(added=[donation_contribution(donation) for donation in created])
+            donations_bulk_created.send(sender=Donation, instances=created)
+
+    return {'created': len(created), 'errors': errors}
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from donations.bulk import DEFAULT_BATCH_SIZE, DonationImportError, import_donations, parse_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import donations from a CSV or JSON file (e.g. a payment-processor export). "
+        "CSV columns match the donation API fields; in-kind details use an 'in_kind_' prefix "
+        "(in_kind_item_name, in_kind_quantity, ...)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to the CSV or JSON file")
+        parser.add_argument('--format', choices=['csv', 'json'], help="File format (default: from the file extension)")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--received-by', help="Username recorded as the staff member who received the donations")
+        parser.add_argument(
+            '--allow-partial', action='store_true',
+            help="Insert the valid rows even if some rows fail validation (default: all or nothing)",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+
+        received_by = None
+        if options['received_by']:
+            try:
+                received_by = User.objects.get(username=options['received_by'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['received_by']}' not found.")
+
+        try:
+            rows = parse_rows(path.read_text(encoding='utf-8-sig'), file_format)
+        except DonationImportError as exc:
+            raise CommandError(str(exc))
+
+        result = import_donations(
+            rows, received_by=received_by, batch_size=options['batch_size'], allow_partial=options['allow_partial']
+        )
+        for error in result['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        message = f"Imported {result['created']} of {len(rows)} donations."
+        if result['errors'] and not result['created']:
+            raise CommandError(f"{message} {len(result['errors'])} row(s) failed validation; nothing was imported.")
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0002_contact_contact_name_idx_and_more'),
+        ('donations', '0001_initial'),
+        ('fundraising', '0002_campaign_campaign_start_name_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['-donation_date', '-created_at'], name='donation_date_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['donation_type', 'donation_date'], name='donation_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['campaign', 'donation_type'], name='donation_campaign_type_idx'),
+        ),
+    ]
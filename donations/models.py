@@ -42,6 +42,11 @@ class Donation(models.Model):
 
     class Meta:
         ordering = ['-donation_date', '-created_at']
+        indexes = [
+            models.Index(fields=['-donation_date', '-created_at'], name='donation_date_created_idx'), # Default list order
+            models.Index(fields=['donation_type', 'donation_date'], name='donation_type_date_idx'), # Dashboard/report date ranges
+            models.Index(fields=['campaign', 'donation_type'], name='donation_campaign_type_idx'), # Campaign progress
+        ]
 
     def __str__(self):
         return f"Donation from {self.donor_contact} on {self.donation_date} ({self.get_donation_type_display()})"
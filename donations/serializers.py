@@ -1,10 +1,13 @@
 from rest_framework import serializers
 from .models import Donation, InKindDonationDetail
 from contacts.models import Contact # Import the Contact model
-from contacts.serializers import ContactSerializer, UserSimpleSerializer # Assuming UserSimpleSerializer is in contacts.serializers
+from contacts.serializers import ContactSummarySerializer, UserSimpleSerializer # Assuming UserSimpleSerializer is in contacts.serializers
 # from fundraising.serializers import CampaignSerializer # Avoid direct import if it creates circularity
 from fundraising.models import Campaign as FundraisingCampaign # Import Campaign model directly
+from fundraising.progress import donation_contribution, record_donation_change
 from django.contrib.auth.models import User
+from django.db import transaction
+from ngo_crm.serializers import DynamicFieldsMixin
 
 
 class CampaignBasicSerializer(serializers.ModelSerializer): # Simpler version for nesting
@@ -24,8 +27,8 @@ class InKindDonationDetailSerializer(serializers.ModelSerializer):
             'item_name', 'description', 'estimated_value', 'quantity', 'condition', 'condition_display'
         ]
 
-class DonationSerializer(serializers.ModelSerializer):
-    donor_contact = ContactSerializer(read_only=True)
+class DonationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    donor_contact = ContactSummarySerializer(read_only=True) # Summary only: no per-row notes query
     donor_contact_id = serializers.PrimaryKeyRelatedField(
         queryset=Contact.objects.all(), source='donor_contact', write_only=True
     )
@@ -78,18 +81,23 @@ class DonationSerializer(serializers.ModelSerializer):
 
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         in_kind_details_data = validated_data.pop('in_kind_details', None)
         donation = Donation.objects.create(**validated_data)
 
         if donation.donation_type == 'INK' and in_kind_details_data:
             InKindDonationDetail.objects.create(donation=donation, **in_kind_details_data)
+        record_donation_change(current=donation_contribution(donation))
         return donation
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         in_kind_details_data = validated_data.pop('in_kind_details', None)
 
         original_donation_type = instance.donation_type
+        # What the donation counted towards before the edit (amount, type, campaign and date).
+        original_contribution = donation_contribution(instance)
 
         # Update Donation instance fields
         for attr, value in validated_data.items():
@@ -117,5 +125,27 @@ class DonationSerializer(serializers.ModelSerializer):
 
 
         instance.save() # Save changes to the Donation instance
+        # Moves the amount between campaigns too when the campaign changed.
+        record_donation_change(original_contribution, donation_contribution(instance))
 
         return instance
+
+
+class DonationImportRowSerializer(DonationSerializer):
+    """
+    One row of a bulk donation import (see donations/bulk.py). Uses the same field
+    rules and validate() as DonationSerializer, but donor and campaign are plain ids
+    that the importer resolves once per batch instead of one query per row.
+    """
+    donor_contact = None
+    campaign = None
+    received_by = None
+    received_by_id = None
+    donor_contact_id = serializers.IntegerField(min_value=1)
+    campaign_id = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+
+    class Meta(DonationSerializer.Meta):
+        fields = [
+            'donor_contact_id', 'campaign_id', 'donation_date', 'amount', 'donation_type',
+            'payment_method', 'notes', 'is_anonymous', 'in_kind_details'
+        ]
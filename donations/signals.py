@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent after donations are inserted with bulk_create (which skips post_save),
+# with ``instances`` set to the list of created Donation objects.
+donations_bulk_created = Signal()
@@ -2,11 +2,19 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth.models import User
-from rest_framework.authtoken.models import Token
-from contacts.models import Contact, ContactType
+from users.models import Token
+from contacts.models import Contact, ContactType, ContactNote
 from fundraising.models import Campaign
 from .models import Donation, DonationType, PaymentMethod, InKindDonationDetail, InKindDonationItemCondition
 import datetime
+import json
+import tempfile
+from io import StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reports.models import DashboardCounter
 from decimal import Decimal
 
 class DonationModelTests(APITestCase):
@@ -151,9 +159,258 @@ class DonationAPITests(APITestCase):
         results = response.data if not isinstance(response.data, dict) or 'results' not in response.data else response.data['results']
         self.assertEqual(len(results), 2)
 
+    def test_donation_list_embeds_contact_summary_without_n_plus_one(self):
+        for i in range(5):
+            contact = Contact.objects.create(email=f"summary{i}@example.com", first_name="Summary")
+            ContactNote.objects.create(contact=contact, note_text="Not embedded")
+            Donation.objects.create(
+                donor_contact=contact, campaign=self.campaign, donation_date=datetime.date.today(), amount=Decimal("5.00"),
+                donation_type=DonationType.MONETARY, payment_method=PaymentMethod.CASH
+            )
+        endpoints = [
+            (reverse('donation-list'), 2), # Token lookup + donations
+            (reverse('campaign-list-campaign-donations', kwargs={'pk': self.campaign.pk}), 2), # Campaign + donations; token now cached
+        ]
+        for url, expected_queries in endpoints:
+            with self.assertNumQueries(expected_queries):
+                response = self.client.get(url, format='json')
+            results = response.data if not isinstance(response.data, dict) or 'results' not in response.data else response.data['results']
+            self.assertEqual(len(results), 6)
+            self.assertNotIn('notes', results[0]['donor_contact'])
+
+    def test_donation_list_keyset_pagination(self):
+        # Several donations share a date so the created_at/pk tie-breakers are exercised.
+        for i in range(6):
+            Donation.objects.create(
+                donor_contact=self.donor_contact, donation_date=datetime.date.today() - datetime.timedelta(days=i % 3),
+                amount=Decimal("1.00") + i, donation_type=DonationType.MONETARY, payment_method=PaymentMethod.CASH
+            )
+        expected_ids = list(Donation.objects.values_list('id', flat=True))
+
+        seen = []
+        url = reverse('donation-list') + '?page_size=3'
+        pages = []
+        while url:
+            with self.assertNumQueries(1 if pages else 2): # (Token lookup on the first page) + one page; never a COUNT(*)
+                response = self.client.get(url, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            pages.append(response.data)
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, expected_ids)
+        self.assertEqual(len(pages), 3)
+
+        # Walking back from the last page returns the previous page unchanged.
+        response = self.client.get(pages[-1]['previous'], format='json')
+        self.assertEqual(response.data['results'], pages[-2]['results'])
+
+        response = self.client.get(reverse('donation-list'), {'cursor': 'not-a-cursor'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_donations_csv(self):
+        url = reverse('donation-export')
+        with self.assertNumQueries(2): # Token lookup + one joined values query
+            response = self.client.get(url)
+            self.assertTrue(response.streaming)
+            lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment; filename="donations-', response['Content-Disposition'])
+        self.assertTrue(lines[0].startswith('id,donation_date,donation_type,amount'))
+        self.assertEqual(len(lines), 2)
+        self.assertIn('75.00', lines[1])
+        self.assertIn('ApiDonor', lines[1])
+        self.assertIn('Food Drive Campaign', lines[1])
+
+    def test_export_donations_ndjson(self):
+        response = self.client.get(reverse('donation-export'), {'format': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual(rows[0]['id'], self.monetary_donation1.pk)
+        self.assertEqual(rows[0]['amount'], '75.00')
+        self.assertEqual(rows[0]['donor_email'], 'apidonor@example.com')
+
     def test_get_single_donation(self):
         url = reverse('donation-detail', kwargs={'pk': self.monetary_donation1.pk})
         response = self.client.get(url, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['amount'], "75.00")
         self.assertEqual(response.data['donor_contact']['id'], self.donor_contact.pk)
+
+
+class DonationFilteringTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='filter_user', password='testpassword123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('donation-list')
+
+        self.alice = Contact.objects.create(first_name="Alice", email="alice.filter@example.com")
+        self.bob = Contact.objects.create(first_name="Bob", email="bob.filter@example.com")
+        self.spring = Campaign.objects.create(name="Spring Appeal", goal_amount=Decimal("1000.00"), start_date=datetime.date(2026, 3, 1))
+        rows = [
+            (self.alice, self.spring, datetime.date(2026, 3, 2), Decimal("20.00")),
+            (self.alice, None, datetime.date(2026, 3, 15), Decimal("250.00")),
+            (self.bob, self.spring, datetime.date(2026, 4, 1), Decimal("75.00")),
+            (self.bob, None, datetime.date(2026, 5, 1), Decimal("5.00")),
+        ]
+        self.donations = [
+            Donation.objects.create(
+                donor_contact=contact, campaign=campaign, donation_date=day, amount=amount,
+                donation_type=DonationType.MONETARY, payment_method=PaymentMethod.CASH,
+            )
+            for contact, campaign, day, amount in rows
+        ]
+
+    def ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [row['id'] for row in response.data['results']]
+
+    def test_date_amount_fk_and_choice_filters(self):
+        d = self.donations
+        self.assertEqual(self.ids(donation_date__gte='2026-03-10', donation_date__lte='2026-04-30'), [d[2].pk, d[1].pk])
+        self.assertEqual(self.ids(amount__gte='50'), [d[2].pk, d[1].pk])
+        self.assertEqual(self.ids(campaign=self.spring.pk), [d[2].pk, d[0].pk])
+        self.assertEqual(self.ids(campaign__isnull='true', donor_contact=self.bob.pk), [d[3].pk])
+        self.assertEqual(self.ids(donor_contact__in=f'{self.alice.pk},{self.bob.pk}', donation_type='MON'), [x.pk for x in reversed(d)])
+
+    def test_invalid_filter_values_are_rejected(self):
+        response = self.client.get(self.url, {'donation_date__gte': 'yesterday', 'donation_type': 'XYZ', 'amount__lte': 'lots'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'donation_date__gte', 'donation_type', 'amount__lte'})
+
+    def test_ordering_is_limited_to_indexed_columns_and_keeps_keyset_paging(self):
+        response = self.client.get(self.url, {'ordering': 'amount'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('donation_date', response.data['ordering'][0])
+
+        # Nullable columns (campaign) cannot be sorted on under keyset pagination.
+        response = self.client.get(self.url, {'ordering': 'campaign'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        seen, url, params = [], self.url, {'ordering': 'donor_contact,donation_date', 'page_size': 3}
+        while url:
+            response = self.client.get(url, params)
+            seen += [row['id'] for row in response.data['results']]
+            url, params = response.data['next'], None
+        self.assertEqual(seen, [x.pk for x in self.donations])
+
+    def test_sparse_fieldset_trims_select_and_joins(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,amount,donation_type_display'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'amount', 'donation_type_display'})
+        sql = queries[-1]['sql']
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"notes"', sql)
+        self.assertIn('"donation_type"', sql)
+
+        # Nested fields keep just their join, with only the columns they render.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,donor_contact', 'donor_contact': self.bob.pk})
+        self.assertEqual(response.data['results'][0]['donor_contact']['first_name'], "Bob")
+        sql = queries[-1]['sql']
+        self.assertIn('"contacts_contact"', sql)
+        self.assertNotIn('"fundraising_campaign"', sql)
+        self.assertNotIn('"address"', sql)
+
+
+class DonationBulkImportTests(APITestCase):
+    def setUp(self):
+        self.api_user = User.objects.create_user(username='api_testuser_bulk', password='testpassword123')
+        self.token = Token.objects.create(user=self.api_user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('donation-bulk-import')
+        self.donors = [
+            Contact.objects.create(first_name="Bulk", last_name=str(i), email=f"bulk{i}@example.com") for i in range(3)
+        ]
+        self.campaign = Campaign.objects.create(name="Bulk Campaign", goal_amount=Decimal("1000.00"), start_date=datetime.date.today())
+
+    def _monetary_row(self, donor, amount="10.00"):
+        return {
+            "donor_contact_id": donor.pk, "campaign_id": self.campaign.pk, "donation_date": datetime.date.today().isoformat(),
+            "donation_type": DonationType.MONETARY, "amount": amount, "payment_method": PaymentMethod.ONLINE,
+        }
+
+    def test_bulk_import_json_rows(self):
+        rows = [self._monetary_row(donor) for donor in self.donors] * 4
+        rows.append({
+            "donor_contact_id": self.donors[0].pk, "donation_date": datetime.date.today().isoformat(),
+            "donation_type": DonationType.IN_KIND, "in_kind_details": {"item_name": "Tents", "quantity": 3},
+        })
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data, {'created': 13, 'errors': []})
+        self.assertEqual(Donation.objects.filter(received_by=self.api_user).count(), 13)
+        self.assertEqual(InKindDonationDetail.objects.get().item_name, "Tents")
+        # bulk_create skips post_save; the dashboard counters are still updated.
+        self.assertEqual(DashboardCounter.objects.get(metric='donations.total').value, 13)
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.campaign.raised_amount, self.campaign.donation_count), (Decimal("120.00"), 12))
+
+    def test_bulk_import_json_rows_object(self):
+        # The {"rows": [...]} shape accepted from uploaded JSON files works as a request body too.
+        response = self.client.post(self.url, {"rows": [self._monetary_row(donor) for donor in self.donors]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data['created'], len(self.donors))
+
+        response = self.client.post(self.url, {"donations": []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('rows', response.data['detail'])
+
+    def test_bulk_import_query_count_does_not_grow_with_rows(self):
+        def import_query_count(count):
+            rows = [self._monetary_row(self.donors[i % 3]) for i in range(count)]
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.post(self.url, rows, format='json')
+            self.assertEqual(response.data['created'], count)
+            return len(captured.captured_queries)
+        import_query_count(1) # Creates the dashboard counter rows the later imports only update
+        self.assertEqual(import_query_count(3), import_query_count(30))
+
+    def test_bulk_import_reports_errors_per_row_and_inserts_nothing(self):
+        rows = [
+            self._monetary_row(self.donors[0]),
+            {**self._monetary_row(self.donors[1]), "amount": None},
+            {**self._monetary_row(self.donors[2]), "donor_contact_id": 999999},
+            {**self._monetary_row(self.donors[2]), "in_kind_details": {"item_name": "Chairs"}},
+        ]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 4])
+        self.assertIn('amount', response.data['errors'][0]['errors'])
+        self.assertIn('donor_contact_id', response.data['errors'][1]['errors'])
+        self.assertIn('in_kind_details', response.data['errors'][2]['errors'])
+        self.assertFalse(Donation.objects.exists())
+
+        response = self.client.post(self.url + '?allow_partial=true', rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(Donation.objects.count(), 1)
+
+    def test_bulk_import_csv_upload(self):
+        today = datetime.date.today().isoformat()
+        content = (
+            "donor_contact_id,campaign_id,donation_date,donation_type,amount,payment_method,in_kind_item_name,in_kind_quantity\n"
+            f"{self.donors[0].pk},{self.campaign.pk},{today},MON,25.50,CRD,,\n"
+            f"{self.donors[1].pk},,{today},INK,,,Blankets,12\n"
+        )
+        upload = SimpleUploadedFile("processor-export.csv", content.encode('utf-8'), content_type='text/csv')
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(Donation.objects.get(donation_type=DonationType.MONETARY).amount, Decimal("25.50"))
+        self.assertEqual(InKindDonationDetail.objects.get().quantity, 12)
+
+    def test_import_donations_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as handle:
+            json.dump([self._monetary_row(donor) for donor in self.donors], handle)
+        out = StringIO()
+        call_command('import_donations', handle.name, '--batch-size', '2', '--received-by', self.api_user.username, stdout=out)
+        self.assertIn("Imported 3 of 3 donations.", out.getvalue())
+        self.assertEqual(Donation.objects.filter(campaign=self.campaign, received_by=self.api_user).count(), 3)
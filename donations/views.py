@@ -1,17 +1,34 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
+from rest_framework.decorators import action
 from django.db import transaction
 from .models import Donation, InKindDonationDetail
 from .serializers import DonationSerializer, InKindDonationDetailSerializer
+from .bulk import DonationImportError, import_donations, json_rows, parse_rows
 from contacts.models import Contact
 from fundraising.models import Campaign as FundraisingCampaign # Explicit import
+from fundraising.progress import donation_contribution, record_donation_change
+from ngo_crm.pagination import KeysetPagination
+from ngo_crm.exports import EXPORT_RENDERER_CLASSES, streaming_export_response
+from ngo_crm.views import ThrottleScopeMixin
 
-class DonationViewSet(viewsets.ModelViewSet):
+class DonationViewSet(ThrottleScopeMixin, viewsets.ModelViewSet):
     queryset = Donation.objects.select_related(
         'donor_contact', 'campaign', 'received_by', 'in_kind_details'
     ).all()
     serializer_class = DonationSerializer
     permission_classes = [permissions.IsAuthenticated] # Adjust
+    pagination_class = KeysetPagination # Keyed on Meta.ordering: -donation_date, -created_at
+    filterset_fields = {
+        'donation_date': ['gte', 'lte'],
+        'donation_type': ['exact', 'in'],
+        'payment_method': ['exact', 'in'],
+        'amount': ['gte', 'lte'],
+        'campaign': ['exact', 'in', 'isnull'],
+        'donor_contact': ['exact', 'in'],
+        'received_by': ['exact'],
+        'is_anonymous': ['exact'],
+    }
 
     def perform_create(self, serializer):
         # The serializer's create method handles creating Donation and InKindDonationDetail
@@ -28,6 +45,61 @@ class DonationViewSet(viewsets.ModelViewSet):
         # If not, it remains unchanged for partial updates.
         serializer.save()
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        contribution = donation_contribution(instance)
+        instance.delete()
+        record_donation_change(previous=contribution)
+
+    @action(detail=False, methods=['post'], url_path='bulk-import', throttle_scope='bulk')
+    def bulk_import(self, request):
+        """
+        Import many donations at once. Send either a JSON list of donation objects
+        (same shape as POST /api/donations/), or {"rows": [...]}, or a multipart upload with a `file`
+        (CSV or JSON; detected from the extension or a `file_format` field).
+        Add `?allow_partial=true` to insert the valid rows even when some rows fail.
+        """
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                file_format = request.data.get('file_format') or upload.name.rsplit('.', 1)[-1].lower()
+                rows = parse_rows(upload.read().decode('utf-8-sig'), file_format)
+            else:
+                rows = json_rows(request.data)
+        except (DonationImportError, UnicodeDecodeError) as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        allow_partial = request.query_params.get('allow_partial', '').lower() in ('1', 'true', 'yes')
+        result = import_donations(rows, received_by=request.user, allow_partial=allow_partial)
+        if result['errors'] and not result['created']:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    export_columns = [
+        ('id', 'id'),
+        ('donation_date', 'donation_date'),
+        ('donation_type', 'donation_type'),
+        ('amount', 'amount'),
+        ('payment_method', 'payment_method'),
+        ('donor_contact_id', 'donor_contact_id'),
+        ('donor_first_name', 'donor_contact__first_name'),
+        ('donor_last_name', 'donor_contact__last_name'),
+        ('donor_email', 'donor_contact__email'),
+        ('campaign_id', 'campaign_id'),
+        ('campaign_name', 'campaign__name'),
+        ('is_anonymous', 'is_anonymous'),
+        ('notes', 'notes'),
+        ('created_at', 'created_at'),
+    ]
+
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERER_CLASSES, throttle_scope='exports')
+    def export(self, request):
+        """
+        Stream every donation with its donor and campaign as CSV (default) or NDJSON (?format=ndjson).
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return streaming_export_response(request, queryset, self.export_columns, 'donations')
+
 class InKindDonationDetailViewSet(viewsets.ModelViewSet):
     """
     This ViewSet is primarily for managing InKindDonationDetail records directly,
@@ -3,8 +3,14 @@ import donationService from '../../services/donationService';
 import { Link } from 'react-router-dom';
 import { format } from 'date-fns'; // For formatting dates
 
+// Only the columns the table shows; the API trims its SELECT to match.
+const LIST_FIELDS = 'id,donation_date,donor_contact,donation_type,donation_type_display,amount,in_kind_details,campaign';
+
+const EMPTY_FILTERS = { donation_date__gte: '', donation_date__lte: '', donation_type: '', amount__gte: '', amount__lte: '' };
+
 const DonationList = () => {
   const [donations, setDonations] = useState([]);
+  const [filters, setFilters] = useState(EMPTY_FILTERS);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
@@ -12,11 +18,17 @@ const DonationList = () => {
     const fetchDonations = async () => {
       try {
         setLoading(true);
-        const response = await donationService.getAllDonations();
+        // Filtering happens on the server: send only the filters that are set.
+        const params = { fields: LIST_FIELDS };
+        Object.entries(filters).forEach(([name, value]) => {
+          if (value !== '') params[name] = value;
+        });
+        const response = await donationService.getAllDonations(params);
         setDonations(response.data.results || response.data);
         setError(null);
       } catch (err) {
-        setError(err.message || 'Failed to fetch donations.');
+        const detail = err.response?.status === 400 ? JSON.stringify(err.response.data) : '';
+        setError(detail || err.message || 'Failed to fetch donations.');
         console.error("Fetch error:", err);
       } finally {
         setLoading(false);
@@ -24,7 +36,12 @@ const DonationList = () => {
     };
 
     fetchDonations();
-  }, []);
+  }, [filters]);
+
+  const handleFilterChange = (e) => {
+    const { name, value } = e.target;
+    setFilters(prev => ({ ...prev, [name]: value }));
+  };
 
   const handleDelete = async (id) => {
     if (window.confirm(`Are you sure you want to delete donation ${id}? This might be restricted by protected relations.`)) {
@@ -39,11 +56,29 @@ const DonationList = () => {
     }
   };
 
-  if (loading) return <p>Loading donations...</p>;
-  if (error) return <p style={{ color: 'red' }}>Error: {error}</p>;
+  const filterBar = (
+    <div style={{ marginBottom: '1em' }}>
+      <label>From <input type="date" name="donation_date__gte" value={filters.donation_date__gte} onChange={handleFilterChange} /></label>{' '}
+      <label>To <input type="date" name="donation_date__lte" value={filters.donation_date__lte} onChange={handleFilterChange} /></label>{' '}
+      <label>Type{' '}
+        <select name="donation_type" value={filters.donation_type} onChange={handleFilterChange}>
+          <option value="">All</option>
+          <option value="MON">Monetary</option>
+          <option value="INK">In-Kind</option>
+        </select>
+      </label>{' '}
+      <label>Amount <input type="number" name="amount__gte" placeholder="min" value={filters.amount__gte} onChange={handleFilterChange} style={{ width: '6em' }} /></label>{' '}
+      <input type="number" name="amount__lte" placeholder="max" value={filters.amount__lte} onChange={handleFilterChange} style={{ width: '6em' }} />{' '}
+      <button onClick={() => setFilters(EMPTY_FILTERS)}>Clear</button>
+    </div>
+  );
+
+  if (loading) return <div>{filterBar}<p>Loading donations...</p></div>;
+  if (error) return <div>{filterBar}<p style={{ color: 'red' }}>Error: {error}</p></div>;
   if (!donations.length) {
     return (
       <div>
+        {filterBar}
         <p>No donations found.</p>
         <Link to="/donations/new"><button>Add New Donation</button></Link>
       </div>
@@ -56,6 +91,7 @@ const DonationList = () => {
       <Link to="/donations/new">
         <button style={{ marginBottom: '1em' }}>Add New Donation</button>
       </Link>
+      {filterBar}
       <table border="1" style={{ width: '100%', borderCollapse: 'collapse' }}>
         <thead>
           <tr>
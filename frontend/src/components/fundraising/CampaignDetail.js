@@ -37,12 +37,9 @@ const CampaignDetail = () => {
   if (error) return <p style={{ color: 'red' }}>Error: {error}</p>;
   if (!campaign) return <p>Campaign not found.</p>;
 
-  const totalRaised = donations.reduce((sum, donation) => {
-    // Assuming 'amount' exists and is a number for monetary donations
-    return sum + (donation.donation_type === 'MON' ? parseFloat(donation.amount || 0) : 0);
-  }, 0);
-
-  const progress = campaign.goal_amount > 0 ? (totalRaised / parseFloat(campaign.goal_amount)) * 100 : 0;
+  // Totals come from the campaign itself: the donations list below is only the first page.
+  const totalRaised = parseFloat(campaign.raised_amount || 0);
+  const progress = parseFloat(campaign.progress_percent || 0);
 
   const chartData = [
     { name: 'Campaign Progress', Raised: totalRaised, Goal: parseFloat(campaign.goal_amount) }
@@ -64,6 +61,7 @@ const CampaignDetail = () => {
         <p><strong>Status:</strong> {campaign.status_display || campaign.status}</p>
         <p><strong>Goal Amount:</strong> ${parseFloat(campaign.goal_amount).toFixed(2)}</p>
         <p><strong>Total Raised (Monetary):</strong> ${totalRaised.toFixed(2)}</p>
+        <p><strong>Donations:</strong> {campaign.donation_count}{campaign.last_donation_at ? ` (latest ${format(new Date(campaign.last_donation_at), 'yyyy-MM-dd')})` : ''}</p>
         <p><strong>Progress:</strong> {progress.toFixed(2)}%</p>
         <div style={{ width: '100%', height: 50, backgroundColor: '#e0e0e0', borderRadius: '4px', marginTop: '5px', marginBottom: '15px' }}>
             <div style={{ width: `${Math.min(progress, 100)}%`, height: '100%', backgroundColor: '#4caf50', borderRadius: '4px', transition: 'width 0.5s ease-in-out' }} />
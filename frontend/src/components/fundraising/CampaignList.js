@@ -65,7 +65,8 @@ const CampaignList = () => {
             <th style={{padding: '8px'}}>Goal Amount</th>
             <th style={{padding: '8px'}}>Start Date</th>
             <th style={{padding: '8px'}}>End Date</th>
-            {/* <th style={{padding: '8px'}}>Total Raised</th> Placeholder from serializer if enabled */}
+            <th style={{padding: '8px'}}>Raised</th>
+            <th style={{padding: '8px'}}>Progress</th>
             <th style={{padding: '8px'}}>Actions</th>
           </tr>
         </thead>
@@ -78,7 +79,8 @@ const CampaignList = () => {
               <td style={{padding: '8px', textAlign: 'right'}}>${parseFloat(campaign.goal_amount).toFixed(2)}</td>
               <td style={{padding: '8px'}}>{campaign.start_date ? format(new Date(campaign.start_date), 'yyyy-MM-dd') : 'N/A'}</td>
               <td style={{padding: '8px'}}>{campaign.end_date ? format(new Date(campaign.end_date), 'yyyy-MM-dd') : 'N/A'}</td>
-              {/* <td style={{padding: '8px', textAlign: 'right'}}>${campaign.total_raised ? parseFloat(campaign.total_raised).toFixed(2) : '0.00'}</td> */}
+              <td style={{padding: '8px', textAlign: 'right'}}>${parseFloat(campaign.raised_amount || 0).toFixed(2)}</td>
+              <td style={{padding: '8px', textAlign: 'right'}}>{parseFloat(campaign.progress_percent || 0).toFixed(1)}%</td>
               <td style={{padding: '8px', textAlign: 'center'}}>
                 <Link to={`/campaigns/${campaign.id}`} style={{ marginRight: '5px' }}>
                   <button>View Details</button>
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from fundraising.progress import rebuild_campaign_progress
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every campaign's raised_amount, donation_count and last_donation_at from its donations. "
+        "Donation writes through the API keep them current; run this after changing donations in the admin, "
+        "with queryset.update() or with raw SQL."
+    )
+
+    def handle(self, *args, **options):
+        updated = rebuild_campaign_progress()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt progress for {updated} campaign(s)."))
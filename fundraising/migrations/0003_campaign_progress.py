@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:23
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_campaign_progress(apps, schema_editor):
+    # Fill the new columns from each campaign's donations in one UPDATE (a frozen copy of
+    # fundraising.progress.rebuild_campaign_progress as it was when this migration was written).
+    Campaign = apps.get_model('fundraising', 'Campaign')
+    Donation = apps.get_model('donations', 'Donation')
+    donations = Donation.objects.filter(campaign=OuterRef('pk')).order_by().values('campaign')
+    raised = donations.filter(donation_type='MON').annotate(total=Sum('amount')).values('total')
+    count = donations.annotate(n=Count('pk')).values('n')
+    latest = donations.annotate(latest=Max('donation_date')).values('latest')
+    Campaign.objects.update(
+        raised_amount=Coalesce(Subquery(raised), Value(Decimal(0)), output_field=DecimalField(max_digits=12, decimal_places=2)),
+        donation_count=Coalesce(Subquery(count), Value(0), output_field=IntegerField()),
+        last_donation_at=Subquery(latest),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fundraising', '0002_campaign_campaign_start_name_idx_and_more'),
+        ('donations', '0002_donation_donation_date_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='donation_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of donations (monetary and in-kind) linked to the campaign'),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='last_donation_at',
+            field=models.DateField(blank=True, editable=False, help_text="Date of the campaign's most recent donation", null=True),
+        ),
+        migrations.AddField(
+            model_name='campaign',
+            name='raised_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text="Sum of the campaign's monetary donations", max_digits=12),
+        ),
+        migrations.RunPython(backfill_campaign_progress, migrations.RunPython.noop),
+    ]
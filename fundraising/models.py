@@ -22,27 +22,32 @@ class Campaign(models.Model):
     )
     # campaign_type = models.CharField(max_length=100, blank=True, help_text="E.g., 'Annual Gala', 'Emergency Relief Fund'")
     managed_by = models.ForeignKey(User, related_name='campaigns_managed', on_delete=models.SET_NULL, null=True, blank=True, help_text="Staff member responsible for the campaign")
+    # Progress, maintained on every donation write by fundraising.progress (rebuild with
+    # `manage.py rebuild_campaign_progress`) so lists never aggregate the donations table.
+    raised_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False, help_text="Sum of the campaign's monetary donations")
+    donation_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of donations (monetary and in-kind) linked to the campaign")
+    last_donation_at = models.DateField(null=True, blank=True, editable=False, help_text="Date of the campaign's most recent donation")
     # primary_contact = models.ForeignKey(Contact, related_name='campaigns_contacted_for', on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-start_date', 'name']
+        indexes = [
+            models.Index(fields=['-start_date', 'name'], name='campaign_start_name_idx'),
+            models.Index(fields=['status'], name='campaign_status_idx'),
+        ]
         verbose_name = "Fundraising Campaign"
         verbose_name_plural = "Fundraising Campaigns"
 
     def __str__(self):
         return self.name
 
-    # Example property to calculate total raised, though this is better done with annotations in querysets
-    # def total_raised(self):
-    #     from donations.models import Donation # Avoid circular import at module level
-    #     return self.donations.filter(donation_type=Donation.DonationType.MONETARY).aggregate(total=models.Sum('amount'))['total'] or 0
-
-    # def progress_percentage(self):
-    #     if self.goal_amount > 0:
-    #         return (self.total_raised() / self.goal_amount) * 100
-    #     return 0
+    @property
+    def progress_percent(self):
+        if self.goal_amount > 0:
+            return self.raised_amount / self.goal_amount * 100
+        return 0
 
 # If you want to track specific fundraising events within a campaign:
 # class FundraisingEvent(models.Model):
@@ -0,0 +1,103 @@
+"""
+Denormalised campaign progress: Campaign.raised_amount, donation_count and last_donation_at.
+
+Every write path that adds, changes or removes a donation reports the donation's
+*contribution* before and after the change (see donation_contribution), and
+apply_progress_changes turns the difference into one atomic UPDATE per campaign
+touched:
+
+    raised_amount = raised_amount + <delta>, donation_count = donation_count + <delta>
+
+Concurrent donations to the same campaign therefore never overwrite each other's
+totals. last_donation_at only moves forward when donations are added; when one
+leaves a campaign it is recomputed from the campaign's remaining donations (an
+indexed lookup) in the same UPDATE.
+
+Writes that bypass these paths (the admin, queryset.update(), raw SQL) leave the
+columns stale until ``python manage.py rebuild_campaign_progress`` is run.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from donations.models import Donation, DonationType
+from .models import Campaign
+
+
+def donation_contribution(donation):
+    """
+    (campaign_id, amount raised, date) for a donation linked to a campaign, else None.
+    Every donation counts towards donation_count; only monetary ones towards raised_amount.
+    """
+    if donation is None or donation.campaign_id is None:
+        return None
+    raised = Decimal(0)
+    if donation.donation_type == DonationType.MONETARY and donation.amount is not None:
+        raised = Decimal(donation.amount)
+    return (donation.campaign_id, raised, donation.donation_date)
+
+
+def apply_progress_changes(added=(), removed=()):
+    """
+    Add the ``added`` contributions to, and take the ``removed`` ones off, their
+    campaigns. A donation edited in place is one removed and one added contribution;
+    if they cancel out (e.g. only the notes changed) the campaign is not touched.
+    """
+    added, removed = list(filter(None, added)), list(filter(None, removed))
+    for contribution in list(removed):
+        if contribution in added:
+            added.remove(contribution)
+            removed.remove(contribution)
+
+    raised, count, latest, lost = defaultdict(Decimal), defaultdict(int), {}, set()
+    for campaign_id, amount, date in added:
+        raised[campaign_id] += amount
+        count[campaign_id] += 1
+        latest[campaign_id] = max(date, latest.get(campaign_id, date))
+    for campaign_id, amount, _ in removed:
+        raised[campaign_id] -= amount
+        count[campaign_id] -= 1
+        lost.add(campaign_id)
+
+    with transaction.atomic():
+        for campaign_id in sorted(raised): # Always lock campaigns in the same order
+            changes = {
+                'raised_amount': F('raised_amount') + raised[campaign_id],
+                'donation_count': F('donation_count') + count[campaign_id],
+            }
+            if campaign_id in lost:
+                changes['last_donation_at'] = _latest_donation_date(Donation)
+            else:
+                date = latest[campaign_id]
+                changes['last_donation_at'] = Greatest(Coalesce(F('last_donation_at'), Value(date)), Value(date))
+            Campaign.objects.filter(pk=campaign_id).update(**changes)
+
+
+def record_donation_change(previous=None, current=None):
+    """Update campaign progress for a donation that went from ``previous`` to ``current`` contribution."""
+    apply_progress_changes(added=[current] if current else [], removed=[previous] if previous else [])
+
+
+def _latest_donation_date(donation_model):
+    return Subquery(
+        donation_model.objects.filter(campaign=OuterRef('pk')).order_by().values('campaign')
+        .annotate(latest=Max('donation_date')).values('latest')
+    )
+
+
+def rebuild_campaign_progress(campaign_model=Campaign, donation_model=Donation):
+    """
+    Recompute every campaign's progress columns from its donations in one UPDATE and
+    return the number of campaigns. Takes the models so migrations can pass historical ones.
+    """
+    donations = donation_model.objects.filter(campaign=OuterRef('pk')).order_by().values('campaign')
+    raised = donations.filter(donation_type=DonationType.MONETARY).annotate(total=Sum('amount')).values('total')
+    count = donations.annotate(n=Count('pk')).values('n')
+    return campaign_model.objects.update(
+        raised_amount=Coalesce(Subquery(raised), Value(Decimal(0)), output_field=DecimalField(max_digits=12, decimal_places=2)),
+        donation_count=Coalesce(Subquery(count), Value(0), output_field=IntegerField()),
+        last_donation_at=_latest_donation_date(donation_model),
+    )
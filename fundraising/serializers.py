@@ -2,28 +2,29 @@ from rest_framework import serializers
 from .models import Campaign #, FundraisingEvent (if using)
 from contacts.serializers import UserSimpleSerializer # For managed_by
 from django.contrib.auth.models import User
+from ngo_crm.serializers import DynamicFieldsMixin
 # To avoid circular import with DonationSerializer, DonationSerializer should use a basic Campaign serializer
 # or only Campaign ID for writing. This CampaignSerializer can provide more detail.
 
-class CampaignSerializer(serializers.ModelSerializer):
+class CampaignSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     managed_by = UserSimpleSerializer(read_only=True)
     managed_by_id = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.all(), source='managed_by', write_only=True, required=False, allow_null=True
     )
-    # To show total raised, you'd typically add this via an annotated queryset in the view
-    # and declare it as read-only here.
-    # total_raised = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
-    # donations_count = serializers.IntegerField(read_only=True)
+    # Progress columns are maintained on donation writes (fundraising/progress.py), so
+    # listing campaigns with their progress costs no extra queries.
+    progress_percent = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
 
     class Meta:
         model = Campaign
         fields = [
             'id', 'name', 'description', 'goal_amount', 'start_date', 'end_date',
             'status', 'status_display', 'managed_by', 'managed_by_id',
+            'raised_amount', 'donation_count', 'last_donation_at', 'progress_percent',
             'created_at', 'updated_at',
-            # 'total_raised', 'donations_count' # Add if providing these annotations
         ]
+        read_only_fields = ['raised_amount', 'donation_count', 'last_donation_at']
 
 # If using FundraisingEvent model:
 # class FundraisingEventSerializer(serializers.ModelSerializer):
@@ -2,12 +2,14 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth.models import User
-from rest_framework.authtoken.models import Token
+from django.core.management import call_command
+from users.models import Token
 from contacts.models import Contact, ContactType
 from donations.models import Donation, DonationType, PaymentMethod
 from .models import Campaign, CampaignStatus
 import datetime
 from decimal import Decimal
+from io import StringIO
 
 class CampaignModelTests(APITestCase):
     def setUp(self):
@@ -85,11 +87,9 @@ class CampaignAPITests(APITestCase):
         response = self.client.get(url, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['name'], self.campaign1_data['name'])
-        # Note: CampaignViewSet get_queryset has annotations commented out.
-        # If activated, CampaignSerializer would need 'total_raised', 'donations_count' fields.
-        # For example:
-        # self.assertEqual(Decimal(response.data['total_raised']), Decimal("100.00"))
-        # self.assertEqual(response.data['donations_count'], 1)
+        # The setUp donation was saved with the ORM, which leaves the progress columns alone.
+        self.assertEqual(response.data['raised_amount'], "0.00")
+        self.assertEqual(response.data['donation_count'], 0)
 
 
     def test_list_campaign_donations_action_api(self):
@@ -109,3 +109,82 @@ class CampaignAPITests(APITestCase):
         self.assertEqual(len(results), 2)
         amounts = sorted([Decimal(item['amount']) for item in results])
         self.assertEqual(amounts, [Decimal("50.00"), Decimal("100.00")])
+
+
+class CampaignProgressTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='progress_user', password='testpassword123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.today = datetime.date.today()
+        self.spring = Campaign.objects.create(name="Spring Appeal", goal_amount=Decimal("1000.00"), start_date=self.today, status=CampaignStatus.ACTIVE)
+        self.winter = Campaign.objects.create(name="Winter Appeal", goal_amount=Decimal("500.00"), start_date=self.today, status=CampaignStatus.ACTIVE)
+        self.donor = Contact.objects.create(first_name="Progress", email="progress@example.com")
+
+    def donate(self, campaign, amount, days_ago=0):
+        response = self.client.post(reverse('donation-list'), {
+            "donor_contact_id": self.donor.pk, "campaign_id": campaign.pk, "amount": amount,
+            "donation_date": (self.today - datetime.timedelta(days=days_ago)).isoformat(),
+            "donation_type": DonationType.MONETARY, "payment_method": PaymentMethod.CARD,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return response.data['id']
+
+    def assertProgress(self, campaign, raised, count, last_donation_at):
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.raised_amount, campaign.donation_count, campaign.last_donation_at), (Decimal(raised), count, last_donation_at))
+
+    def test_create_update_move_and_delete_keep_progress_current(self):
+        first = self.donate(self.spring, "100.00", days_ago=5)
+        second = self.donate(self.spring, "40.00", days_ago=1)
+        self.assertProgress(self.spring, "140.00", 2, self.today - datetime.timedelta(days=1))
+
+        url = reverse('donation-detail', kwargs={'pk': first})
+        self.client.patch(url, {"amount": "150.00"}, format='json')
+        self.assertProgress(self.spring, "190.00", 2, self.today - datetime.timedelta(days=1))
+
+        # Moving the latest donation takes its amount and date along.
+        self.client.patch(reverse('donation-detail', kwargs={'pk': second}), {"campaign_id": self.winter.pk}, format='json')
+        self.assertProgress(self.spring, "150.00", 1, self.today - datetime.timedelta(days=5))
+        self.assertProgress(self.winter, "40.00", 1, self.today - datetime.timedelta(days=1))
+
+        # An in-kind donation still counts, but raises nothing.
+        self.client.patch(url, {"donation_type": DonationType.IN_KIND, "amount": None}, format='json')
+        self.assertProgress(self.spring, "0.00", 1, self.today - datetime.timedelta(days=5))
+
+        self.client.delete(url)
+        self.assertProgress(self.spring, "0.00", 0, None)
+
+    def test_bulk_import_updates_progress(self):
+        rows = [{
+            "donor_contact_id": self.donor.pk, "campaign_id": campaign.pk, "donation_date": self.today.isoformat(),
+            "donation_type": DonationType.MONETARY, "amount": "10.00", "payment_method": PaymentMethod.ONLINE,
+        } for campaign in (self.spring, self.spring, self.winter)]
+        response = self.client.post(reverse('donation-bulk-import'), rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertProgress(self.spring, "20.00", 2, self.today)
+        self.assertProgress(self.winter, "10.00", 1, self.today)
+
+    def test_campaign_list_shows_progress_without_extra_queries(self):
+        self.donate(self.spring, "250.00")
+        for i in range(5):
+            Campaign.objects.create(name=f"Campaign {i}", goal_amount=Decimal("100.00"), start_date=self.today)
+        with self.assertNumQueries(2): # Count, page (the token was cached by the donation POST)
+            response = self.client.get(reverse('campaign-list'))
+        spring = next(campaign for campaign in response.data['results'] if campaign['id'] == self.spring.pk)
+        self.assertEqual((spring['raised_amount'], spring['donation_count'], spring['progress_percent']), ("250.00", 1, "25.00"))
+        self.assertEqual(spring['last_donation_at'], self.today.isoformat())
+
+    def test_rebuild_command_fixes_stale_progress(self):
+        self.donate(self.spring, "60.00")
+        Donation.objects.create(
+            donor_contact=self.donor, campaign=self.winter, donation_date=self.today,
+            amount=Decimal("30.00"), donation_type=DonationType.MONETARY, payment_method=PaymentMethod.CASH,
+        )
+        Campaign.objects.filter(pk=self.spring.pk).update(raised_amount=Decimal("999.00"), donation_count=7)
+        out = StringIO()
+        call_command('rebuild_campaign_progress', stdout=out)
+        self.assertIn("Rebuilt progress for 2 campaign(s).", out.getvalue())
+        self.assertProgress(self.spring, "60.00", 1, self.today)
+        self.assertProgress(self.winter, "30.00", 1, self.today)
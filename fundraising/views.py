@@ -1,38 +1,33 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Sum, Count
 from .models import Campaign #, FundraisingEvent
 from .serializers import CampaignSerializer #, FundraisingEventSerializer
 from donations.models import Donation # For fetching related donations if needed
 from donations.serializers import DonationSerializer # For listing donations for a campaign
+from ngo_crm.pagination import KeysetPagination
 
 class CampaignViewSet(viewsets.ModelViewSet):
     queryset = Campaign.objects.all()
     serializer_class = CampaignSerializer
     permission_classes = [permissions.IsAuthenticated] # Adjust
+    filterset_fields = {
+        'status': ['exact', 'in'],
+        'start_date': ['gte', 'lte'],
+        'end_date': ['gte', 'lte', 'isnull'],
+        'managed_by': ['exact'],
+    }
 
     def get_queryset(self):
         queryset = super().get_queryset().select_related('managed_by')
-        # Annotate with total raised and number of donations
-        # Note: 'donations' is the related_name from Donation.campaign
-        # Donation.amount is the field to sum.
-        # Ensure that only monetary donations are summed if that's the requirement.
-        # This example sums all 'amount' fields from related donations.
-        # If you need to filter by donation_type='MON', it's more complex here.
-        # A simpler way for monetary only: filter donations by type then sum.
-        # For now, this sums 'amount' of all linked donations.
-        # queryset = queryset.annotate(
-        #     total_raised=Sum('donations__amount'), # Sums amount from all related donations
-        #     donations_count=Count('donations')
-        # )
-        # The CampaignSerializer has these fields commented out. If uncommented, these annotations would populate them.
+        # raised_amount, donation_count and last_donation_at are stored on the campaign
+        # (see fundraising/progress.py), so no donations aggregate is needed here.
         return queryset
 
     def perform_create(self, serializer):
         serializer.save(managed_by=self.request.user if self.request.user.is_authenticated else None)
 
-    @action(detail=True, methods=['get'], url_path='donations', serializer_class=DonationSerializer)
+    @action(detail=True, methods=['get'], url_path='donations', serializer_class=DonationSerializer, pagination_class=KeysetPagination)
     def list_campaign_donations(self, request, pk=None):
         campaign = self.get_object()
         # Donations related to this campaign
@@ -84,6 +79,6 @@ class CampaignViewSet(viewsets.ModelViewSet):
 
 # Note on CampaignSerializer:
 # - `managed_by_id`: Writable PK to User.
-# - `total_raised`, `donations_count`: Commented out in serializer. If uncommented, the
-#   `get_queryset` annotation here would populate them. These are read-only.
+# - `raised_amount`, `donation_count`, `last_donation_at`: read-only columns kept current by
+#   donation writes (fundraising/progress.py); `progress_percent` is derived from them.
 # The `list_campaign_donations` action is a good way to get donations for a specific campaign.Tool output for `overwrite_file_with_block`:
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from inventory.stock import reconcile_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every inventory item's stock from its transaction ledger and report items whose "
+        "quantity_on_hand has drifted. With --fix, reset drifted items to their ledger balance. "
+        "Opening balances must be recorded as IN/ADJ transactions: the ledger is the source of truth."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Set drifted items' quantity_on_hand to the ledger balance")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Items per grouped aggregate query (default: 1000)")
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for item_id, name, stored, ledger in reconcile_stock(batch_size=options['batch_size'], fix=options['fix']):
+            drifted += 1
+            self.stdout.write(f"Item {item_id} ({name}): stored {stored}, ledger {ledger}, drift {stored - ledger:+}")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("All inventory items match their ledger."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {drifted} drifted item(s)."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{drifted} item(s) drifted from their ledger. Re-run with --fix to repair."))
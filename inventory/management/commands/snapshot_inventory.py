@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from inventory.stock import write_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Checkpoint every inventory item's stock at the end of a day (default: yesterday). "
+        "Run daily or monthly from cron; /api/inventory-items/{id}/stock-at/ answers from the nearest snapshot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Day to snapshot, YYYY-MM-DD (default: yesterday)")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Items per grouped aggregate query (default: 1000)")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['date']:
+            try:
+                day = parse_date(options['date'])
+            except ValueError:
+                day = None
+            if day is None:
+                raise CommandError(f"Invalid date '{options['date']}'; expected YYYY-MM-DD.")
+        else:
+            day = today - timedelta(days=1)
+        if day >= today:
+            raise CommandError("Only finished days can be snapshotted (the date must be before today).")
+
+        written = write_snapshots(day, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} stock snapshot(s) for {day}."))
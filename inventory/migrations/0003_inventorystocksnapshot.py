@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_inventoryitem_invitem_category_name_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryStockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField()),
+                ('quantity_on_hand', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='inventory.inventoryitem')),
+            ],
+            options={
+                'verbose_name': 'Inventory Stock Snapshot',
+                'verbose_name_plural': 'Inventory Stock Snapshots',
+                'ordering': ['item', '-snapshot_date'],
+                'constraints': [models.UniqueConstraint(fields=('item', 'snapshot_date'), name='invsnapshot_item_date_uniq')],
+            },
+        ),
+    ]
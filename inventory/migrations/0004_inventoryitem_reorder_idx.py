@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_inventorystocksnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(condition=models.Q(('quantity_on_hand__lte', models.F('reorder_level'))), fields=['category', 'name'], name='invitem_reorder_idx'),
+        ),
+    ]
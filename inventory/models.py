@@ -33,6 +33,15 @@ class InventoryItem(models.Model):
 
     class Meta:
         ordering = ['category', 'name']
+        indexes = [
+            models.Index(fields=['category', 'name'], name='invitem_category_name_idx'),
+            # Partial index holding only the items due for reorder (the reorder report's WHERE clause).
+            # It stays small as the catalog grows and is maintained by the database on every stock UPDATE.
+            models.Index(
+                fields=['category', 'name'], name='invitem_reorder_idx',
+                condition=models.Q(quantity_on_hand__lte=models.F('reorder_level')),
+            ),
+        ]
         verbose_name = "Inventory Item"
         verbose_name_plural = "Inventory Items"
 
@@ -60,6 +69,10 @@ class InventoryTransaction(models.Model):
 
     class Meta:
         ordering = ['-transaction_date', 'item']
+        indexes = [
+            models.Index(fields=['-transaction_date', 'item'], name='invtxn_date_item_idx'), # Default list order
+            models.Index(fields=['item', '-transaction_date'], name='invtxn_item_date_idx'), # Per-item history
+        ]
         verbose_name = "Inventory Transaction"
         verbose_name_plural = "Inventory Transactions"
 
@@ -88,6 +101,29 @@ class InventoryTransaction(models.Model):
         # The primary goal here is to define the model structure.
         pass
 
+class InventoryStockSnapshot(models.Model):
+    """
+    Checkpoint of an item's quantity_on_hand at the end of ``snapshot_date``, written by
+    `manage.py snapshot_inventory`. Point-in-time stock is the nearest snapshot plus the
+    ledger between it and the requested date (see inventory.stock.stock_at).
+    Editing or deleting an older transaction shifts the later snapshots by the same delta.
+    """
+    item = models.ForeignKey(InventoryItem, related_name='stock_snapshots', on_delete=models.CASCADE)
+    snapshot_date = models.DateField()
+    quantity_on_hand = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['item', '-snapshot_date']
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'snapshot_date'], name='invsnapshot_item_date_uniq'),
+        ]
+        verbose_name = "Inventory Stock Snapshot"
+        verbose_name_plural = "Inventory Stock Snapshots"
+
+    def __str__(self):
+        return f"{self.item.name}: {self.quantity_on_hand} at end of {self.snapshot_date}"
+
 # Example of a more robust way to handle stock updates (typically in a signal or view)
 # from django.db.models.signals import post_save
 # from django.dispatch import receiver
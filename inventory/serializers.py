@@ -1,17 +1,20 @@
 from rest_framework import serializers
+from rest_framework.exceptions import NotFound
 from .models import InventoryCategory, InventoryItem, InventoryTransaction, InventoryTransactionType # Added InventoryTransactionType
 from contacts.serializers import UserSimpleSerializer # For user who recorded transaction
 # from projects.serializers import ProjectBasicSerializer # If linking to projects
 from django.contrib.auth.models import User
 from django.db import transaction
 from decimal import Decimal, InvalidOperation # Import InvalidOperation for robust conversion
+from .stock import stock_delta, apply_stock_delta, apply_stock_deltas, compensating_deltas, insufficient_stock_error, locked_ledger_entry, shift_snapshots
+from ngo_crm.serializers import DynamicFieldsMixin
 
-class InventoryCategorySerializer(serializers.ModelSerializer):
+class InventoryCategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = InventoryCategory
         fields = ['id', 'name', 'description']
 
-class InventoryItemSerializer(serializers.ModelSerializer):
+class InventoryItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True, allow_null=True)
     # transactions_count = serializers.IntegerField(read_only=True) # Example for annotation
 
@@ -24,7 +27,7 @@ class InventoryItemSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['quantity_on_hand'] # Quantity on hand is managed by transactions
 
-class InventoryTransactionSerializer(serializers.ModelSerializer):
+class InventoryTransactionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     item_name = serializers.CharField(source='item.name', read_only=True)
     item_unit_of_measure = serializers.CharField(source='item.unit_of_measure', read_only=True)
     transaction_type_display = serializers.CharField(source='get_transaction_type_display', read_only=True)
@@ -50,8 +53,9 @@ class InventoryTransactionSerializer(serializers.ModelSerializer):
 
 
     def validate(self, data):
-        transaction_type = data.get('transaction_type')
-        quantity_input = data.get('quantity') # Raw input, could be string
+        # On PATCH, fields left out keep their current values.
+        transaction_type = data.get('transaction_type', getattr(self.instance, 'transaction_type', None))
+        quantity_input = data.get('quantity', getattr(self.instance, 'quantity', None)) # Raw input, could be string
 
         if quantity_input is None:
             raise serializers.ValidationError({"quantity": "Quantity is required."})
@@ -66,27 +70,20 @@ class InventoryTransactionSerializer(serializers.ModelSerializer):
         if transaction_type not in valid_transaction_types:
             raise serializers.ValidationError({"transaction_type": "Invalid transaction type provided."})
 
-        if transaction_type == InventoryTransactionType.ADJUSTMENT:
-            # For ADJ, quantity is the delta (can be positive or negative).
-            # Check if a negative adjustment would result in negative stock.
-            if quantity < 0:
-                item = data.get('item') # item instance from validated_data
-                if item and item.quantity_on_hand < abs(quantity):
-                    raise serializers.ValidationError({
-                        "quantity": f"Adjustment by {quantity} units for item '{item.name}' results in negative stock. Current stock: {item.quantity_on_hand}."
-                    })
-            # Positive ADJ is fine, stock will increase. No specific check beyond that here.
-        else: # For IN or OUT transactions
-            if quantity <= 0: # Must be positive
-                raise serializers.ValidationError({
-                    "quantity": f"Quantity for {transaction_type.label} transaction must be positive."
-                })
-            if transaction_type == InventoryTransactionType.OUT:
-                item = data.get('item')
-                if item and item.quantity_on_hand < quantity:
-                    raise serializers.ValidationError({
-                        "quantity": f"Not enough stock for OUT transaction for item '{item.name}'. Available: {item.quantity_on_hand}, Requested: {quantity}."
-                    })
+        # Stock sufficiency is checked here only as early feedback on an unlocked read;
+        # the authoritative check is the conditional UPDATE in create() (see inventory.stock).
+        item = data.get('item') if self.instance is None else None # Edits are checked against the compensated stock in update()
+        if transaction_type != InventoryTransactionType.ADJUSTMENT and quantity <= 0: # IN/OUT must be positive
+            raise serializers.ValidationError({
+                "quantity": f"Quantity for {InventoryTransactionType(transaction_type).label} transaction must be positive."
+            })
+        if quantity == 0: # A zero adjustment changes nothing and would only add an empty ledger row
+            raise serializers.ValidationError({"quantity": "Adjustment quantity must not be zero."})
+        delta = stock_delta(transaction_type, quantity)
+        if item and delta < 0 and item.quantity_on_hand < -delta:
+            raise serializers.ValidationError({
+                "quantity": f"Not enough stock for item '{item.name}'. Available: {item.quantity_on_hand}, Requested: {-delta}."
+            })
 
         # After all specific checks, put the (potentially type-casted) quantity back into data
         # This is important if the initial quantity was a string and got converted to Decimal.
@@ -98,23 +95,47 @@ class InventoryTransactionSerializer(serializers.ModelSerializer):
         quantity = validated_data['quantity'] # Should be Decimal from validate method
         transaction_type = validated_data['transaction_type']
 
-        with transaction.atomic():
-            inventory_item = InventoryItem.objects.select_for_update().get(pk=item.pk)
+        delta = stock_delta(transaction_type, quantity)
 
-            original_qoh = inventory_item.quantity_on_hand
+        with transaction.atomic():
+            # Check-and-increment in one conditional UPDATE; no read-modify-write, no lock held across Python code.
+            if not apply_stock_delta(item.pk, delta):
+                raise insufficient_stock_error(item.pk, delta)
+            return InventoryTransaction.objects.create(**validated_data)
 
-            if transaction_type == InventoryTransactionType.IN:
-                inventory_item.quantity_on_hand += quantity
-            elif transaction_type == InventoryTransactionType.OUT:
-                # Sufficient stock check already done in validate method
-                inventory_item.quantity_on_hand -= quantity
-            elif transaction_type == InventoryTransactionType.ADJUSTMENT:
-                # Delta (positive or negative) already checked for not causing negative total stock in validate method
-                inventory_item.quantity_on_hand += quantity
+    def update(self, instance, validated_data):
+        # Reverse the entry's old effect and apply its new one (possibly on a different item) in one
+        # database transaction, so the ledger and quantity_on_hand never disagree.
+        new = (
+            validated_data.get('item', instance.item).pk,
+            validated_data.get('transaction_type', instance.transaction_type),
+            validated_data.get('quantity', instance.quantity),
+        )
+        with transaction.atomic():
+            old = locked_ledger_entry(instance.pk)
+            if old is None:
+                raise NotFound("This inventory transaction no longer exists.")
+            deltas = compensating_deltas(old, new)
+            apply_stock_deltas(deltas)
+            shift_snapshots(deltas, since=instance.transaction_date)
+            return super().update(instance, validated_data)
+
+
+class InventoryTransactionLineSerializer(serializers.Serializer):
+    """One line of a batch posting. Stock checks happen later, under the item locks."""
+    item = serializers.IntegerField(source='item_id')
+    transaction_type = serializers.ChoiceField(choices=InventoryTransactionType.choices)
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
 
-            inventory_item.save()
+    def validate(self, data):
+        # Same sign rules as InventoryTransactionSerializer: ADJ is a signed delta, IN/OUT must be positive.
+        if data['transaction_type'] != InventoryTransactionType.ADJUSTMENT and data['quantity'] <= 0:
+            raise serializers.ValidationError({"quantity": "Quantity for IN/OUT transactions must be positive."})
+        if data['quantity'] == 0:
+            raise serializers.ValidationError({"quantity": "Adjustment quantity must not be zero."})
+        return data
 
-            # Log for debugging stock updates
-            # print(f"Item: {inventory_item.name}, Old QOH: {original_qoh}, Change: {quantity if transaction_type != 'ADJ' else quantity}, New QOH: {inventory_item.quantity_on_hand}, Type: {transaction_type}")
 
-            return InventoryTransaction.objects.create(**validated_data)
+class InventoryTransactionBatchSerializer(serializers.Serializer):
+    lines = InventoryTransactionLineSerializer(many=True, allow_empty=False)
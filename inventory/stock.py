@@ -0,0 +1,304 @@
+"""
+Stock mutation helpers for inventory transactions.
+
+Transaction quantities are stored as entered: always positive for IN and OUT,
+signed for ADJ (the delta). ``stock_delta`` turns a transaction into its
+signed effect on InventoryItem.quantity_on_hand.
+"""
+from collections import defaultdict, OrderedDict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Case, F, Sum, When, DecimalField
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+
+from ngo_crm.metrics import record_inventory_transactions_posted
+
+from .models import InventoryItem, InventoryStockSnapshot, InventoryTransaction, InventoryTransactionType
+
+CENTS = Decimal('0.01')
+
+
+def stock_delta(transaction_type, quantity):
+    """Signed change to quantity_on_hand caused by a transaction."""
+    if transaction_type == InventoryTransactionType.OUT:
+        return -quantity
+    return quantity # IN is positive; ADJ is already the signed delta
+
+
+def apply_stock_delta(item_id, delta):
+    """
+    Atomically add ``delta`` to an item's quantity_on_hand.
+
+    The sufficiency check is part of the UPDATE itself
+    (`... SET quantity_on_hand = quantity_on_hand + delta WHERE id = %s AND quantity_on_hand >= -delta`),
+    so concurrent OUTs can never drive stock negative and no row lock is held
+    between reading and writing. Returns False if the item is missing or the stock is insufficient.
+    """
+    rows = InventoryItem.objects.filter(pk=item_id)
+    if delta < 0:
+        rows = rows.filter(quantity_on_hand__gte=-delta)
+    return rows.update(quantity_on_hand=F('quantity_on_hand') + delta) == 1
+
+
+def insufficient_stock_error(item_id, delta):
+    """ValidationError for a failed apply_stock_delta, quoting the stock level at the time of failure."""
+    available = InventoryItem.objects.filter(pk=item_id).values_list('quantity_on_hand', flat=True).first()
+    if available is None:
+        return serializers.ValidationError({"item": [f"Inventory item {item_id} not found."]})
+    return serializers.ValidationError({"quantity": [
+        f"Not enough stock for this transaction. Available: {available}, requested: {-delta}."
+    ]})
+
+
+def apply_stock_deltas(deltas):
+    """
+    Apply {item_id: delta} with apply_stock_delta, in primary-key order.
+    Call inside transaction.atomic(): a failure raises ValidationError and the caller's
+    transaction rolls back whatever was already applied.
+    """
+    for item_id in sorted(deltas):
+        delta = deltas[item_id]
+        if delta and not apply_stock_delta(item_id, delta):
+            raise insufficient_stock_error(item_id, delta)
+
+
+def locked_ledger_entry(transaction_id):
+    """
+    (item_id, transaction_type, quantity) of a transaction, read under a row lock so that two
+    concurrent edits of the same entry cannot both reverse its original effect. None if it is gone.
+    """
+    return (
+        InventoryTransaction.objects.select_for_update().filter(pk=transaction_id)
+        .values_list('item_id', 'transaction_type', 'quantity').first()
+    )
+
+
+def compensating_deltas(old, new=None):
+    """
+    Net stock deltas that turn the effect of ledger entry ``old`` into that of ``new``.
+    Both are (item_id, transaction_type, quantity) tuples; ``new=None`` means ``old`` is being deleted.
+    """
+    deltas = defaultdict(Decimal)
+    old_item, old_type, old_quantity = old
+    deltas[old_item] -= stock_delta(old_type, old_quantity)
+    if new is not None:
+        new_item, new_type, new_quantity = new
+        deltas[new_item] += stock_delta(new_type, new_quantity)
+    return dict(deltas)
+
+
+# Signed ledger total per item, computed in the database: SUM(CASE WHEN type = 'OUT' THEN -quantity ELSE quantity END)
+LEDGER_BALANCE = Coalesce(
+    Sum(Case(
+        When(transaction_type=InventoryTransactionType.OUT, then=-F('quantity')),
+        default=F('quantity'),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )),
+    Decimal('0'),
+    output_field=DecimalField(max_digits=10, decimal_places=2),
+)
+
+
+def reconcile_stock(batch_size=1000, fix=False):
+    """
+    Compare every item's quantity_on_hand with the sum of its ledger, ``batch_size`` items at a time.
+
+    Each batch costs three queries however long the ledger is: lock the batch's item rows,
+    one grouped SUM over their transactions, and (with ``fix``) one UPDATE setting the drifted
+    rows to their ledger balance. The lock keeps transactions posted mid-run from being
+    counted in the ledger but not in the stored value (or the other way round).
+
+    Yields (item_id, item_name, stored, ledger) for each drifted item.
+    """
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                InventoryItem.objects.select_for_update()
+                .filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'name', 'quantity_on_hand')[:batch_size]
+            )
+            if not batch:
+                return
+            last_pk = batch[-1][0]
+            ledger = {
+                item_id: balance.quantize(CENTS) # SQLite's SUM drops the column's decimal places
+                for item_id, balance in InventoryTransaction.objects.filter(item__gte=batch[0][0], item__lte=last_pk)
+                .values('item_id').annotate(balance=LEDGER_BALANCE).values_list('item_id', 'balance')
+            }
+            drifted = [
+                (pk, name, stored, ledger.get(pk, Decimal('0.00')))
+                for pk, name, stored in batch
+                if stored != ledger.get(pk, Decimal('0.00'))
+            ]
+            if fix and drifted:
+                InventoryItem.objects.filter(pk__in=[pk for pk, *_ in drifted]).update(
+                    quantity_on_hand=Case(
+                        *[When(pk=pk, then=balance) for pk, _, _, balance in drifted],
+                        output_field=DecimalField(max_digits=10, decimal_places=2),
+                    )
+                )
+        yield from drifted
+
+
+def post_transaction_batch(lines, user=None):
+    """
+    Post many transactions in one all-or-nothing database transaction.
+
+    ``lines`` are validated dicts with 'item_id', 'transaction_type', 'quantity' and
+    optional 'notes'. Every affected item is locked once, in primary-key order so
+    that concurrent batches cannot deadlock. Lines are then checked against the
+    locked stock levels in the order given (stock may never go negative). Each
+    item's net change is applied with a single
+    `UPDATE ... SET quantity_on_hand = quantity_on_hand + delta`, and the ledger
+    rows are inserted with bulk_create.
+
+    Raises serializers.ValidationError (with per-line errors) if any line fails.
+    Returns (created transactions, {item_id: new quantity_on_hand}).
+    """
+    item_ids = sorted({line['item_id'] for line in lines})
+    with transaction.atomic():
+        items = OrderedDict(
+            (item.pk, item)
+            for item in InventoryItem.objects.select_for_update().filter(pk__in=item_ids).order_by('pk')
+        )
+
+        errors = {}
+        running = {pk: item.quantity_on_hand for pk, item in items.items()}
+        net_deltas = defaultdict(Decimal)
+        for index, line in enumerate(lines):
+            item = items.get(line['item_id'])
+            if item is None:
+                errors[index] = {"item": [f"Inventory item {line['item_id']} not found."]}
+                continue
+            delta = stock_delta(line['transaction_type'], line['quantity'])
+            if running[item.pk] + delta < 0:
+                errors[index] = {"quantity": [
+                    f"Not enough stock for item '{item.name}'. Available: {running[item.pk]}, requested: {-delta}."
+                ]}
+                continue
+            running[item.pk] += delta
+            net_deltas[item.pk] += delta
+        if errors:
+            raise serializers.ValidationError({"lines": errors})
+
+        changed = {pk: delta for pk, delta in net_deltas.items() if delta}
+        if changed:
+            InventoryItem.objects.filter(pk__in=changed).update(
+                quantity_on_hand=F('quantity_on_hand') + Case(
+                    *[When(pk=pk, then=delta) for pk, delta in changed.items()],
+                    output_field=DecimalField(max_digits=10, decimal_places=2),
+                )
+            )
+
+        created = InventoryTransaction.objects.bulk_create([
+            InventoryTransaction(
+                item=items[line['item_id']],
+                transaction_type=line['transaction_type'],
+                quantity=line['quantity'],
+                notes=line.get('notes', ''),
+                user=user,
+            )
+            for line in lines
+        ])
+        record_inventory_transactions_posted(created)
+    return created, running
+
+
+def end_of_day(day):
+    """Aware datetime at which ``day`` ends (midnight starting the next day, in the current time zone)."""
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def shift_snapshots(deltas, since):
+    """
+    Keep snapshots taken after ``since`` in step with an edited or deleted ledger entry
+    dated ``since``: one UPDATE per affected item. Call inside the same transaction.
+    """
+    for item_id in sorted(deltas):
+        if deltas[item_id]:
+            InventoryStockSnapshot.objects.filter(item_id=item_id, snapshot_date__gte=timezone.localdate(since)).update(
+                quantity_on_hand=F('quantity_on_hand') + deltas[item_id]
+            )
+
+
+def write_snapshots(day, batch_size=1000):
+    """
+    Checkpoint every item's stock at the end of ``day``, which must already be over.
+
+    Per batch of items: lock them, one grouped SUM of the ledger written after ``day`` ended,
+    and one upsert. Stock at end of day = current quantity_on_hand - that ledger tail.
+    Returns the number of snapshot rows written.
+    """
+    cutoff = end_of_day(day)
+    written = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                InventoryItem.objects.select_for_update()
+                .filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'quantity_on_hand')[:batch_size]
+            )
+            if not batch:
+                return written
+            last_pk = batch[-1][0]
+            tails = dict(
+                InventoryTransaction.objects.filter(item__gte=batch[0][0], item__lte=last_pk, transaction_date__gte=cutoff)
+                .values('item_id').annotate(balance=LEDGER_BALANCE).values_list('item_id', 'balance')
+            )
+            InventoryStockSnapshot.objects.bulk_create(
+                [
+                    InventoryStockSnapshot(item_id=pk, snapshot_date=day, quantity_on_hand=qoh - tails.get(pk, 0))
+                    for pk, qoh in batch
+                ],
+                update_conflicts=True,
+                unique_fields=['item', 'snapshot_date'],
+                update_fields=['quantity_on_hand'],
+            )
+            written += len(batch)
+
+
+def stock_at(item, day):
+    """
+    Stock of ``item`` at the end of ``day``, answered from the nearest anchor and the ledger between
+    it and the day: the latest snapshot on or before ``day``, the earliest one after it, or the live
+    quantity_on_hand. Every lookup is an index range scan, so the cost does not grow with the ledger.
+
+    Returns (quantity, basis) where basis is the anchor's snapshot date, or None for live stock.
+    """
+    if day >= timezone.localdate():
+        return item.quantity_on_hand, None
+
+    snapshots = InventoryStockSnapshot.objects.filter(item=item)
+    before = snapshots.filter(snapshot_date__lte=day).order_by('-snapshot_date').values_list('snapshot_date', 'quantity_on_hand').first()
+    if before is not None and before[0] == day:
+        return before[1], before[0]
+    after = snapshots.filter(snapshot_date__gt=day).order_by('snapshot_date').values_list('snapshot_date', 'quantity_on_hand').first()
+
+    # Pick the closest anchor; "now" counts as an anchor dated today.
+    anchors = []
+    if before is not None:
+        anchors.append((day - before[0], 'before', before))
+    if after is not None:
+        anchors.append((after[0] - day, 'after', after))
+    anchors.append((timezone.localdate() - day, 'live', (None, item.quantity_on_hand)))
+    _, direction, (anchor_date, anchor_quantity) = min(anchors, key=lambda anchor: anchor[0])
+
+    ledger = InventoryTransaction.objects.filter(item=item)
+    cutoff = end_of_day(day)
+    if direction == 'before': # Roll forward over (anchor, day]
+        tail = ledger.filter(transaction_date__gte=end_of_day(anchor_date), transaction_date__lt=cutoff)
+        sign = 1
+    elif direction == 'after': # Roll back over (day, anchor]
+        tail = ledger.filter(transaction_date__gte=cutoff, transaction_date__lt=end_of_day(anchor_date))
+        sign = -1
+    else:
+        tail = ledger.filter(transaction_date__gte=cutoff)
+        sign = -1
+    balance = tail.aggregate(balance=LEDGER_BALANCE)['balance']
+    return (anchor_quantity + sign * balance).quantize(CENTS), anchor_date
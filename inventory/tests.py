@@ -1,10 +1,21 @@
 from django.urls import reverse
 from rest_framework import status
+import os
+import tempfile
+import threading
 from rest_framework.test import APITestCase, APIClient
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
-from rest_framework.authtoken.models import Token
-from .models import InventoryCategory, InventoryItem, InventoryTransaction, InventoryTransactionType
+from users.models import Token
+from .stock import apply_stock_delta
+from .models import InventoryCategory, InventoryItem, InventoryStockSnapshot, InventoryTransaction, InventoryTransactionType
+from datetime import datetime, timedelta
 from decimal import Decimal
+from django.utils import timezone
+from io import StringIO
+from django.core.management import call_command
 
 class InventoryModelTests(APITestCase):
     def setUp(self):
@@ -140,6 +151,15 @@ class InventoryAPITests(APITestCase):
         updated_item_data = response.data.get("item_updated_stock", {})
         self.assertEqual(Decimal(updated_item_data.get('quantity_on_hand', '0.00')), self.item1.quantity_on_hand)
 
+    def test_zero_adjustment_is_rejected_like_in_batches(self):
+        url = reverse('inventorytransaction-list')
+        data = {"item": self.item1.pk, "transaction_type": InventoryTransactionType.ADJUSTMENT, "quantity": "0"}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('quantity', response.data)
+        response = self.client.post(reverse('inventorytransaction-batch'), {"lines": [data]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(InventoryTransaction.objects.exists())
 
     def test_list_item_transactions_action_api(self):
         # Create some transactions for item1 via the API for consistency
@@ -152,3 +172,281 @@ class InventoryAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
         results = response.data if not isinstance(response.data, dict) or 'results' not in response.data else response.data['results']
         self.assertEqual(len(results), 2)
+
+    def test_batch_posting_applies_net_deltas(self):
+        item2 = InventoryItem.objects.create(name="Paper", category=self.category, quantity_on_hand=Decimal("5.00"))
+        url = reverse('inventorytransaction-batch')
+        lines = [
+            {"item": self.item1.pk, "transaction_type": "OUT", "quantity": "20"},
+            {"item": item2.pk, "transaction_type": "IN", "quantity": "10"},
+            {"item": self.item1.pk, "transaction_type": "ADJ", "quantity": "-5", "notes": "Damaged"},
+            {"item": item2.pk, "transaction_type": "OUT", "quantity": "15"}, # Only valid after the IN above
+        ]
+        # Lock + one UPDATE + one INSERT, regardless of the number of lines (plus auth/savepoint overhead).
+        with self.assertNumQueries(6):
+            response = self.client.post(url, {"lines": lines}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(len(response.data['transactions']), 4)
+
+        self.item1.refresh_from_db()
+        item2.refresh_from_db()
+        self.assertEqual(self.item1.quantity_on_hand, Decimal("25.00"))
+        self.assertEqual(item2.quantity_on_hand, Decimal("0.00"))
+        self.assertEqual(Decimal(response.data['item_stock_levels'][str(self.item1.pk)]), Decimal("25.00"))
+        self.assertEqual(InventoryTransaction.objects.filter(user=self.api_user).count(), 4)
+
+    def test_batch_posting_is_all_or_nothing(self):
+        url = reverse('inventorytransaction-batch')
+        lines = [
+            {"item": self.item1.pk, "transaction_type": "OUT", "quantity": "30"},
+            {"item": self.item1.pk, "transaction_type": "OUT", "quantity": "30"}, # Exceeds the remaining 20
+            {"item": 999999, "transaction_type": "IN", "quantity": "1"},
+        ]
+        response = self.client.post(url, lines, format='json') # Bare list is accepted too
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data['lines'].keys()), {1, 2})
+
+        self.item1.refresh_from_db()
+        self.assertEqual(self.item1.quantity_on_hand, Decimal("50.00"))
+        self.assertFalse(InventoryTransaction.objects.exists())
+
+    def test_batch_posting_rejects_non_positive_in_out(self):
+        url = reverse('inventorytransaction-batch')
+        response = self.client.post(url, [{"item": self.item1.pk, "transaction_type": "IN", "quantity": "-1"}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('lines', response.data)
+
+    def _post(self, item, transaction_type, quantity):
+        url = reverse('inventorytransaction-list')
+        response = self.client.post(url, {"item": item.pk, "transaction_type": transaction_type, "quantity": quantity}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return response.data['id']
+
+    def test_update_transaction_applies_compensating_delta(self):
+        txn_id = self._post(self.item1, "OUT", "10") # 50 -> 40
+        url = reverse('inventorytransaction-detail', kwargs={'pk': txn_id})
+
+        response = self.client.patch(url, {"quantity": "15"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.item1.refresh_from_db()
+        self.assertEqual(self.item1.quantity_on_hand, Decimal("35.00"))
+
+        response = self.client.patch(url, {"transaction_type": "IN"}, format='json') # OUT 15 -> IN 15
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.item1.refresh_from_db()
+        self.assertEqual(self.item1.quantity_on_hand, Decimal("65.00"))
+
+        response = self.client.patch(url, {"notes": "Relabelled"}, format='json') # No stock effect
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.item1.refresh_from_db()
+        self.assertEqual(self.item1.quantity_on_hand, Decimal("65.00"))
+
+    def test_update_transaction_moving_item_adjusts_both_items(self):
+        item2 = InventoryItem.objects.create(name="Paper", category=self.category)
+        txn_id = self._post(self.item1, "IN", "10") # Pens 50 -> 60
+        url = reverse('inventorytransaction-detail', kwargs={'pk': txn_id})
+        response = self.client.patch(url, {"item": item2.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.item1.refresh_from_db()
+        item2.refresh_from_db()
+        self.assertEqual(self.item1.quantity_on_hand, Decimal("50.00"))
+        self.assertEqual(item2.quantity_on_hand, Decimal("10.00"))
+
+    def test_delete_transaction_reverses_stock(self):
+        txn_id = self._post(self.item1, "OUT", "20") # 50 -> 30
+        response = self.client.delete(reverse('inventorytransaction-detail', kwargs={'pk': txn_id}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.item1.refresh_from_db()
+        self.assertEqual(self.item1.quantity_on_hand, Decimal("50.00"))
+
+    def test_delete_transaction_rejected_if_stock_would_go_negative(self):
+        in_id = self._post(self.item1, "IN", "10") # 50 -> 60
+        self._post(self.item1, "OUT", "55") # 60 -> 5
+        response = self.client.delete(reverse('inventorytransaction-detail', kwargs={'pk': in_id}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(InventoryTransaction.objects.filter(pk=in_id).exists())
+        self.item1.refresh_from_db()
+        self.assertEqual(self.item1.quantity_on_hand, Decimal("5.00"))
+
+
+class ReconcileInventoryCommandTests(APITestCase):
+    def setUp(self):
+        self.items = [InventoryItem.objects.create(name=f"Item {i}") for i in range(5)]
+        for item in self.items:
+            InventoryTransaction.objects.create(item=item, transaction_type=InventoryTransactionType.IN, quantity=Decimal("10"))
+            InventoryTransaction.objects.create(item=item, transaction_type=InventoryTransactionType.OUT, quantity=Decimal("4"))
+        InventoryItem.objects.update(quantity_on_hand=Decimal("6"))
+        # Two items drift: one was never posted to, one was edited behind the ledger's back.
+        InventoryItem.objects.filter(pk=self.items[1].pk).update(quantity_on_hand=Decimal("9"))
+        self.items.append(InventoryItem.objects.create(name="No ledger", quantity_on_hand=Decimal("3")))
+
+    def test_reports_drift_without_fixing(self):
+        out = StringIO()
+        call_command('reconcile_inventory', stdout=out)
+        self.assertIn(f"Item {self.items[1].pk} (Item 1): stored 9.00, ledger 6.00, drift +3.00", out.getvalue())
+        self.assertIn("2 item(s) drifted", out.getvalue())
+        self.assertEqual(InventoryItem.objects.get(pk=self.items[1].pk).quantity_on_hand, Decimal("9.00"))
+
+    def test_fix_resets_to_ledger_balance_with_constant_queries_per_batch(self):
+        # Two batches of three items: lock + grouped SUM + UPDATE each (no query per item), plus the empty final batch.
+        with self.assertNumQueries(2 * 3 + 1 + 3 * 2): # + a savepoint/release pair per batch under the test case transaction
+            call_command('reconcile_inventory', '--fix', '--batch-size', '3', stdout=StringIO())
+        self.assertEqual(
+            list(InventoryItem.objects.order_by('pk').values_list('quantity_on_hand', flat=True)),
+            [Decimal("6.00")] * 5 + [Decimal("0.00")],
+        )
+        out = StringIO()
+        call_command('reconcile_inventory', stdout=out)
+        self.assertIn("All inventory items match their ledger.", out.getvalue())
+
+
+class InventorySnapshotTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auditor', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+        # Opening stock of 50 was set directly (not in the ledger), then:
+        # day-10 IN 10 -> 60, day-5 OUT 5 -> 55, day-2 IN 3 -> 58, today OUT 1 -> 57
+        self.today = timezone.localdate()
+        self.item = InventoryItem.objects.create(name="Blankets", quantity_on_hand=Decimal("57.00"))
+        self.txns = {}
+        for days_ago, ttype, quantity in [(10, "IN", "10"), (5, "OUT", "5"), (2, "IN", "3"), (0, "OUT", "1")]:
+            txn = InventoryTransaction.objects.create(item=self.item, transaction_type=ttype, quantity=Decimal(quantity))
+            noon = timezone.make_aware(datetime.combine(self.today - timedelta(days=days_ago), datetime.min.time()) + timedelta(hours=12))
+            InventoryTransaction.objects.filter(pk=txn.pk).update(transaction_date=noon)
+            self.txns[days_ago] = txn.pk
+
+    def _stock_at(self, days_ago):
+        url = reverse('inventoryitem-stock-at-date', kwargs={'pk': self.item.pk})
+        response = self.client.get(url, {'date': (self.today - timedelta(days=days_ago)).isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def test_stock_at_without_snapshots_rolls_back_from_live_stock(self):
+        data = self._stock_at(3)
+        self.assertEqual(data['quantity_on_hand'], Decimal("55.00"))
+        self.assertIsNone(data['snapshot_date'])
+        self.assertEqual(self._stock_at(0)['quantity_on_hand'], Decimal("57.00"))
+
+    def test_stock_at_uses_nearest_snapshot(self):
+        out = StringIO()
+        call_command('snapshot_inventory', '--date', (self.today - timedelta(days=6)).isoformat(), stdout=out)
+        self.assertIn("Wrote 1 stock snapshot(s)", out.getvalue())
+        snapshot = InventoryStockSnapshot.objects.get(item=self.item)
+        self.assertEqual(snapshot.quantity_on_hand, Decimal("60.00"))
+
+        self.assertEqual(self._stock_at(6)['quantity_on_hand'], Decimal("60.00")) # Exact hit
+        self.assertEqual(self._stock_at(5)['quantity_on_hand'], Decimal("55.00")) # Forward from the snapshot
+        self.assertEqual(self._stock_at(8)['quantity_on_hand'], Decimal("60.00")) # Back from the snapshot
+        data = self._stock_at(12)
+        self.assertEqual(data['quantity_on_hand'], Decimal("50.00"))
+        self.assertEqual(data['snapshot_date'], self.today - timedelta(days=6))
+
+        # Item, two snapshot probes and one ledger aggregate, however long the ledger is (the token is cached).
+        url = reverse('inventoryitem-stock-at-date', kwargs={'pk': self.item.pk})
+        with self.assertNumQueries(4):
+            self.client.get(url, {'date': (self.today - timedelta(days=5)).isoformat()})
+
+    def test_deleting_old_transaction_shifts_later_snapshots(self):
+        call_command('snapshot_inventory', '--date', (self.today - timedelta(days=6)).isoformat(), stdout=StringIO())
+        response = self.client.delete(reverse('inventorytransaction-detail', kwargs={'pk': self.txns[10]}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(InventoryStockSnapshot.objects.get(item=self.item).quantity_on_hand, Decimal("50.00"))
+        self.assertEqual(self._stock_at(8)['quantity_on_hand'], Decimal("50.00"))
+
+    def test_stock_at_requires_valid_date(self):
+        url = reverse('inventoryitem-stock-at-date', kwargs={'pk': self.item.pk})
+        for params in ({}, {'date': 'yesterday'}, {'date': '2024-02-30'}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('date', response.data)
+
+
+class InventoryConcurrencyTests(TransactionTestCase):
+    """
+    Parallel OUT requests against one item. Needs real commits (TransactionTestCase) so that
+    each thread's own database connection sees the others' writes.
+    """
+    WORKERS = 8
+    REQUESTS_PER_WORKER = 10
+
+    @classmethod
+    def setUpClass(cls):
+        # SQLite test databases live in shared memory, where a concurrent writer fails at once
+        # with "table is locked" instead of waiting for the lock. Run this class against a
+        # migrated file database of its own, which every thread's connection opens in turn.
+        cls._database_dir = tempfile.TemporaryDirectory()
+        cls._test_settings = connections.settings[DEFAULT_DB_ALIAS]
+        cls._test_connection = connections[DEFAULT_DB_ALIAS]
+        if cls._test_connection.vendor == 'sqlite':
+            connections.settings[DEFAULT_DB_ALIAS] = {
+                **cls._test_settings, 'NAME': os.path.join(cls._database_dir.name, 'concurrency.sqlite3'),
+            }
+            connections[DEFAULT_DB_ALIAS] = connections.create_connection(DEFAULT_DB_ALIAS)
+            call_command('migrate', verbosity=0, interactive=False)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if connections[DEFAULT_DB_ALIAS] is not cls._test_connection:
+            connections[DEFAULT_DB_ALIAS].close()
+            connections.settings[DEFAULT_DB_ALIAS] = cls._test_settings
+            connections[DEFAULT_DB_ALIAS] = cls._test_connection
+        cls._database_dir.cleanup()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='stress_user', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.item = InventoryItem.objects.create(name="Water bottles", quantity_on_hand=Decimal("30.00"))
+
+    def _fire_out_requests(self, workers):
+        url = reverse('inventorytransaction-list')
+        statuses = []
+        lock = threading.Lock()
+        start = threading.Barrier(workers)
+
+        def worker():
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+            start.wait()
+            try:
+                for _ in range(self.REQUESTS_PER_WORKER):
+                    response = client.post(url, {"item": self.item.pk, "transaction_type": "OUT", "quantity": "1"}, format='json')
+                    with lock:
+                        statuses.append(response.status_code)
+            finally:
+                connection.close() # Each thread has its own connection
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def test_parallel_out_requests_never_drive_stock_negative(self):
+        statuses = self._fire_out_requests(self.WORKERS)
+
+        self.item.refresh_from_db()
+        accepted = statuses.count(status.HTTP_201_CREATED)
+        self.assertEqual(len(statuses), self.WORKERS * self.REQUESTS_PER_WORKER)
+        self.assertEqual(set(statuses) - {status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST}, set())
+        # Exactly the available stock was handed out, and the ledger agrees with quantity_on_hand.
+        self.assertEqual(accepted, 30)
+        self.assertEqual(self.item.quantity_on_hand, Decimal("0.00"))
+        self.assertEqual(InventoryTransaction.objects.filter(item=self.item).count(), accepted)
+
+    def test_stock_check_holds_the_row_for_one_statement(self):
+        # No SELECT ... FOR UPDATE before the write: the check and the decrement are one UPDATE,
+        # so a concurrent OUT waits for at most that statement rather than a read-check-write round trip.
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(apply_stock_delta(self.item.pk, Decimal("-30.00")))
+            self.assertFalse(apply_stock_delta(self.item.pk, Decimal("-1.00")))
+        self.assertEqual(len(queries), 2)
+        for query in queries:
+            self.assertTrue(query['sql'].startswith('UPDATE'), query['sql'])
+            self.assertIn('>=', query['sql'])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity_on_hand, Decimal("0.00"))
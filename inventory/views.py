@@ -1,11 +1,16 @@
-from rest_framework import viewsets, permissions, status
+from rest_framework import viewsets, permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.db import transaction
+from ngo_crm.pagination import KeysetPagination
+from ngo_crm.views import ThrottleScopeMixin
 from .models import InventoryCategory, InventoryItem, InventoryTransaction
 from .serializers import (
     InventoryCategorySerializer, InventoryItemSerializer,
-    InventoryTransactionSerializer
+    InventoryTransactionSerializer, InventoryTransactionBatchSerializer
+)
+from .stock import (
+    apply_stock_deltas, compensating_deltas, locked_ledger_entry, post_transaction_batch, shift_snapshots, stock_at,
 )
 
 class InventoryCategoryViewSet(viewsets.ModelViewSet):
@@ -17,6 +22,11 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
     queryset = InventoryItem.objects.select_related('category').all()
     serializer_class = InventoryItemSerializer
     permission_classes = [permissions.IsAuthenticated] # Adjust
+    filterset_fields = {
+        'category': ['exact', 'in', 'isnull'],
+        'quantity_on_hand': ['gte', 'lte'],
+        'last_stocktake_date': ['gte', 'lte', 'isnull'],
+    }
 
     # quantity_on_hand is read-only in serializer; it's updated by transactions.
     # Creating an item sets initial quantity_on_hand (defaults to 0 or from payload).
@@ -61,7 +71,26 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=True, methods=['get'], url_path='transactions', serializer_class=InventoryTransactionSerializer)
+    @action(detail=True, methods=['get'], url_path='stock-at')
+    def stock_at_date(self, request, pk=None):
+        """
+        Stock at the end of a given day: `?date=YYYY-MM-DD`.
+        Answered from the nearest stock snapshot plus the ledger between it and the date.
+        """
+        inventory_item = self.get_object()
+        try:
+            day = serializers.DateField().run_validation(request.query_params.get('date'))
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({"date": exc.detail})
+        quantity, basis = stock_at(inventory_item, day)
+        return Response({
+            "item": inventory_item.pk,
+            "date": day,
+            "quantity_on_hand": quantity,
+            "snapshot_date": basis, # null when computed back from the live stock level
+        })
+
+    @action(detail=True, methods=['get'], url_path='transactions', serializer_class=InventoryTransactionSerializer, pagination_class=KeysetPagination)
     def list_item_transactions(self, request, pk=None):
         inventory_item = self.get_object()
         transactions = inventory_item.transactions.select_related('user').all().order_by('-transaction_date') # Get all transactions for this item
@@ -75,10 +104,18 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class InventoryTransactionViewSet(viewsets.ModelViewSet):
+class InventoryTransactionViewSet(ThrottleScopeMixin, viewsets.ModelViewSet):
     queryset = InventoryTransaction.objects.select_related('item__category', 'user').all()
     serializer_class = InventoryTransactionSerializer
     permission_classes = [permissions.IsAuthenticated] # Adjust
+    pagination_class = KeysetPagination # Keyed on Meta.ordering: -transaction_date, item
+    filterset_fields = {
+        'transaction_date': ['gte', 'lte'],
+        'item': ['exact', 'in'],
+        'transaction_type': ['exact', 'in'],
+        'quantity': ['gte', 'lte'],
+        'user': ['exact'],
+    }
 
     def perform_create(self, serializer):
         # The serializer's custom create method handles updating InventoryItem.quantity_on_hand atomically.
@@ -86,58 +123,40 @@ class InventoryTransactionViewSet(viewsets.ModelViewSet):
         # 'user' can be set here.
         serializer.save(user=self.request.user if self.request.user.is_authenticated else None)
 
-    # By default, transactions once created should ideally be immutable or have strict rules for updates/deletions,
-    # as they affect stock levels.
-    # A standard ModelViewSet allows PUT/PATCH/DELETE.
-    # Considerations:
-    # - Updating a transaction: Should it reverse the old effect and apply the new? Complex.
-    # - Deleting a transaction: Should it reverse its effect on stock? Complex.
-    # For simplicity, this basic ViewSet allows these operations.
-    # In a real system, you might disable update/delete or have very controlled processes (e.g., "reversal" transactions).
-
-    def perform_update(self, serializer):
-        # Updating a transaction is tricky. The current serializer doesn't handle reversing old stock impact.
-        # This will just save the transaction changes. Stock levels might become inconsistent if not handled carefully.
-        # For now, we'll rely on the user being careful or disabling updates.
-        # A better approach for updates:
-        # 1. Get original transaction quantity & type.
-        # 2. Lock item.
-        # 3. Reverse original transaction's effect on item.quantity_on_hand.
-        # 4. Apply new transaction's effect based on updated data.
-        # 5. Save item and transaction.
-        # This is complex. The current serializer.update() is default and won't do this.
-        # The InventoryTransactionSerializer does not have a custom update() method.
-        # For now, updates are "at your own risk" regarding stock consistency unless custom logic is added.
-        serializer.save()
-
+    @action(detail=False, methods=['post'], url_path='batch', serializer_class=InventoryTransactionBatchSerializer, throttle_scope='bulk')
+    def batch(self, request):
+        """
+        Post many transactions at once, all-or-nothing.
+        Body: {"lines": [{"item", "transaction_type", "quantity", "notes"}, ...]} or the bare list.
+        Each affected item is locked once and updated with a single UPDATE (see inventory.stock).
+        """
+        data = {'lines': request.data} if isinstance(request.data, list) else request.data
+        serializer = InventoryTransactionBatchSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        created, stock_levels = post_transaction_batch(
+            serializer.validated_data['lines'],
+            user=request.user if request.user.is_authenticated else None,
+        )
+        return Response({
+            "transactions": InventoryTransactionSerializer(created, many=True, context={'request': request}).data,
+            "item_stock_levels": {str(pk): str(qoh) for pk, qoh in stock_levels.items()},
+        }, status=status.HTTP_201_CREATED)
+
+    # Transactions form the stock ledger, so edits and deletions are reversible:
+    # InventoryTransactionSerializer.update() and perform_destroy() apply compensating deltas to
+    # InventoryItem.quantity_on_hand in the same database transaction as the ledger change.
+    # An edit/delete that would leave an item with negative stock is rejected with a 400.
+    # `python manage.py reconcile_inventory` checks (and with --fix repairs) any remaining drift.
 
     def perform_destroy(self, instance):
-        # Similar to update, deleting a transaction should ideally reverse its stock impact.
-        # This is also complex and not handled by default.
-        # For now, deleting a transaction does *not* auto-adjust stock.
-        # Custom logic needed for that.
-
-        # Example of how one might try to reverse stock impact (simplified, needs care):
-        # item = instance.item
-        # quantity = instance.quantity
-        # ttype = instance.transaction_type
-        # with transaction.atomic():
-        #     locked_item = InventoryItem.objects.select_for_update().get(pk=item.pk)
-        #     if ttype == 'IN':
-        #         locked_item.quantity_on_hand -= quantity
-        #     elif ttype == 'OUT':
-        #         locked_item.quantity_on_hand += quantity
-        #     elif ttype == 'ADJ': # If ADJ quantity was the delta
-        #         locked_item.quantity_on_hand -= quantity # Reverse the delta
-        #     # Add checks for negative stock if applicable
-        #     if locked_item.quantity_on_hand < 0:
-        #         # This indicates a problem, log it or prevent deletion if it causes negative stock
-        #         # For now, allow it for simplicity of example
-        #         pass
-        #     locked_item.save()
-        #     instance.delete() # Now delete the transaction
-        # This is non-trivial. For now, default behavior (just delete transaction, no stock change).
-        instance.delete()
+        with transaction.atomic():
+            entry = locked_ledger_entry(instance.pk)
+            if entry is None: # Already deleted (and compensated) by a concurrent request
+                return
+            deltas = compensating_deltas(entry)
+            apply_stock_deltas(deltas)
+            shift_snapshots(deltas, since=instance.transaction_date)
+            instance.delete()
 
 
 # InventoryItemSerializer:
@@ -151,4 +170,4 @@ class InventoryTransactionViewSet(viewsets.ModelViewSet):
 # - `user_id`: Writable PK to User.
 # - `create()` method updates `item.quantity_on_hand` atomically.
 # - `validate()` method checks stock for OUT/negative ADJ.
-# - Update/Delete of transactions via ModelViewSet does NOT currently adjust stock levels. This is a known simplification.Tool output for `overwrite_file_with_block`:
+# - `update()` and `perform_destroy` apply compensating stock deltas, keeping the ledger and stock in step.Tool output for `overwrite_file_with_block`:
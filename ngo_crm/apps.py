@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class NgoCrmConfig(AppConfig):
+    """Project-wide wiring that belongs to no single app."""
+    name = "ngo_crm"
+
+    def ready(self):
+        # Let RequestMetricsMiddleware time serializer.data as well as rendering.
+        from .instrumentation import time_serializers
+        time_serializers()
+
+        # Count donations, inventory transactions and hours logs for /metrics (ngo_crm/metrics.py).
+        from .metrics import connect_domain_metric_signals
+        connect_domain_metric_signals()
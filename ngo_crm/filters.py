@@ -0,0 +1,181 @@
+"""
+Project-wide filter backends for list endpoints (see DEFAULT_FILTER_BACKENDS in settings).
+
+    ?donation_date__gte=2024-01-01&donation_date__lte=2024-03-31
+    ?campaign=3  ?campaign__in=3,4  ?campaign__isnull=true  ?donation_type=MON  ?amount__gte=100
+    ?ordering=-donation_date,donor_contact
+    ?fields=id,amount,donor_contact
+
+FieldFilterBackend applies the lookups a view lists in ``filterset_fields``
+({field name: [lookups]}). Values are parsed by the model field, and a bad one
+is a 400 rather than a silently unfiltered list.
+
+IndexedOrderingFilter only sorts on indexed columns, so a client-chosen order
+never turns into a sort of the whole table. Under KeysetPagination, nullable
+columns are excluded because the cursor cannot seek past NULLs.
+
+SparseFieldsetFilter narrows the SELECT to the columns and joins that the
+?fields= selection reads (QuerySet.only()); see DynamicFieldsMixin.model_field_paths.
+"""
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import models
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from .pagination import KeysetPagination
+from .serializers import query_param_list
+
+MAX_IN_VALUES = 100
+BOOLEAN_VALUES = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+
+
+def parse_bool(raw):
+    try:
+        return BOOLEAN_VALUES[raw.strip().lower()]
+    except KeyError:
+        raise DjangoValidationError("Enter true or false.")
+
+
+class FieldFilterBackend(BaseFilterBackend):
+    """
+    Filter on ``view.filterset_fields``, e.g. {'donation_date': ['gte', 'lte'], 'campaign': ['exact', 'in']}.
+    The query parameter is the field name for 'exact' and ``<field>__<lookup>`` otherwise.
+    Foreign keys are filtered by id on their own column, without a join.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        filterset_fields = getattr(view, 'filterset_fields', None)
+        if not filterset_fields:
+            return queryset
+        filters, errors = {}, {}
+        for name, lookups in filterset_fields.items():
+            field = queryset.model._meta.get_field(name)
+            for lookup in lookups:
+                param = name if lookup == 'exact' else f'{name}__{lookup}'
+                if param not in request.query_params:
+                    continue
+                try:
+                    filters[f'{field.attname}__{lookup}'] = self.parse_value(field, lookup, request.query_params[param])
+                except DjangoValidationError as exc:
+                    errors[param] = exc.messages
+        if errors:
+            raise serializers.ValidationError(errors)
+        return queryset.filter(**filters)
+
+    def parse_value(self, field, lookup, raw):
+        if lookup == 'isnull':
+            return parse_bool(raw)
+        if lookup == 'in':
+            values = [value.strip() for value in raw.split(',') if value.strip()]
+            if len(values) > MAX_IN_VALUES:
+                raise DjangoValidationError(f"Give at most {MAX_IN_VALUES} values.")
+            return [self.parse_value(field, 'exact', value) for value in values]
+
+        target = field.target_field if field.is_relation else field
+        if isinstance(target, models.BooleanField):
+            return parse_bool(raw)
+        value = target.to_python(raw)
+        if value is None or value == '':
+            raise DjangoValidationError("Enter a value.")
+        if field.choices and value not in dict(field.flatchoices):
+            raise DjangoValidationError(f"Select a valid choice. {value} is not one of the available choices.")
+        if isinstance(target, models.DateTimeField) and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+
+def indexed_columns(model):
+    """Fields a database index can return in order: the primary key, unique and indexed fields (FKs included) and the leading column of each Meta index."""
+    names = {model._meta.pk.name}
+    for field in model._meta.concrete_fields:
+        if field.unique or field.db_index:
+            names.add(field.name)
+    for index in model._meta.indexes:
+        if index.fields and index.condition is None:
+            names.add(index.fields[0].lstrip('-'))
+    for fields in model._meta.unique_together:
+        names.add(fields[0])
+    return names
+
+
+class IndexedOrderingFilter(OrderingFilter):
+    """
+    ?ordering= restricted to ``view.ordering_fields`` (default: the model's indexed columns).
+    Unknown names are a 400. Foreign keys sort by their id column, and the primary key
+    is appended as a tie-breaker so pages stay stable.
+    """
+
+    def get_orderable_fields(self, queryset, view):
+        """{public name: column} of the fields this view may be ordered by."""
+        model = queryset.model
+        names = getattr(view, 'ordering_fields', None) or indexed_columns(model)
+        keyset = isinstance(getattr(view, 'paginator', None), KeysetPagination)
+        orderable = {}
+        for name in names:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if not field.concrete or (keyset and field.null):
+                continue
+            orderable[name] = field.attname
+        return orderable
+
+    def get_valid_fields(self, queryset, view, context={}):
+        return [(name, name) for name in sorted(self.get_orderable_fields(queryset, view))]
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if not params:
+            return self.get_default_ordering(view)
+        orderable = self.get_orderable_fields(queryset, view)
+        ordering, invalid = [], []
+        for term in (term.strip() for term in params.split(',')):
+            name = term.lstrip('-')
+            if not name:
+                continue
+            if name not in orderable:
+                invalid.append(name)
+                continue
+            ordering.append(f"{'-' if term.startswith('-') else ''}{orderable[name]}")
+        if invalid:
+            raise serializers.ValidationError({self.ordering_param: [
+                f"Cannot order by {', '.join(invalid)}. Choose from: {', '.join(sorted(orderable))}."
+            ]})
+        pk = queryset.model._meta.pk
+        if ordering and not any(term.lstrip('-') in ('pk', pk.name, pk.attname) for term in ordering):
+            ordering.append(f"{'-' if ordering[-1].startswith('-') else ''}pk")
+        return ordering
+
+
+class SparseFieldsetFilter(BaseFilterBackend):
+    """
+    On list and retrieve requests with ?fields=, load only what the selected fields read:
+    QuerySet.only() on their columns, and select_related() trimmed to the joins they use.
+    Needs a serializer with DynamicFieldsMixin; anything it cannot trace is loaded in full.
+    """
+    actions = ('list', 'retrieve')
+
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, 'action', None) not in self.actions or not query_param_list(request, 'fields'):
+            return queryset
+        serializer = view.get_serializer()
+        if not hasattr(serializer, 'model_field_paths'):
+            return queryset
+        query = queryset.query
+        joined = query.select_related if isinstance(query.select_related, dict) else {}
+        paths = serializer.model_field_paths(queryset.model, joined, query.annotations)
+        if paths is None:
+            return queryset
+
+        # The pagination reads the ordering columns off each row (KeysetPagination builds its cursor from them).
+        for term in query.order_by or queryset.model._meta.ordering:
+            if isinstance(term, str) and '__' not in term and term.lstrip('-') != 'pk':
+                paths.add(queryset.model._meta.get_field(term.lstrip('-')).name)
+        joins = {path.rsplit('__', 1)[0] for path in paths if '__' in path}
+        if isinstance(query.select_related, dict):
+            queryset = queryset.select_related(None)
+            if joins:
+                queryset = queryset.select_related(*joins)
+        return queryset.only(*paths)
@@ -0,0 +1,185 @@
+"""
+Per-request instrumentation (RequestMetricsMiddleware, first in MIDDLEWARE).
+
+For every request it records:
+
+* the number of SQL queries and the time spent in them, through a database
+  execute_wrapper (no DEBUG query log needed);
+* the time spent building ``serializer.data`` (to_representation, including the
+  lazy related queries it runs) and how many of the queries ran meanwhile;
+* the time spent rendering the response body (the serializer's output to JSON,
+  CSV, ...);
+* the total time through the middleware stack.
+
+These are sent back in a Server-Timing header (shown in the browser's network
+panel), kept on ``request.metrics`` for anything further down the line, and
+added to the /metrics histograms (ngo_crm/metrics.py).
+
+A request is logged as one JSON line on the ``ngo_crm.requests`` logger when it
+is slower than REQUEST_SLOW_MS, runs more than REQUEST_MAX_QUERIES queries, or
+runs the same SQL statement REQUEST_REPEATED_QUERY_THRESHOLD times or more. The
+last is the shape of an N+1: Django hands the wrapper the statement with
+placeholders, so one query per row repeats exactly the same SQL. Log lines name
+the view that handled the request, e.g. "DonationViewSet.list" or
+"ProjectViewSet.tasks_list_create".
+
+Serializer time is measured by timing the ``data`` property of DRF's Serializer
+and ListSerializer (installed by ngo_crm.apps.NgoCrmConfig), for serializers
+whose context carries the request.
+
+The cost per query is a perf_counter() pair and a dict increment, so the
+middleware is meant to stay on in production. Streaming responses (exports) are
+measured up to the start of the stream.
+"""
+import json
+import logging
+from collections import Counter
+from contextlib import ExitStack
+from functools import wraps
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import ListSerializer, Serializer
+
+from .metrics import observe_request
+
+logger = logging.getLogger('ngo_crm.requests')
+
+
+class QueryRecorder:
+    """Database execute_wrapper counting and timing queries, and counting repeats of each statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated(self, threshold):
+        """[(sql, times run)] for statements run at least ``threshold`` times, most repeated first."""
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = QueryRecorder()
+        self.serializing = False
+        self.serialize_duration = 0.0
+        self.serialize_queries = 0
+        self.render_started = None
+        self.render_duration = 0.0
+        self.duration = 0.0
+        self.view = None
+
+    def render_finished(self, response):
+        self.render_duration = perf_counter() - self.render_started
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.queries.duration * 1000:.1f};desc="{self.queries.count} queries"',
+            f'serialize;dur={self.serialize_duration * 1000:.1f};desc="{self.serialize_queries} queries"',
+            f'render;dur={self.render_duration * 1000:.1f}',
+            f'total;dur={self.duration * 1000:.1f}',
+        ])
+
+
+def timed_serializer_data(data):
+    """Wrap a serializer ``data`` getter to add its time and queries to the request's metrics."""
+    @wraps(data)
+    def timed(serializer):
+        metrics = getattr(serializer.context.get('request'), 'metrics', None)
+        if metrics is None or metrics.serializing: # Nested serializers are part of the outer one's time
+            return data(serializer)
+        metrics.serializing = True
+        start, queries = perf_counter(), metrics.queries.count
+        try:
+            return data(serializer)
+        finally:
+            metrics.serialize_duration += perf_counter() - start
+            metrics.serialize_queries += metrics.queries.count - queries
+            metrics.serializing = False
+    timed.timed_serializer = True
+    return timed
+
+
+def time_serializers():
+    for serializer_class in (Serializer, ListSerializer):
+        data = serializer_class.__dict__['data']
+        if not getattr(data.fget, 'timed_serializer', False):
+            serializer_class.data = property(timed_serializer_data(data.fget))
+
+
+def view_name(request):
+    """"ViewClass.action" for DRF viewsets, "ViewClass.method" for other class-based views."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    func = match.func
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if view_class is None:
+        return f'{func.__module__}.{func.__qualname__}'
+    method = request.method.lower()
+    action = (getattr(func, 'actions', None) or {}).get(method, method)
+    return f'{view_class.__name__}.{action}'
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = perf_counter()
+        request.metrics = metrics = RequestMetrics()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics.queries))
+            response = self.get_response(request)
+        metrics.duration = perf_counter() - start
+        metrics.view = view_name(request)
+
+        if settings.REQUEST_SERVER_TIMING:
+            response['Server-Timing'] = metrics.server_timing()
+        self.log(request, response, metrics)
+        observe_request(request, response, metrics)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time it from here to the post-render callback.
+        request.metrics.render_started = perf_counter()
+        response.add_post_render_callback(request.metrics.render_finished)
+        return response
+
+    def log(self, request, response, metrics):
+        flags = []
+        if metrics.duration * 1000 >= settings.REQUEST_SLOW_MS:
+            flags.append('slow')
+        if metrics.queries.count > settings.REQUEST_MAX_QUERIES:
+            flags.append('queries')
+        repeated = metrics.queries.repeated(settings.REQUEST_REPEATED_QUERY_THRESHOLD)
+        if repeated:
+            flags.append('n_plus_one')
+        if not flags:
+            return
+        logger.warning(json.dumps({
+            'flags': flags,
+            'method': request.method,
+            'path': request.path,
+            'view': metrics.view,
+            'status': response.status_code,
+            'total_ms': round(metrics.duration * 1000, 1),
+            'db_ms': round(metrics.queries.duration * 1000, 1),
+            'queries': metrics.queries.count,
+            'serialize_ms': round(metrics.serialize_duration * 1000, 1),
+            'serialize_queries': metrics.serialize_queries,
+            'render_ms': round(metrics.render_duration * 1000, 1),
+            'repeated_queries': [{'count': count, 'sql': sql[:500]} for sql, count in repeated[:5]],
+        }))
@@ -0,0 +1,301 @@
+"""
+Prometheus metrics, served at /metrics in the text exposition format.
+
+    ngo_crm_http_requests_total{route,method,status}       requests, by URL name ("donation-list")
+    ngo_crm_http_request_duration_seconds{route,method}    latency histogram
+    ngo_crm_db_queries_per_request{route}                  query count histogram
+    ngo_crm_db_duration_seconds{route}                     SQL time per request histogram
+    ngo_crm_cache_requests_total{cache,result}             cache lookups, result "hit" or "miss"
+    ngo_crm_donations_created_total{donation_type}
+    ngo_crm_inventory_transactions_posted_total{transaction_type}
+    ngo_crm_volunteer_hours_logged_total                   hours, and
+    ngo_crm_volunteer_hours_logs_total                     log entries
+
+Routes are the URL names the routers in */urls.py give each endpoint; requests
+that match no URL are counted under "unmatched". Request and database figures
+come from RequestMetricsMiddleware (ngo_crm/instrumentation.py).
+
+Each process keeps its samples in plain dicts and takes a short in-process
+lock per update; nothing is shared between processes at request time. With
+several worker processes set METRICS_DIR (NGO_CRM_METRICS_DIR) to a directory
+they can all write: each process then writes a snapshot of its own samples to
+its own file there, at most once every METRICS_FLUSH_INTERVAL seconds, and
+/metrics adds up every file. Files of processes that have exited are kept, so
+totals never go backwards while workers are recycled; empty the directory when
+the application is (re)deployed. A worker that crashes loses at most its last
+flush interval.
+"""
+import atexit
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.http import HttpResponse
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class Registry:
+    """
+    Samples of this process, {(metric name, label values): value}, where a histogram's
+    value is [count per bucket (the last is +Inf), sum].
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.filename = None
+        self.last_flush = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def _check_fork(self):
+        # A forked worker starts from the parent's samples, which the parent reports itself.
+        if os.getpid() != self.pid:
+            self.pid, self.filename = os.getpid(), None
+            self.samples = {}
+
+    def add(self, key, amount):
+        with self.lock:
+            self._check_fork()
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    def observe(self, key, bucket, value, buckets):
+        with self.lock:
+            self._check_fork()
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = [0] * (buckets + 1) + [0.0]
+            sample[bucket] += 1
+            sample[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            self._check_fork()
+            return [[name, list(labels), value if isinstance(value, (int, float)) else list(value)]
+                    for (name, labels), value in self.samples.items()]
+
+    def flush(self):
+        """Write this process's samples to its file in METRICS_DIR (if set), replacing it atomically."""
+        directory = settings.METRICS_DIR
+        self.last_flush = time.monotonic()
+        if not directory:
+            return
+        samples = self.snapshot()
+        if self.filename is None:
+            self.filename = f'{self.pid}-{uuid4().hex[:8]}.json'
+        path = Path(directory) / self.filename
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(samples))
+        os.replace(temporary, path)
+
+    def maybe_flush(self):
+        if settings.METRICS_DIR and time.monotonic() - self.last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def collect(self):
+        """{(name, labels): value} over every process: this one, plus all files in METRICS_DIR."""
+        directory = settings.METRICS_DIR
+        if not directory:
+            return {(name, tuple(labels)): value for name, labels, value in self.snapshot()}
+        self.flush()
+        merged = {}
+        for path in Path(directory).glob('*.json'):
+            try:
+                samples = json.loads(path.read_text())
+            except (OSError, ValueError): # Removed while being read (a deploy emptying the directory)
+                continue
+            for name, labels, value in samples:
+                key = (name, tuple(labels))
+                if isinstance(value, list):
+                    total = merged.setdefault(key, [0] * len(value))
+                    if len(total) == len(value):
+                        merged[key] = [a + b for a, b in zip(total, value)]
+                else:
+                    merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def render(self):
+        """The Prometheus text exposition of every registered metric."""
+        samples = self.collect()
+        by_metric = {}
+        for (name, labels), value in sorted(samples.items()):
+            by_metric.setdefault(name, []).append((labels, value))
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels, value in by_metric.get(name, []):
+                lines.extend(metric.sample_lines(labels, value))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+atexit.register(lambda: REGISTRY.flush() if settings.METRICS_DIR else None)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        registry.register(self)
+
+    def key(self, labels):
+        return (self.name, tuple(str(labels[name]) for name in self.labelnames))
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount:
+            self.registry.add(self.key(labels), amount)
+
+    def sample_lines(self, labels, value):
+        return [f'{self.name}{_format_labels(list(zip(self.labelnames, labels)))} {_format_value(value)}']
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        # Bucket i counts values <= buckets[i] (and above the bucket before); the last one is +Inf.
+        self.registry.observe(self.key(labels), bisect_left(self.buckets, value), value, len(self.buckets))
+
+    def sample_lines(self, labels, value):
+        pairs = list(zip(self.labelnames, labels))
+        counts, total = value[:-1], value[-1]
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{_format_labels(pairs + [("le", _format_value(bound))])} {_format_value(cumulative)}')
+        lines.append(f'{self.name}_sum{_format_labels(pairs)} {_format_value(total)}')
+        lines.append(f'{self.name}_count{_format_labels(pairs)} {_format_value(cumulative)}')
+        return lines
+
+
+HTTP_REQUESTS = Counter('ngo_crm_http_requests_total', 'Requests handled, by URL name, method and status code.', ['route', 'method', 'status'])
+HTTP_LATENCY = Histogram('ngo_crm_http_request_duration_seconds', 'Request latency through the middleware stack.', ['route', 'method'])
+DB_QUERIES = Histogram('ngo_crm_db_queries_per_request', 'SQL queries run per request.', ['route'], buckets=QUERY_COUNT_BUCKETS)
+DB_DURATION = Histogram('ngo_crm_db_duration_seconds', 'Time spent in SQL queries per request.', ['route'])
+CACHE_REQUESTS = Counter('ngo_crm_cache_requests_total', 'Cache lookups, by cache and result (hit or miss).', ['cache', 'result'])
+DONATIONS_CREATED = Counter('ngo_crm_donations_created_total', 'Donations recorded.', ['donation_type'])
+INVENTORY_TRANSACTIONS_POSTED = Counter('ngo_crm_inventory_transactions_posted_total', 'Inventory transactions posted.', ['transaction_type'])
+VOLUNTEER_HOURS_LOGGED = Counter('ngo_crm_volunteer_hours_logged_total', 'Volunteer hours logged.')
+VOLUNTEER_HOURS_LOGS = Counter('ngo_crm_volunteer_hours_logs_total', 'Volunteer hours log entries created.')
+
+
+def observe_request(request, response, metrics):
+    """Record a finished request (see RequestMetricsMiddleware)."""
+    match = getattr(request, 'resolver_match', None)
+    route = (match.view_name if match else None) or 'unmatched'
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    HTTP_LATENCY.observe(metrics.duration, route=route, method=request.method)
+    DB_QUERIES.observe(metrics.queries.count, route=route)
+    DB_DURATION.observe(metrics.queries.duration, route=route)
+    REGISTRY.maybe_flush()
+
+
+def record_cache_lookups(cache, hits=0, misses=0):
+    CACHE_REQUESTS.inc(hits, cache=cache, result='hit')
+    CACHE_REQUESTS.inc(misses, cache=cache, result='miss')
+
+
+def record_donations_created(donations):
+    # Counted once the rows are committed, so rolled-back writes never show up.
+    types = [donation.donation_type for donation in donations]
+    transaction.on_commit(lambda: [DONATIONS_CREATED.inc(donation_type=donation_type) for donation_type in types])
+
+
+def record_inventory_transactions_posted(transactions):
+    types = [entry.transaction_type for entry in transactions]
+    transaction.on_commit(lambda: [INVENTORY_TRANSACTIONS_POSTED.inc(transaction_type=kind) for kind in types])
+
+
+def record_hours_logged(logs):
+    hours = [float(log.hours_worked) for log in logs]
+    def record():
+        VOLUNTEER_HOURS_LOGGED.inc(sum(hours))
+        VOLUNTEER_HOURS_LOGS.inc(len(hours))
+    transaction.on_commit(record)
+
+
+def _on_created(record):
+    def receiver(sender, instance, created=False, raw=False, **kwargs):
+        if created and not raw:
+            record([instance])
+    return receiver
+
+
+count_created_donation = _on_created(record_donations_created)
+count_created_inventory_transaction = _on_created(record_inventory_transactions_posted)
+count_created_hours_log = _on_created(record_hours_logged)
+
+
+def count_bulk_created_donations(sender, instances, **kwargs):
+    record_donations_created(instances)
+
+
+def connect_domain_metric_signals():
+    """Count donations, inventory transactions and hours logs as they are created, however that happens."""
+    from donations.models import Donation
+    from donations.signals import donations_bulk_created
+    from inventory.models import InventoryTransaction
+    from projects.models import VolunteerHoursLog
+
+    post_save.connect(count_created_donation, sender=Donation, dispatch_uid='metrics.donations')
+    donations_bulk_created.connect(count_bulk_created_donations, dispatch_uid='metrics.bulk_donations')
+    post_save.connect(count_created_inventory_transaction, sender=InventoryTransaction, dispatch_uid='metrics.inventory_transactions')
+    post_save.connect(count_created_hours_log, sender=VolunteerHoursLog, dispatch_uid='metrics.hours_logs')
+    # post_transaction_batch (inventory/stock.py) inserts with bulk_create and records its rows itself.
+
+
+def metrics_view(request):
+    """
+    GET /metrics. Scrapers must send `Authorization: Bearer <METRICS_TOKEN>`. Without a
+    METRICS_TOKEN the endpoint is only open with DEBUG on, since it lists every route and its volume.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        sent = request.headers.get('Authorization', '').encode()
+        allowed = hmac.compare_digest(sent, f'Bearer {token}'.encode())
+    else:
+        allowed = settings.DEBUG
+    if not allowed:
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
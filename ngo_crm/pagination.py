@@ -0,0 +1,180 @@
+"""
+Project-wide pagination classes.
+
+StandardResultsSetPagination is the default (see REST_FRAMEWORK in settings).
+KeysetPagination is meant for large, append-heavy tables (donations, inventory
+transactions, hours logs): it seeks straight to the next page using the
+queryset's ordering columns, so page 1000 costs the same as page 1 and no
+COUNT(*) is ever run.
+"""
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """Page-number pagination; clients may pick ?page_size= up to API_MAX_PAGE_SIZE."""
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on every column of the queryset's ordering (by default
+    the model's Meta.ordering, e.g. `-donation_date, -created_at`), with the primary
+    key appended as a tie-breaker. The opaque ``cursor`` parameter holds the ordering
+    values of the last (or first) row of the current page.
+
+    Ordering columns must be concrete, non-nullable fields of the model itself.
+    """
+    cursor_query_param = 'cursor'
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering(self, queryset):
+        """
+        Return [(field, descending)] for the queryset ordering, resolving foreign keys
+        to their `_id` column and appending the primary key if it is not already there.
+        """
+        model = queryset.model
+        ordering = list(queryset.query.order_by or model._meta.ordering)
+        resolved = []
+        for item in ordering:
+            if not isinstance(item, str) or '__' in item or item == '?':
+                raise ImproperlyConfigured(
+                    f"KeysetPagination cannot order {model.__name__} by {item!r}; use plain model fields."
+                )
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            if name == 'pk':
+                field = model._meta.pk
+            else:
+                try:
+                    field = model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    raise ImproperlyConfigured(f"{model.__name__} has no field {name!r} to paginate on.")
+            resolved.append((field, descending))
+        if not any(field.primary_key for field, _ in resolved):
+            resolved.append((model._meta.pk, resolved[0][1] if resolved else False))
+        return resolved
+
+    def encode_cursor(self, values, reverse):
+        payload = {'v': [value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in values]}
+        if reverse:
+            payload['r'] = 1
+        return b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request, ordering):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            raw_values = payload['v']
+            if len(raw_values) != len(ordering):
+                raise ValueError
+            values = [field.to_python(value) for (field, _), value in zip(ordering, raw_values)]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, bool(payload.get('r'))
+
+    @staticmethod
+    def seek_filter(ordering, values, reverse):
+        """
+        Rows strictly after (or, when ``reverse``, before) ``values`` in ``ordering``:
+        (a > va) OR (a = va AND b > vb) OR ... with each comparison flipped for
+        descending columns.
+        """
+        condition = Q()
+        equal_so_far = Q()
+        for (field, descending), value in zip(ordering, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal_so_far & Q(**{f'{field.attname}__{lookup}': value})
+            equal_so_far &= Q(**{field.attname: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        cursor_values, self.reverse = self.decode_cursor(request, self.ordering)
+
+        order_by = [
+            f"{'-' if descending != self.reverse else ''}{field.attname}"
+            for field, descending in self.ordering
+        ]
+        queryset = queryset.order_by(*order_by)
+        if cursor_values is not None:
+            queryset = queryset.filter(self.seek_filter(self.ordering, cursor_values, self.reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        # Moving backwards we know there is a next page (we came from it), and vice versa.
+        if self.reverse:
+            self.has_next, self.has_previous = cursor_values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor_values is not None
+        self.page = rows
+        return rows
+
+    def _row_values(self, row):
+        return [getattr(row, field.attname) for field, _ in self.ordering]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        cursor = self.encode_cursor(self._row_values(self.page[-1]), reverse=False)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        cursor = self.encode_cursor(self._row_values(self.page[0]), reverse=True)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
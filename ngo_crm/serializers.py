@@ -0,0 +1,107 @@
+"""
+Shared serializer helpers for shaping API responses with query parameters.
+
+    ?fields=id,name      only return these top-level fields (read requests only)
+    ?expand=notes        include heavy nested fields listed in Meta.expandable_fields
+
+Heavy nested data is therefore opt-in, and views can skip the matching
+prefetches when it is not requested (see ngo_crm.views.ExpandablePrefetchMixin).
+The columns behind a ?fields= selection are reported by model_field_paths, which
+SparseFieldsetFilter (ngo_crm.filters) uses to trim the SELECT itself.
+"""
+import re
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+DISPLAY_METHOD = re.compile(r'get_(\w+)_display')
+
+
+def query_param_list(request, name):
+    """Return the comma-separated values of query parameter ``name`` as a set."""
+    if request is None:
+        return set()
+    raw = request.query_params.get(name, '')
+    return {value.strip() for value in raw.split(',') if value.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    ModelSerializer mixin implementing ``?fields=`` and ``?expand=``.
+    Only the top-level serializer of a response is shaped; nested serializers
+    always drop their expandable fields.
+    """
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        is_root = self._is_root()
+
+        expand = query_param_list(request, 'expand') if is_root else set()
+        for name in getattr(self.Meta, 'expandable_fields', ()):
+            if name not in expand:
+                fields.pop(name, None)
+
+        # Never trim fields on writes: the serializer still has to accept the payload.
+        if is_root and request is not None and request.method in ('GET', 'HEAD', 'OPTIONS'):
+            requested = query_param_list(request, 'fields')
+            if requested:
+                for name in list(fields):
+                    if name not in requested:
+                        fields.pop(name)
+        return fields
+
+    def model_field_paths(self, model, select_related, annotations=()):
+        """
+        The QuerySet.only() paths of the columns this serializer's fields read, following
+        the relations in ``select_related`` (a Query.select_related dict) into nested
+        serializers. Returns None when a field reads something other than model fields
+        (a method or property), as the row must then be loaded in full.
+        """
+        return _field_paths(self, model, select_related, annotations)
+
+
+def _field_paths(serializer, model, select_related, annotations=(), prefix=''):
+    paths = set()
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            return None
+        current, joined, path = model, select_related, prefix
+        for position, attr in enumerate(field.source_attrs):
+            display = DISPLAY_METHOD.fullmatch(attr)
+            attr = display.group(1) if display else attr # get_status_display reads status
+            if not prefix and position == 0 and attr in annotations:
+                break
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return None
+            if model_field.one_to_many or model_field.many_to_many:
+                break # Prefetched separately; only the primary key is needed
+            path += attr
+            if not model_field.is_relation:
+                paths.add(path)
+                break
+            if attr not in joined: # Not joined: its own column is all that can be loaded
+                if model_field.concrete:
+                    paths.add(path)
+                break
+            current, joined = model_field.related_model, joined[attr]
+            paths.add(f'{path}__{current._meta.pk.name}')
+            if position == len(field.source_attrs) - 1:
+                if isinstance(field, serializers.BaseSerializer):
+                    nested = _field_paths(field, current, joined, prefix=f'{path}__')
+                    if nested is None:
+                        return None
+                    paths |= nested
+                break
+            path += '__'
+    return paths
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
+from django.conf import global_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -25,6 +29,9 @@ SECRET_KEY = "django-insecure-_p41h38fg6ydmq6(xxe&q*p(+0szz604()b@v8kic(&b5vwvf%
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# True under `manage.py test`.
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = []
 
 
@@ -38,7 +45,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "rest_framework",
-    "rest_framework.authtoken", # Added for token authentication
+    "rest_framework.authtoken", # Old tokens table; users.0001 copies its tokens into users.Token
     "contacts",
     "volunteers",
     "projects",
@@ -46,9 +53,12 @@ INSTALLED_APPS = [
     "fundraising",
     "inventory",
     "reports", # Added reports app
+    "users",
+    "ngo_crm", # Project-wide instrumentation and metrics (ngo_crm/apps.py)
 ]
 
 MIDDLEWARE = [
+    "ngo_crm.instrumentation.RequestMetricsMiddleware", # First, so its total covers every other middleware
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -85,18 +95,145 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3", # Using SQLite for now
+        # Seconds a writer waits for another's lock before failing with "database is locked".
+        "OPTIONS": {"timeout": 20},
     }
 }
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication', # Useful for browsable API
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication', # TokenAuthentication with a cache; see below
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated', # Default to requiring authentication
-    ]
+    ],
+    # Page-number pagination everywhere; large append-heavy tables opt in to
+    # ngo_crm.pagination.KeysetPagination on their viewsets.
+    'DEFAULT_PAGINATION_CLASS': 'ngo_crm.pagination.StandardResultsSetPagination',
+    'PAGE_SIZE': int(os.environ.get('NGO_CRM_PAGE_SIZE', 50)),
+    # Field filters (each viewset's filterset_fields), ?ordering= on indexed columns and
+    # ?fields= column trimming, in that order. See ngo_crm/filters.py.
+    'DEFAULT_FILTER_BACKENDS': [
+        'ngo_crm.filters.FieldFilterBackend',
+        'ngo_crm.filters.IndexedOrderingFilter',
+        'ngo_crm.filters.SparseFieldsetFilter',
+    ],
+    # Sliding-window counters per user (or IP address) and scope; see ngo_crm/throttling.py.
+    'DEFAULT_THROTTLE_CLASSES': [
+        'ngo_crm.throttling.ScopedRateThrottle',
+    ],
+}
+
+# Throttle rates as 'requests/period' (s, m, h or d). Views pick a scope with throttle_scope
+# (per view, or per @action); everything else is 'crud'. Override a rate with
+# NGO_CRM_THROTTLE_<SCOPE>, e.g. NGO_CRM_THROTTLE_EXPORTS=30/h.
+THROTTLE_RATES = {
+    'crud': '600/min',
+    'reports': '60/min', # Report views (cached, but each miss aggregates whole tables)
+    'exports': '10/min', # Streaming CSV/NDJSON exports of whole tables
+    'bulk': '10/min', # Bulk imports and batch writes
+    'auth': '20/min', # Registration and login, per IP address: slows password guessing
+}
+THROTTLE_RATES = {
+    scope: os.environ.get(f'NGO_CRM_THROTTLE_{scope.upper()}', rate) for scope, rate in THROTTLE_RATES.items()
+}
+if TESTING:
+    # A test run sends hundreds of requests a minute as one client. The throttling tests set their own rates.
+    THROTTLE_RATES = dict.fromkeys(THROTTLE_RATES)
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] = THROTTLE_RATES
+
+# Upper bound for the ?page_size= query parameter.
+API_MAX_PAGE_SIZE = int(os.environ.get('NGO_CRM_MAX_PAGE_SIZE', 500))
+
+# Rows fetched per database round trip by the streaming CSV/NDJSON exports.
+EXPORT_CHUNK_SIZE = int(os.environ.get('NGO_CRM_EXPORT_CHUNK_SIZE', 2000))
+
+# Backend behind /api/contacts/search/ (see contacts/search.py). The SQLite FTS5 backend
+# needs migration contacts.0003; use contacts.search.PostgreSQLBackend on PostgreSQL.
+CONTACT_SEARCH_BACKEND = os.environ.get('NGO_CRM_CONTACT_SEARCH_BACKEND', 'contacts.search.SQLiteFTS5Backend')
+
+
+# Caching
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local-memory cache by default (per process). Set NGO_CRM_CACHE_DIR to use a
+# file-based cache shared by every worker process on the host.
+
+CACHE_DIR = os.environ.get('NGO_CRM_CACHE_DIR')
+
+if CACHE_DIR:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": CACHE_DIR,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "ngo-crm",
+        }
+    }
+
+# Seconds a cached report section stays valid if no write invalidates it first.
+REPORT_CACHE_TIMEOUT = int(os.environ.get('NGO_CRM_REPORT_CACHE_TIMEOUT', 300))
+
+# API token cache (users/authentication.py). Each worker keeps up to AUTH_TOKEN_CACHE_SIZE
+# tokens for AUTH_TOKEN_CACHE_LOCAL_TTL seconds (0 disables it). This TTL also bounds how
+# long a token revoked in another worker keeps working. Set AUTH_TOKEN_CACHE_ALIAS to a
+# cache shared by all workers to add a second tier with AUTH_TOKEN_CACHE_TTL seconds.
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('NGO_CRM_AUTH_TOKEN_CACHE_SIZE', 1024))
+AUTH_TOKEN_CACHE_LOCAL_TTL = float(os.environ.get('NGO_CRM_AUTH_TOKEN_CACHE_LOCAL_TTL', 10))
+AUTH_TOKEN_CACHE_ALIAS = os.environ.get('NGO_CRM_AUTH_TOKEN_CACHE_ALIAS') or None
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('NGO_CRM_AUTH_TOKEN_CACHE_TTL', 300))
+
+# API tokens (users.models.Token) expire AUTH_TOKEN_LIFETIME seconds after they were issued
+# or last refreshed. Requests slide the expiry forward, at most once per
+# AUTH_TOKEN_REFRESH_INTERVAL seconds. `manage.py purge_expired_tokens` deletes the expired ones.
+AUTH_TOKEN_LIFETIME = int(os.environ.get('NGO_CRM_AUTH_TOKEN_LIFETIME', 14 * 24 * 60 * 60))
+AUTH_TOKEN_REFRESH_INTERVAL = int(os.environ.get('NGO_CRM_AUTH_TOKEN_REFRESH_INTERVAL', 60 * 60))
+
+
+# Per-request instrumentation (ngo_crm/instrumentation.py). Responses carry a Server-Timing
+# header (SQL time and count, serialization, total) unless NGO_CRM_SERVER_TIMING=0. A request
+# slower than REQUEST_SLOW_MS, running more than REQUEST_MAX_QUERIES queries, or repeating one
+# SQL statement REQUEST_REPEATED_QUERY_THRESHOLD times (a likely N+1) is logged as a JSON line.
+REQUEST_SERVER_TIMING = os.environ.get('NGO_CRM_SERVER_TIMING', '1') != '0'
+REQUEST_SLOW_MS = int(os.environ.get('NGO_CRM_REQUEST_SLOW_MS', 500))
+REQUEST_MAX_QUERIES = int(os.environ.get('NGO_CRM_REQUEST_MAX_QUERIES', 30))
+REQUEST_REPEATED_QUERY_THRESHOLD = int(os.environ.get('NGO_CRM_REQUEST_REPEATED_QUERY_THRESHOLD', 10))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "message": {"format": "%(asctime)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "message"},
+    },
+    "loggers": {
+        "ngo_crm.requests": {
+            "handlers": ["console"],
+            "level": os.environ.get('NGO_CRM_REQUEST_LOG_LEVEL', 'WARNING'),
+            "propagate": False,
+        },
+    },
 }
+if TESTING:
+    # Tests deliberately run slow and query-heavy requests; the instrumentation tests use assertLogs.
+    LOGGING["loggers"]["ngo_crm.requests"]["level"] = "ERROR"
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+# Hashers named in NGO_CRM_PASSWORD_HASHERS (comma-separated) go first: the first one hashes
+# new and re-hashed passwords, and Django's defaults still verify hashes made earlier. Load-test
+# environments can use a cheap hasher (django.contrib.auth.hashers.MD5PasswordHasher) to run
+# thousands of logins per second. Never do that in production.
+PASSWORD_HASHERS = [name.strip() for name in os.environ.get('NGO_CRM_PASSWORD_HASHERS', '').split(',') if name.strip()]
+PASSWORD_HASHERS += [name for name in global_settings.PASSWORD_HASHERS if name not in PASSWORD_HASHERS]
 
 
 # Password validation
@@ -139,3 +276,12 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Prometheus metrics at /metrics (ngo_crm/metrics.py). With several worker processes, point
+# NGO_CRM_METRICS_DIR at a directory all of them can write (and empty it on every deploy);
+# each process writes its samples there at most every METRICS_FLUSH_INTERVAL seconds and a
+# scrape adds them up. Scrapers send "Authorization: Bearer <NGO_CRM_METRICS_TOKEN>"; with no
+# token set, /metrics (every route name and its traffic) is only served when DEBUG is on.
+METRICS_DIR = os.environ.get('NGO_CRM_METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('NGO_CRM_METRICS_FLUSH_INTERVAL', 1))
+METRICS_TOKEN = os.environ.get('NGO_CRM_METRICS_TOKEN')
@@ -0,0 +1,393 @@
+import datetime
+import json
+import re
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import serializers, status
+from rest_framework.test import APITestCase, APIClient
+from users.models import Token
+from contacts.models import Contact, ContactNote
+from donations.models import Donation
+from inventory.models import InventoryItem
+from projects.models import Project, ProjectTask, VolunteerHoursLog
+from volunteers.models import Volunteer
+from .instrumentation import RequestMetricsMiddleware
+from .metrics import Counter, Histogram, Registry
+from .throttling import ScopedRateThrottle
+
+
+@override_settings(METRICS_TOKEN='scrape-secret')
+class MetricsEndpointTests(APITestCase):
+    # The registry is process-wide, so the tests compare values before and after.
+    def setUp(self):
+        self.user = User.objects.create_user(username='metrics_user', password='testpassword123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        cache.clear()
+        self.donor = Contact.objects.create(first_name="Metric", last_name="Donor", email="metric_donor@example.com")
+
+    def scrape(self):
+        response = APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.content.decode()
+
+    def sample(self, text, series):
+        """Value of ``series`` (name plus labels, exactly as exposed), 0 if absent."""
+        match = re.search(rf'^{re.escape(series)} (\S+)$', text, re.MULTILINE)
+        return float(match.group(1)) if match else 0.0
+
+    def test_request_metrics(self):
+        url = reverse('donation-list')
+        before = self.scrape()
+        self.client.get(url)
+        self.client.get(url)
+        response = APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        after = response.content.decode()
+
+        self.assertIn('# TYPE ngo_crm_http_requests_total counter', after)
+        self.assertIn('# TYPE ngo_crm_http_request_duration_seconds histogram', after)
+        requests = 'ngo_crm_http_requests_total{route="donation-list",method="GET",status="200"}'
+        self.assertEqual(self.sample(after, requests) - self.sample(before, requests), 2)
+        for series in (
+            'ngo_crm_http_request_duration_seconds_count{route="donation-list",method="GET"}',
+            'ngo_crm_http_request_duration_seconds_bucket{route="donation-list",method="GET",le="+Inf"}',
+            'ngo_crm_db_queries_per_request_count{route="donation-list"}',
+            'ngo_crm_db_duration_seconds_count{route="donation-list"}',
+        ):
+            self.assertEqual(self.sample(after, series) - self.sample(before, series), 2, series)
+        # Buckets are cumulative: each holds at least as many requests as the one before.
+        buckets = [float(value) for value in re.findall(
+            r'^ngo_crm_http_request_duration_seconds_bucket\{route="donation-list",method="GET",le="[^"]+"\} (\S+)$', after, re.MULTILINE)]
+        self.assertEqual(buckets, sorted(buckets))
+
+        unmatched = 'ngo_crm_http_requests_total{route="unmatched",method="GET",status="404"}'
+        self.client.get('/no-such-page/')
+        self.assertEqual(self.sample(self.scrape(), unmatched) - self.sample(after, unmatched), 1)
+
+    def test_domain_counters_count_committed_rows(self):
+        donations = 'ngo_crm_donations_created_total{donation_type="MON"}'
+        posted = 'ngo_crm_inventory_transactions_posted_total{transaction_type="IN"}'
+        hours = 'ngo_crm_volunteer_hours_logged_total'
+        logs = 'ngo_crm_volunteer_hours_logs_total'
+        before = self.scrape()
+
+        item = InventoryItem.objects.create(name="Metric Blankets", quantity_on_hand=Decimal("0.00"))
+        volunteer = Volunteer.objects.create(contact=self.donor)
+        with self.captureOnCommitCallbacks(execute=True):
+            Donation.objects.create(donor_contact=self.donor, donation_date=datetime.date.today(), amount=Decimal("10.00"))
+            VolunteerHoursLog.objects.create(volunteer=volunteer, date=datetime.date.today(), hours_worked=Decimal("2.50"))
+            response = self.client.post(reverse('inventorytransaction-batch'), {"lines": [
+                {"item": item.pk, "transaction_type": "IN", "quantity": "5"},
+                {"item": item.pk, "transaction_type": "IN", "quantity": "3"},
+            ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Donation.objects.create(donor_contact=self.donor, donation_date=datetime.date.today(), amount=Decimal("5.00"))
+                    raise RuntimeError
+            except RuntimeError:
+                pass # Rolled back: not counted
+
+        after = self.scrape()
+        self.assertEqual(self.sample(after, donations) - self.sample(before, donations), 1)
+        self.assertEqual(self.sample(after, posted) - self.sample(before, posted), 2)
+        self.assertEqual(self.sample(after, hours) - self.sample(before, hours), 2.5)
+        self.assertEqual(self.sample(after, logs) - self.sample(before, logs), 1)
+
+    def test_cache_lookups(self):
+        url = reverse('report-volunteer-hours')
+        hits = 'ngo_crm_cache_requests_total{cache="reports.volunteer_hours.response",result="hit"}'
+        misses = 'ngo_crm_cache_requests_total{cache="reports.volunteer_hours.response",result="miss"}'
+        token_hits = 'ngo_crm_cache_requests_total{cache="auth_token",result="hit"}'
+        before = self.scrape()
+        self.client.get(url)
+        self.client.get(url)
+        after = self.scrape()
+        self.assertEqual(self.sample(after, misses) - self.sample(before, misses), 1)
+        self.assertEqual(self.sample(after, hits) - self.sample(before, hits), 1)
+        self.assertEqual(self.sample(after, token_hits) - self.sample(before, token_hits), 1) # The first lookup fills it
+
+    def test_multiprocess_files_are_summed(self):
+        series = 'ngo_crm_volunteer_hours_logs_total'
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            own = self.sample(self.scrape(), series)
+            self.assertEqual(len(list(Path(directory).glob('*.json'))), 1) # This process's snapshot
+            # Another worker's snapshot, as it would have written it.
+            Path(directory, '99999-feedbeef.json').write_text(json.dumps([
+                [series, [], 4],
+                ['ngo_crm_db_queries_per_request', ['other-route'], [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 2, 7.0]], # 10 buckets, +Inf, sum
+            ]))
+            text = self.scrape()
+        self.assertEqual(self.sample(text, series) - own, 4)
+        self.assertEqual(self.sample(text, 'ngo_crm_db_queries_per_request_count{route="other-route"}'), 3)
+        self.assertEqual(self.sample(text, 'ngo_crm_db_queries_per_request_bucket{route="other-route",le="0.0"}'), 1)
+        self.assertEqual(self.sample(text, 'ngo_crm_db_queries_per_request_sum{route="other-route"}'), 7)
+
+    def test_metrics_token(self):
+        client = APIClient()
+        self.assertIn('ngo_crm_http_requests_total', self.scrape())
+        for header in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}, {'HTTP_AUTHORIZATION': 'Bearer scrape-secrét'}):
+            self.assertEqual(client.get('/metrics', **header).status_code, status.HTTP_403_FORBIDDEN, header)
+        # Without a token the endpoint is closed unless DEBUG is on.
+        with override_settings(METRICS_TOKEN=None):
+            self.assertEqual(client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+            with override_settings(DEBUG=True):
+                self.assertEqual(client.get('/metrics').status_code, status.HTTP_200_OK)
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    # A registry of its own, so that the process-wide one is left alone.
+    def setUp(self):
+        self.registry = Registry()
+        self.hours = Counter('hours_total', 'Hours.', registry=self.registry)
+        self.queries = Histogram('queries', 'Queries.', ['route'], buckets=(1, 5), registry=self.registry)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(METRICS_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_flush_replaces_this_process_file(self):
+        self.hours.inc(2)
+        self.registry.flush()
+        self.hours.inc(1)
+        self.registry.flush()
+        self.assertEqual(len(list(self.directory.glob('*.json'))), 1)
+        self.assertEqual(self.registry.collect(), {('hours_total', ()): 3})
+
+    def test_forked_worker_starts_empty_and_files_are_merged(self):
+        parent = self.registry.pid
+        self.hours.inc(2)
+        self.queries.observe(3, route='tasks')
+        self.registry.flush()
+        with patch('ngo_crm.metrics.os.getpid', return_value=parent + 1):
+            self.hours.inc(1)
+            # The parent's samples are its own to report; the child only has what it counted since.
+            self.assertEqual(self.registry.snapshot(), [['hours_total', [], 1]])
+            self.queries.observe(7, route='tasks')
+            merged = self.registry.collect()
+
+        files = sorted(path.name.split('-')[0] for path in self.directory.glob('*.json'))
+        self.assertEqual(files, sorted([str(parent), str(parent + 1)]))
+        self.assertEqual(merged[('hours_total', ())], 3)
+        self.assertEqual(merged[('queries', ('tasks',))], [0, 1, 1, 10.0]) # <=1, <=5, +Inf, sum
+
+    def test_unreadable_files_are_skipped(self):
+        self.hours.inc(1)
+        (self.directory / '99999-deadbeef.json').write_text('{"trunc')
+        self.assertEqual(self.registry.collect(), {('hours_total', ()): 1})
+
+
+def throttle_rates(**rates):
+    """Turn throttling on (test runs disable it) with the given rates; other scopes stay unthrottled."""
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **rates},
+    })
+
+
+class ThrottlingTests(APITestCase):
+    # Through the API, against a patched clock.
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='throttled_user', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.now = 1_000_040.0 # 20 seconds into a minute window
+        clock = patch.object(ScopedRateThrottle, 'timer', lambda throttle: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    @throttle_rates(crud='3/min')
+    def test_crud_limit_with_retry_after(self):
+        url = reverse('donation-list')
+        for _ in range(3):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '60') # 40s left in this window, then 20s for its 3 requests to fade to 2
+
+        # 30s into the next window, the previous window's 3 requests count as 1.5.
+        self.now += 70
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '10') # At 40s, 3 * (1 - 40/60) + 1 = 2 leaves room for one more
+        self.now += 10
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    @throttle_rates(crud='100/min', exports='1/min')
+    def test_exports_have_their_own_stricter_scope(self):
+        url = reverse('donation-export')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(reverse('donation-list')).status_code, status.HTTP_200_OK)
+
+    @throttle_rates(crud='1/min')
+    def test_each_user_has_their_own_counter(self):
+        url = reverse('donation-list')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        other = Token.objects.create(user=User.objects.create_user(username='other_user', password='password'))
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + other.key)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+
+@throttle_rates(crud='10/min')
+class SlidingWindowRateThrottleTests(SimpleTestCase):
+    WINDOW = 1_000_020.0 # The start of a minute window
+
+    def setUp(self):
+        cache.clear()
+        self.now = self.WINDOW
+        clock = patch.object(ScopedRateThrottle, 'timer', lambda throttle: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.anonymous = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1')
+        self.anonymous.user = None
+        self.view = SimpleNamespace(throttle_scope=None)
+
+    def request(self):
+        """Whether a request at ``self.now`` is allowed, and the seconds to wait if not."""
+        throttle = ScopedRateThrottle()
+        if throttle.allow_request(self.anonymous, self.view):
+            return True, None
+        return False, throttle.wait()
+
+    def test_previous_window_fades_across_the_boundary(self):
+        self.now = self.WINDOW + 50
+        for _ in range(10):
+            self.assertEqual(self.request(), (True, None))
+        # 10s left in this window, then 6s for its 10 requests to weigh 9.
+        self.assertEqual(self.request(), (False, 16))
+        self.now = self.WINDOW + 65
+        self.assertFalse(self.request()[0]) # 10 * 55/60 + 1 > 10
+        self.now = self.WINDOW + 66
+        self.assertEqual(self.request(), (True, None)) # 10 * 54/60 + 1 = 10
+
+        # 15s in, the previous window counts as 7.5: one more request fits next to the first.
+        self.now = self.WINDOW + 75
+        self.assertEqual(self.request(), (True, None))
+        self.assertEqual(self.request(), (False, 3)) # At 18s, 10 * 42/60 + 2 + 1 = 10
+        self.now = self.WINDOW + 78
+        self.assertEqual(self.request(), (True, None))
+        self.assertEqual(self.request(), (False, 6)) # At 24s, 10 * 36/60 + 3 + 1 = 10
+
+        # Two windows on, the first one no longer counts at all.
+        self.now = self.WINDOW + 120
+        for _ in range(7):
+            self.assertTrue(self.request()[0]) # The second window's 3 requests, at full weight, + 7 = 10
+        self.assertFalse(self.request()[0])
+
+    @throttle_rates(crud='7/min')
+    def test_retry_after_is_the_exact_wait(self):
+        self.now = self.WINDOW + 59
+        for _ in range(7):
+            self.request()
+        self.now = self.WINDOW + 61
+        allowed, wait = self.request()
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 60 / 7 - 1) # When 7 * (1 - elapsed/60) drops to 6
+        self.now += 7
+        self.assertFalse(self.request()[0])
+        self.now += 1 # Retry-After rounds up to whole seconds
+        self.assertTrue(self.request()[0])
+
+    def test_anonymous_clients_are_counted_per_address(self):
+        for _ in range(10):
+            self.request()
+        self.assertFalse(self.request()[0])
+        self.anonymous.META['REMOTE_ADDR'] = '10.0.0.2'
+        self.assertTrue(self.request()[0])
+
+
+class RequestInstrumentationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='instrumented_user', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.contact = Contact.objects.create(first_name="Measured", last_name="Donor", email="measured@example.com")
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('donation-list'))
+        timing = response['Server-Timing']
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+        for metric in ('db;dur=', 'serialize;dur=', 'render;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+
+    def test_serializer_time_and_its_queries_are_measured(self):
+        Contact.objects.bulk_create([Contact(first_name=f"Lazy{i}") for i in range(2)])
+
+        class LazySerializer(serializers.Serializer):
+            notes = serializers.SerializerMethodField()
+
+            def get_notes(self, contact):
+                return ContactNote.objects.filter(contact=contact).exists() # One query per contact
+
+        def view(request):
+            LazySerializer(Contact.objects.all(), many=True, context={'request': request}).data
+            return HttpResponse()
+
+        response = RequestMetricsMiddleware(view)(RequestFactory().get('/'))
+        # The contacts themselves, then one query for each of the three.
+        self.assertRegex(response['Server-Timing'], r'serialize;dur=[\d.]+;desc="4 queries"')
+
+    @override_settings(REQUEST_SLOW_MS=0)
+    def test_slow_request_is_logged_with_its_view(self):
+        with self.assertLogs('ngo_crm.requests', 'WARNING') as logs:
+            self.client.get(reverse('donation-list'))
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line['view'], 'DonationViewSet.list')
+        self.assertEqual(line['flags'], ['slow'])
+        self.assertEqual(line['status'], 200)
+
+    @override_settings(REQUEST_REPEATED_QUERY_THRESHOLD=5)
+    def test_repeated_statement_is_flagged_as_n_plus_one(self):
+        def one_query_per_contact(request):
+            for _ in range(5):
+                Contact.objects.filter(pk=self.contact.pk).exists()
+            return HttpResponse()
+
+        middleware = RequestMetricsMiddleware(one_query_per_contact)
+        with self.assertLogs('ngo_crm.requests', 'WARNING') as logs:
+            middleware(RequestFactory().get('/'))
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line['flags'], ['n_plus_one'])
+        self.assertEqual(line['repeated_queries'][0]['count'], 5)
+        self.assertIn('contacts_contact', line['repeated_queries'][0]['sql'])
+
+    @override_settings(REQUEST_REPEATED_QUERY_THRESHOLD=5)
+    def test_nested_route_n_plus_one_names_the_action(self):
+        project = Project.objects.create(name="Measured Project", start_date=datetime.date.today())
+        volunteer = Volunteer.objects.create(contact=self.contact)
+        ProjectTask.objects.bulk_create([
+            ProjectTask(project=project, title=f"Task {i}", assigned_to_volunteer=volunteer) for i in range(5)
+        ])
+        with self.assertLogs('ngo_crm.requests', 'WARNING') as logs:
+            response = self.client.get(reverse('project-tasks-list-create', kwargs={'pk': project.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        line = json.loads(logs.records[-1].getMessage())
+        # Each task's project name and volunteer are looked up one task at a time.
+        self.assertEqual(line['view'], 'ProjectViewSet.tasks_list_create')
+        self.assertIn('n_plus_one', line['flags'])
+        self.assertGreaterEqual(line['repeated_queries'][0]['count'], 5)
+
+    def test_fast_requests_are_not_logged(self):
+        with self.assertNoLogs('ngo_crm.requests', 'WARNING'):
+            self.client.get(reverse('donation-list'))
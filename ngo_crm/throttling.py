@@ -0,0 +1,107 @@
+"""
+Project-wide request throttling (see DEFAULT_THROTTLE_CLASSES in settings).
+
+Every view is throttled under a scope whose rate is set in DEFAULT_THROTTLE_RATES.
+The scope is the view's ``throttle_scope``, or the action's
+(``@action(..., throttle_scope='exports')``, on viewsets that include
+ngo_crm.views.ThrottleScopeMixin), else ``crud``. Authenticated clients are
+counted per user and anonymous ones per IP address, so AllowAny endpoints such
+as registration and login are covered too.
+
+DRF's SimpleRateThrottle keeps a timestamp for every request in the window,
+so its cache entries grow with the limit. SlidingWindowRateThrottle keeps two
+integers per client and scope instead: the request counts of the current and
+of the previous fixed window. The previous count is weighted by how much of it
+still overlaps the sliding window:
+
+    estimate = previous * (1 - elapsed / period) + current
+
+A request is allowed while estimate + 1 <= limit. The estimate assumes the
+previous window's requests were spread evenly, which is close enough for
+throttling and needs no per-request state. Retry-After is the exact time until
+the estimate allows one more request.
+
+Counters live in the default cache. The local-memory cache is per process, so
+each worker enforces its own limit; configure a shared cache (NGO_CRM_CACHE_DIR)
+for one limit across workers.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """SimpleRateThrottle with O(1) sliding-window counters instead of a timestamp list."""
+
+    def get_rate(self):
+        # Read on every request rather than once at import, so settings overrides apply.
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(f"No default throttle rate set for '{self.scope}' scope")
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        current_key, previous_key = f'{self.key}_{window}', f'{self.key}_{window - 1}'
+        counts = self.cache.get_many([previous_key, current_key])
+        self.previous, self.current = counts.get(previous_key, 0), counts.get(current_key, 0)
+        self.elapsed = self.now - window * self.duration
+        if self.previous * (self.duration - self.elapsed) / self.duration + self.current + 1 > self.num_requests:
+            return self.throttle_failure()
+
+        # The counter outlives its own window because it is the previous one in the next.
+        self.cache.add(current_key, 0, self.duration * 2)
+        try:
+            self.current = self.cache.incr(current_key)
+        except ValueError: # Evicted between add() and incr()
+            self.current += 1
+            self.cache.set(current_key, self.current, self.duration * 2)
+        return True
+
+    def wait(self):
+        """Seconds until the sliding estimate drops low enough to allow another request."""
+        limit, period = self.num_requests, self.duration
+        remaining = period - self.elapsed
+        if self.previous and self.current + 1 <= limit:
+            # The previous window's weight fades out linearly over this one.
+            # (Dividing last keeps whole-second answers exact for Retry-After's rounding up.)
+            wait = period * (self.previous - (limit - 1 - self.current)) / self.previous - self.elapsed
+            if wait <= remaining:
+                return max(wait, 0)
+        # Once this window ends its count becomes the previous one and fades in turn.
+        if not self.current:
+            return remaining
+        return remaining + max(period * (self.current - (limit - 1)) / self.current, 0)
+
+
+class ScopedRateThrottle(SlidingWindowRateThrottle):
+    """
+    Throttle each user (or IP address, for anonymous requests) per scope: the view's
+    ``throttle_scope``, falling back to ``default_scope``.
+    """
+    scope_attr = 'throttle_scope'
+    default_scope = 'crud'
+
+    def __init__(self):
+        # The scope, and so the rate, is only known once the view is.
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None) or self.default_scope
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user{request.user.pk}'
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -17,6 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     # API URLs
@@ -36,5 +38,6 @@ urlpatterns = [
         path("reports/", include("reports.urls")), # Added reports urls
     ])),
     # Placeholder for DRF's built-in auth views if needed later for browsable API login
-    path('api-auth/', include('rest_framework.urls', namespace='rest_framework'))
+    path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
+    path("metrics", metrics_view, name="metrics"), # Prometheus scrape endpoint
 ]
@@ -0,0 +1,34 @@
+"""
+Shared view mixins.
+"""
+from .serializers import query_param_list
+
+
+class ExpandablePrefetchMixin:
+    """
+    Only prefetch the relations that the requested response shape needs.
+    ``expand_prefetches`` maps an ``?expand=`` name to the prefetch lookup
+    (a string or a Prefetch object) that serves it.
+    """
+    expand_prefetches = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        expand = query_param_list(self.request, 'expand')
+        lookups = [lookup for name, lookup in self.expand_prefetches.items() if name in expand]
+        if lookups:
+            queryset = queryset.prefetch_related(*lookups)
+        return queryset
+
+
+class ThrottleScopeMixin:
+    """
+    Lets the viewset's actions choose their rate limit scope with
+    ``@action(..., throttle_scope='exports')`` (see ngo_crm.throttling).
+
+    DRF passes @action keywords to as_view(), which only accepts names that are
+    already class attributes, so a viewset without ``throttle_scope`` fails at
+    import with "TypeError: ... received an invalid keyword 'throttle_scope'".
+    None leaves the viewset's other actions on the default ``crud`` scope.
+    """
+    throttle_scope = None
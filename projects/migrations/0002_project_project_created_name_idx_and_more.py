@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+        ('volunteers', '0002_volunteer_volunteer_status_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['-created_at', 'name'], name='project_created_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status'], name='project_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projecttask',
+            index=models.Index(fields=['project', 'priority', 'due_date', 'title'], name='task_project_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='volunteerhourslog',
+            index=models.Index(fields=['-date', 'volunteer'], name='hourslog_date_volunteer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='volunteerhourslog',
+            index=models.Index(fields=['project', '-date'], name='hourslog_project_date_idx'),
+        ),
+    ]
@@ -42,6 +42,10 @@ class Project(models.Model):
 
     class Meta:
         ordering = ['-created_at', 'name']
+        indexes = [
+            models.Index(fields=['-created_at', 'name'], name='project_created_name_idx'),
+            models.Index(fields=['status'], name='project_status_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -68,6 +72,9 @@ class ProjectTask(models.Model):
 
     class Meta:
         ordering = ['project', 'priority', 'due_date', 'title']
+        indexes = [
+            models.Index(fields=['project', 'priority', 'due_date', 'title'], name='task_project_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} (Project: {self.project.name})"
@@ -100,6 +107,10 @@ class VolunteerHoursLog(models.Model):
 
     class Meta:
         ordering = ['-date', 'volunteer']
+        indexes = [
+            models.Index(fields=['-date', 'volunteer'], name='hourslog_date_volunteer_idx'), # List order and date__gte filters
+            models.Index(fields=['project', '-date'], name='hourslog_project_date_idx'), # Per-project hours log
+        ]
         verbose_name = "Volunteer Hours Log"
         verbose_name_plural = "Volunteer Hours Logs"
 
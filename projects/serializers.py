@@ -4,8 +4,9 @@ from volunteers.models import Volunteer # Import the Volunteer model
 from volunteers.serializers import VolunteerBasicSerializer # For displaying volunteer info
 from contacts.serializers import UserSimpleSerializer # For created_by etc.
 from django.contrib.auth.models import User
+from ngo_crm.serializers import DynamicFieldsMixin
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     created_by = UserSimpleSerializer(read_only=True)
     created_by_id = serializers.PrimaryKeyRelatedField(
@@ -22,7 +23,7 @@ class ProjectSerializer(serializers.ModelSerializer):
             # 'tasks_count', 'total_hours_logged'
         ]
 
-class ProjectTaskSerializer(serializers.ModelSerializer):
+class ProjectTaskSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     priority_display = serializers.CharField(source='get_priority_display', read_only=True)
     assigned_to_volunteer = VolunteerBasicSerializer(read_only=True)
@@ -41,7 +42,7 @@ class ProjectTaskSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['project'] # Project is typically set by context or URL
 
-class ProjectVolunteerAssignmentSerializer(serializers.ModelSerializer):
+class ProjectVolunteerAssignmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     volunteer = VolunteerBasicSerializer(read_only=True)
     volunteer_id = serializers.PrimaryKeyRelatedField(queryset=Volunteer.objects.all(), source='volunteer', write_only=True)
     project_name = serializers.CharField(source='project.name', read_only=True)
@@ -53,7 +54,7 @@ class ProjectVolunteerAssignmentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['project'] # Project is typically set by context or URL
 
-class VolunteerHoursLogSerializer(serializers.ModelSerializer):
+class VolunteerHoursLogSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     volunteer = VolunteerBasicSerializer(read_only=True)
     volunteer_id = serializers.PrimaryKeyRelatedField(queryset=Volunteer.objects.all(), source='volunteer', write_only=True)
     project_name = serializers.CharField(source='project.name', read_only=True, allow_null=True)
@@ -2,11 +2,12 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth.models import User
-from rest_framework.authtoken.models import Token
+from users.models import Token
 from contacts.models import Contact, ContactType
 from volunteers.models import Volunteer # Import Volunteer model
 from .models import Project, ProjectStatus, ProjectTask, TaskStatus, TaskPriority, ProjectVolunteerAssignment, VolunteerHoursLog
 import datetime
+import json
 
 class ProjectModelTests(APITestCase):
     def setUp(self):
@@ -140,6 +141,18 @@ class ProjectAPITests(APITestCase):
         results = response.data if not isinstance(response.data, dict) or 'results' not in response.data else response.data['results']
         self.assertEqual(len(results), 2)
 
+    def test_export_volunteer_hours_ndjson(self):
+        VolunteerHoursLog.objects.create(
+            volunteer=self.volunteer_for_task, project=self.project1, date=datetime.date.today(), hours_worked=Decimal('4.25')
+        )
+        response = self.client.get(reverse('volunteerhourslog-export'), {'format': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['hours_worked'], '4.25')
+        self.assertEqual(rows[0]['volunteer_first_name'], 'ApiVol')
+        self.assertEqual(rows[0]['project_name'], self.project1.name)
+
 
 class ProjectTaskAPITests(APITestCase): # Standalone Task ViewSet tests
     def setUp(self):
@@ -162,5 +175,23 @@ class ProjectTaskAPITests(APITestCase): # Standalone Task ViewSet tests
         self.assertTrue(ProjectTask.objects.filter(title="Standalone Task Test", project=self.project).exists())
         self.assertEqual(response.data['project'], self.project.pk)
 
+    def test_filter_and_order_tasks(self):
+        other = Project.objects.create(name="Other Project", created_by=self.user)
+        urgent = ProjectTask.objects.create(project=self.project, title="Urgent", priority=TaskPriority.HIGH, due_date=datetime.date(2026, 2, 1))
+        later = ProjectTask.objects.create(project=self.project, title="Later", priority=TaskPriority.LOW, status=TaskStatus.DONE)
+        ProjectTask.objects.create(project=other, title="Elsewhere", priority=TaskPriority.HIGH)
+        url = reverse('projecttask-list')
+
+        response = self.client.get(url, {'project': self.project.pk, 'status__in': 'TD,DN', 'ordering': '-id'})
+        self.assertEqual([task['id'] for task in response.data['results']], [later.pk, urgent.pk])
+        response = self.client.get(url, {'project': self.project.pk, 'due_date__isnull': 'false', 'fields': 'id,title,priority_display'})
+        self.assertEqual(response.data['results'], [{'id': urgent.pk, 'title': "Urgent", 'priority_display': "High"}])
+
+        response = self.client.get(url, {'priority': 'Z', 'ordering': 'title'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'priority'}) # Field filters are checked first
+        response = self.client.get(url, {'ordering': 'title'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST) # title leads no index
+
 # Need to import Decimal for VolunteerHoursLog
 from decimal import Decimal
@@ -8,18 +8,27 @@ from .serializers import (
     ProjectVolunteerAssignmentSerializer, VolunteerHoursLogSerializer
 )
 from volunteers.models import Volunteer # For type hinting or specific queries if needed
+from ngo_crm.pagination import KeysetPagination
+from ngo_crm.exports import EXPORT_RENDERER_CLASSES, streaming_export_response
+from ngo_crm.views import ThrottleScopeMixin
 
 class ProjectViewSet(viewsets.ModelViewSet):
     queryset = Project.objects.all() # Base queryset
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated] # Adjust as needed
+    filterset_fields = {
+        'status': ['exact', 'in'],
+        'start_date': ['gte', 'lte'],
+        'end_date': ['gte', 'lte'],
+        'created_by': ['exact'],
+    }
 
     def get_queryset(self):
         # Example of annotating queryset
         queryset = super().get_queryset().annotate(
             tasks_count=Count('tasks', distinct=True),
             # total_hours_logged=Sum('volunteer_hours__hours_worked') # Be careful with Sum on potentially null relations
-        )
+        ).order_by(*Project._meta.ordering) # Meta.ordering is dropped for aggregated querysets; pagination needs a stable order
         # For total_hours_logged, ensure 'volunteer_hours' is the related_name from VolunteerHoursLog to Project
         # In VolunteerHoursLog model: project = models.ForeignKey(Project, related_name='volunteer_hours', ...) - Correct.
         # So, this annotation should work.
@@ -74,7 +83,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=True, methods=['get', 'post'], url_path='hours-log', serializer_class=VolunteerHoursLogSerializer)
+    @action(detail=True, methods=['get', 'post'], url_path='hours-log', serializer_class=VolunteerHoursLogSerializer, pagination_class=KeysetPagination)
     def hours_log_list_create(self, request, pk=None):
         project = self.get_object()
         if request.method == 'GET':
@@ -100,6 +109,13 @@ class ProjectTaskViewSet(viewsets.ModelViewSet):
     queryset = ProjectTask.objects.select_related('project', 'assigned_to_volunteer__contact').all()
     serializer_class = ProjectTaskSerializer
     permission_classes = [permissions.IsAuthenticated] # Adjust
+    filterset_fields = {
+        'project': ['exact', 'in'],
+        'assigned_to_volunteer': ['exact', 'isnull'],
+        'status': ['exact', 'in'],
+        'priority': ['exact', 'in'],
+        'due_date': ['gte', 'lte', 'isnull'],
+    }
 
     def perform_create(self, serializer):
         # Project should be specified in the request data if this is a standalone endpoint.
@@ -126,6 +142,10 @@ class ProjectVolunteerAssignmentViewSet(viewsets.ModelViewSet):
     queryset = ProjectVolunteerAssignment.objects.select_related('project', 'volunteer__contact').all()
     serializer_class = ProjectVolunteerAssignmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = {
+        'project': ['exact', 'in'],
+        'volunteer': ['exact', 'in'],
+    }
 
     def perform_create(self, serializer):
         # Similar to ProjectTaskViewSet, ensure 'project' and 'volunteer' are correctly handled.
@@ -136,10 +156,17 @@ class ProjectVolunteerAssignmentViewSet(viewsets.ModelViewSet):
         serializer.save()
 
 
-class VolunteerHoursLogViewSet(viewsets.ModelViewSet):
+class VolunteerHoursLogViewSet(ThrottleScopeMixin, viewsets.ModelViewSet):
     queryset = VolunteerHoursLog.objects.select_related('volunteer__contact', 'project').all() #, 'approved_by').all()
     serializer_class = VolunteerHoursLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination # Keyed on Meta.ordering: -date, volunteer
+    filterset_fields = {
+        'date': ['gte', 'lte'],
+        'volunteer': ['exact', 'in'],
+        'project': ['exact', 'in', 'isnull'],
+        'hours_worked': ['gte', 'lte'],
+    }
 
     def perform_create(self, serializer):
         # 'volunteer' is required. 'project' can be null.
@@ -147,6 +174,27 @@ class VolunteerHoursLogViewSet(viewsets.ModelViewSet):
         # serializer.save(approved_by=request.user if ...)
         serializer.save()
 
+    export_columns = [
+        ('id', 'id'),
+        ('date', 'date'),
+        ('hours_worked', 'hours_worked'),
+        ('volunteer_id', 'volunteer_id'),
+        ('volunteer_first_name', 'volunteer__contact__first_name'),
+        ('volunteer_last_name', 'volunteer__contact__last_name'),
+        ('project_id', 'project_id'),
+        ('project_name', 'project__name'),
+        ('description', 'description'),
+        ('created_at', 'created_at'),
+    ]
+
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERER_CLASSES, throttle_scope='exports')
+    def export(self, request):
+        """
+        Stream every hours log with its volunteer and project as CSV (default) or NDJSON (?format=ndjson).
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return streaming_export_response(request, queryset, self.export_columns, 'volunteer-hours')
+
 # Note: The nested actions in ProjectViewSet provide a RESTful way to manage child resources
 # (Tasks, Assignments, Hours) in the context of a specific Project.
 # The standalone ViewSets (ProjectTaskViewSet, etc.) are useful for managing these resources
@@ -0,0 +1,212 @@
+"""
+Aggregation helpers for the reporting endpoints.
+
+Each ``*_metrics`` function collects every figure it needs from a single table
+in one query, using conditional aggregates (``filter=Q(...)``) rather than one
+``count()``/``aggregate()`` call per figure.
+"""
+from decimal import Decimal
+
+from django.db.models import Avg, Count, DecimalField, F, Max, Q, Sum, Window
+from django.db.models.functions import Coalesce, PercentRank, TruncDay, TruncMonth, TruncWeek
+
+from contacts.models import Contact, ContactType
+from volunteers.models import Volunteer, VolunteerStatus
+from projects.models import Project, ProjectStatus, VolunteerHoursLog
+from donations.models import Donation, DonationType
+from fundraising.models import Campaign, CampaignStatus
+from inventory.models import InventoryItem, InventoryTransaction, InventoryTransactionType
+
+
+def count_where(**lookups):
+    """Count rows matching ``lookups`` (all rows if no lookups are given)."""
+    if not lookups:
+        return Count('pk')
+    return Count('pk', filter=Q(**lookups))
+
+
+def sum_where(field, **lookups):
+    """Sum ``field`` over rows matching ``lookups``, returning 0 instead of NULL."""
+    condition = Q(**lookups) if lookups else None
+    return Coalesce(Sum(field, filter=condition), Decimal(0))
+
+
+def contact_metrics():
+    return Contact.objects.aggregate(
+        total=count_where(),
+        individuals=count_where(contact_type=ContactType.INDIVIDUAL),
+        organizations=count_where(contact_type=ContactType.ORGANIZATION),
+    )
+
+
+def volunteer_metrics(month_start):
+    metrics = Volunteer.objects.aggregate(
+        total=count_where(),
+        active=count_where(status=VolunteerStatus.ACTIVE),
+    )
+    metrics.update(VolunteerHoursLog.objects.aggregate(
+        total_hours_logged_all_time=sum_where('hours_worked'),
+        total_hours_logged_this_month=sum_where('hours_worked', date__gte=month_start),
+    ))
+    return metrics
+
+
+def project_metrics():
+    return Project.objects.aggregate(
+        total=count_where(),
+        ongoing=count_where(status=ProjectStatus.IN_PROGRESS),
+        completed=count_where(status=ProjectStatus.COMPLETED),
+    )
+
+
+def donation_metrics(month_start, year_start):
+    return Donation.objects.aggregate(
+        total_monetary_donations_this_month=sum_where(
+            'amount', donation_date__gte=month_start, donation_type=DonationType.MONETARY
+        ),
+        total_monetary_donations_this_year=sum_where(
+            'amount', donation_date__gte=year_start, donation_type=DonationType.MONETARY
+        ),
+        total_donation_records_all_time=count_where(),
+    )
+
+
+def active_campaign_metrics():
+    """
+    Progress for every active campaign, read from the campaigns' stored progress
+    columns (see fundraising/progress.py) in one query.
+    """
+    campaigns = Campaign.objects.filter(status=CampaignStatus.ACTIVE).only('name', 'goal_amount', 'raised_amount')
+    details = [
+        {
+            "name": campaign.name,
+            "goal": campaign.goal_amount,
+            "raised": campaign.raised_amount,
+            "progress_percent": campaign.progress_percent,
+        }
+        for campaign in campaigns
+    ]
+    return {
+        "active_campaigns_count": len(details),
+        "active_campaigns_details": details,
+    }
+
+
+def inventory_metrics():
+    return {
+        "distinct_item_types": InventoryItem.objects.count(),
+    }
+
+
+def reorder_items(since, window_days):
+    """
+    Items at or below their reorder level, with days of cover at the recent OUT rate.
+
+    Two queries: the items (served by the partial index ``invitem_reorder_idx``) and one
+    grouped SUM of their OUT transactions since ``since``. ``days_of_cover`` is None when an
+    item had no outgoing stock in the window (no usage to extrapolate from).
+    """
+    items = list(
+        InventoryItem.objects.filter(quantity_on_hand__lte=F('reorder_level'))
+        .select_related('category').order_by('category_id', 'name')
+    )
+    usage = dict(
+        InventoryTransaction.objects.filter(
+            item__in=[item.pk for item in items], transaction_type=InventoryTransactionType.OUT, transaction_date__gte=since,
+        ).values('item_id').annotate(used=Sum('quantity')).values_list('item_id', 'used')
+    )
+    rows = []
+    for item in items:
+        used = usage.get(item.pk) or Decimal(0)
+        daily_usage = used / window_days
+        rows.append({
+            "item": item,
+            "out_quantity": used,
+            "daily_usage": daily_usage.quantize(Decimal('0.01')),
+            "days_of_cover": (item.quantity_on_hand / daily_usage).quantize(Decimal('0.1')) if daily_usage else None,
+        })
+    return rows
+
+
+def donor_rfm_aggregates():
+    """
+    Per-donor recency/frequency/monetary figures for monetary donations, in one grouped
+    query: last donation date, count, total and average amount, plus each donor's
+    PERCENT_RANK (0 = lowest, 1 = highest) on the three measures. Tied donors share a rank.
+    """
+    return (
+        Donation.objects.filter(donation_type=DonationType.MONETARY, amount__isnull=False)
+        .values('donor_contact_id')
+        .annotate(
+            last_donation_date=Max('donation_date'),
+            donation_count=Count('pk'),
+            total_amount=Sum('amount'),
+            average_amount=Avg('amount'),
+        )
+        .annotate(
+            recency_rank=Window(PercentRank(), order_by=F('last_donation_date').asc()),
+            frequency_rank=Window(PercentRank(), order_by=F('donation_count').asc()),
+            monetary_rank=Window(PercentRank(), order_by=F('total_amount').asc()),
+        )
+        .order_by()
+    )
+
+
+DATE_TRUNCATIONS = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+
+
+def donation_bucket_aggregates(interval, start, end, campaign_id=None):
+    """
+    Donation counts and amount totals between ``start`` and ``end`` (inclusive), grouped by
+    ``interval`` bucket ('day', 'week' starting Monday, or 'month'), donation type and payment
+    method, in one query. Only buckets that have donations are returned.
+    """
+    donations = Donation.objects.filter(donation_date__range=(start, end))
+    if campaign_id is not None:
+        donations = donations.filter(campaign_id=campaign_id)
+    return (
+        donations.annotate(bucket=DATE_TRUNCATIONS[interval]('donation_date'))
+        .values('bucket', 'donation_type', 'payment_method')
+        .annotate(donation_count=Count('pk'), total_amount=Sum('amount'))
+        .order_by()
+    )
+
+
+# Hours columns are DecimalField(max_digits=5); totals over many logs need more digits.
+HOURS_SUM = Coalesce(Sum('hours_worked', output_field=DecimalField(max_digits=12, decimal_places=2)), Decimal(0))
+
+
+def hours_totals(logs):
+    return logs.aggregate(
+        hours=HOURS_SUM,
+        entries=Count('pk'),
+        volunteers=Count('volunteer', distinct=True),
+        projects=Count('project', distinct=True),
+    )
+
+
+def hours_by_volunteer(logs):
+    """One row per volunteer (with their name), most hours first."""
+    return (
+        logs.values('volunteer_id', first_name=F('volunteer__contact__first_name'), last_name=F('volunteer__contact__last_name'))
+        .annotate(hours=HOURS_SUM, entries=Count('pk'), projects=Count('project', distinct=True), last_logged=Max('date'))
+        .order_by('-hours', 'volunteer_id')
+    )
+
+
+def hours_by_project(logs):
+    """One row per project (plus one with project_id None for unassigned hours), most hours first."""
+    return (
+        logs.values('project_id', name=F('project__name'), status=F('project__status'), budget=F('project__budget'))
+        .annotate(hours=HOURS_SUM, entries=Count('pk'), volunteers=Count('volunteer', distinct=True))
+        .order_by('-hours', 'project_id')
+    )
+
+
+def hours_by_month(logs):
+    """One row per month that has hours, oldest first."""
+    return (
+        logs.annotate(month=TruncMonth('date')).values('month')
+        .annotate(hours=HOURS_SUM, entries=Count('pk'), volunteers=Count('volunteer', distinct=True))
+        .order_by('month')
+    )
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reports'
+
+    def ready(self):
+        # Keep the dashboard counters and cached report sections in sync with the
+        # models they summarise. Counters are connected first so that a section is
+        # only dropped from the cache after its counters have been updated.
+        from .signals import connect_counter_signals, connect_cache_signals
+        connect_counter_signals()
+        connect_cache_signals()
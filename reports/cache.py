@@ -0,0 +1,102 @@
+"""
+Caching for report responses.
+
+Reports are split into named sections (e.g. the dashboard's "contacts" and
+"donations" blocks). Each section is cached under a key made of the report
+name, the section name and the time bucket the figures belong to (the current
+month and year boundaries), so a new month never serves last month's totals.
+Writes to a model only drop the sections that depend on it; see
+SECTION_DEPENDENCIES and reports/signals.py.
+"""
+import hashlib
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from ngo_crm.metrics import record_cache_lookups
+
+# Model label -> {report name: sections built from that model}
+SECTION_DEPENDENCIES = {
+    'contacts.contact': {'dashboard': ['contacts'], 'donors_rfm': ['donors'], 'volunteer_hours': ['version']}, # Merges delete donors
+    'volunteers.volunteer': {'dashboard': ['volunteers'], 'volunteer_hours': ['version']},
+    'projects.volunteerhourslog': {'dashboard': ['volunteers'], 'volunteer_hours': ['version']},
+    'projects.project': {'dashboard': ['projects'], 'volunteer_hours': ['version']},
+    'donations.donation': {'dashboard': ['donations', 'fundraising'], 'donors_rfm': ['donors']},
+    'fundraising.campaign': {'dashboard': ['fundraising']},
+    'inventory.inventoryitem': {'dashboard': ['inventory']},
+}
+
+
+def time_bucket(now=None):
+    """Return (month_start, year_start) datetimes for ``now`` (default: the current time)."""
+    now = now or timezone.now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    year_start = month_start.replace(month=1)
+    return month_start, year_start
+
+
+def section_cache_key(report, section, bucket):
+    month_start, year_start = bucket
+    return f"reports:{report}:{section}:{year_start.date().isoformat()}:{month_start.date().isoformat()}"
+
+
+def get_cached_sections(report, bucket, sections, compute):
+    """
+    Return ({section: {"data": ..., "generated_at": ...}}, all_hit) for ``sections``.
+
+    ``compute`` is called once with the list of sections missing from the cache
+    and must return {section: data} for them; the fresh sections are stored.
+    """
+    keys = {section: section_cache_key(report, section, bucket) for section in sections}
+    cached = cache.get_many(list(keys.values()))
+
+    results = {}
+    missing = []
+    for section, key in keys.items():
+        if key in cached:
+            results[section] = cached[key]
+        else:
+            missing.append(section)
+    record_cache_lookups(f'reports.{report}', hits=len(results), misses=len(missing))
+
+    if missing:
+        generated_at = timezone.now().isoformat()
+        fresh = {
+            section: {"data": data, "generated_at": generated_at}
+            for section, data in compute(missing).items()
+        }
+        cache.set_many({keys[section]: entry for section, entry in fresh.items()}, settings.REPORT_CACHE_TIMEOUT)
+        results.update(fresh)
+
+    return results, not missing
+
+
+def report_version(report):
+    """
+    An opaque token for ``report`` that changes whenever one of its models is written: it is
+    the report's cached "version" section, which SECTION_DEPENDENCIES drops like any other.
+    Reports whose responses depend on query parameters key their cache entries and ETags on
+    it, so those never need invalidating one by one.
+    """
+    sections, _ = get_cached_sections(report, time_bucket(), ['version'], lambda missing: {'version': uuid4().hex})
+    return sections['version']['data']
+
+
+def versioned_response_key(report, version, params):
+    """(cache key, ETag) for a response of ``report`` at ``version`` with the given query ``params``."""
+    digest = hashlib.md5(urlencode(sorted(params.items())).encode(), usedforsecurity=False).hexdigest()
+    return f"reports:{report}:response:{version}:{digest}", f'"{version[:12]}-{digest[:12]}"'
+
+
+def invalidate_sections(report, sections, bucket=None):
+    """Drop the cached ``sections`` of ``report`` for the current (or given) time bucket."""
+    bucket = bucket or time_bucket()
+    cache.delete_many([section_cache_key(report, section, bucket) for section in sections])
+
+
+def invalidate_for_model(model):
+    for report, sections in SECTION_DEPENDENCIES.get(model._meta.label_lower, {}).items():
+        invalidate_sections(report, sections)
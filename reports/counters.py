@@ -0,0 +1,208 @@
+"""
+Incrementally maintained dashboard counters.
+
+Every tracked model has a *contribution* function describing which
+DashboardCounter rows a single instance adds to (and by how much). On save the
+previous contribution is subtracted and the new one added; on delete the
+contribution is subtracted. The dashboard then reads a handful of counter rows
+instead of scanning Contact, Donation, VolunteerHoursLog, etc.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from contacts.models import Contact, ContactType
+from volunteers.models import Volunteer, VolunteerStatus
+from projects.models import Project, ProjectStatus, VolunteerHoursLog
+from donations.models import Donation, DonationType
+from fundraising.models import Campaign, CampaignStatus
+from .models import DashboardCounter, CounterPeriod, ALL_TIME_START
+
+
+def _all_time(metric, value=1):
+    return (metric, CounterPeriod.ALL_TIME, ALL_TIME_START, value)
+
+
+def _dated(metric, date, value):
+    """Contributions of ``value`` to the day and month buckets containing ``date``."""
+    return [
+        (metric, CounterPeriod.DAY, date, value),
+        (metric, CounterPeriod.MONTH, date.replace(day=1), value),
+    ]
+
+
+def contact_contributions(contact):
+    return [
+        _all_time('contacts.total'),
+        _all_time(f'contacts.type.{contact.contact_type}'),
+    ]
+
+
+def volunteer_contributions(volunteer):
+    return [
+        _all_time('volunteers.total'),
+        _all_time(f'volunteers.status.{volunteer.status}'),
+    ]
+
+
+def hours_log_contributions(log):
+    hours = Decimal(log.hours_worked)
+    return [_all_time('volunteer_hours.total', hours)] + _dated('volunteer_hours.total', log.date, hours)
+
+
+def project_contributions(project):
+    return [
+        _all_time('projects.total'),
+        _all_time(f'projects.status.{project.status}'),
+    ]
+
+
+def donation_contributions(donation):
+    contributions = [_all_time('donations.total')]
+    if donation.donation_type == DonationType.MONETARY and donation.amount is not None:
+        contributions += _dated('donations.monetary_amount', donation.donation_date, Decimal(donation.amount))
+    return contributions
+
+
+def campaign_contributions(campaign):
+    return [_all_time(f'campaigns.status.{campaign.status}')]
+
+
+# Model -> (fields the contribution depends on, contribution function)
+TRACKED_MODELS = {
+    Contact: (['contact_type'], contact_contributions),
+    Volunteer: (['status'], volunteer_contributions),
+    VolunteerHoursLog: (['date', 'hours_worked'], hours_log_contributions),
+    Project: (['status'], project_contributions),
+    Donation: (['donation_type', 'amount', 'donation_date'], donation_contributions),
+    Campaign: (['status'], campaign_contributions),
+}
+
+
+def apply_counter_deltas(added=(), removed=()):
+    """
+    Add the ``added`` contributions to, and subtract the ``removed`` ones from,
+    the counter rows. Contributions that cancel out do not touch the database.
+    """
+    deltas = defaultdict(Decimal)
+    for metric, period, period_start, value in added:
+        deltas[(metric, period, period_start)] += value
+    for metric, period, period_start, value in removed:
+        deltas[(metric, period, period_start)] -= value
+
+    with transaction.atomic():
+        for (metric, period, period_start), delta in deltas.items():
+            if not delta:
+                continue
+            lookup = {'metric': metric, 'period': period, 'period_start': period_start}
+            updated = DashboardCounter.objects.filter(**lookup).update(value=F('value') + delta)
+            if not updated:
+                counter, _ = DashboardCounter.objects.get_or_create(**lookup, defaults={'value': 0})
+                DashboardCounter.objects.filter(pk=counter.pk).update(value=F('value') + delta)
+
+
+def _bucket_sums(queryset, date_field, value_field):
+    """Yield (period, period_start, total) for every day and month that has rows."""
+    for row in queryset.values(date_field).annotate(total=Sum(value_field)):
+        yield CounterPeriod.DAY, row[date_field], row['total']
+    monthly = queryset.annotate(month=TruncMonth(date_field)).values('month').annotate(total=Sum(value_field))
+    for row in monthly:
+        yield CounterPeriod.MONTH, row['month'], row['total']
+
+
+def _choice_counts(queryset, field, prefix, total_metric=None):
+    """Count rows per value of ``field`` as '<prefix>.<value>' metrics, plus an optional total."""
+    counts = {}
+    for row in queryset.values(field).annotate(n=Count('pk')):
+        counts[f'{prefix}.{row[field]}'] = row['n']
+    if total_metric:
+        counts[total_metric] = sum(counts.values())
+    return counts
+
+
+def rebuild_dashboard_counters():
+    """
+    Recompute every counter from the source tables with grouped aggregates
+    (one query per table and bucket size) and replace the stored rows.
+    Returns the number of counter rows written.
+    """
+    all_time = {}
+    all_time.update(_choice_counts(Contact.objects.all(), 'contact_type', 'contacts.type', 'contacts.total'))
+    all_time.update(_choice_counts(Volunteer.objects.all(), 'status', 'volunteers.status', 'volunteers.total'))
+    all_time.update(_choice_counts(Project.objects.all(), 'status', 'projects.status', 'projects.total'))
+    all_time.update(_choice_counts(Campaign.objects.all(), 'status', 'campaigns.status'))
+    all_time['donations.total'] = Donation.objects.count()
+    all_time['volunteer_hours.total'] = VolunteerHoursLog.objects.aggregate(total=Sum('hours_worked'))['total'] or 0
+
+    counters = [
+        DashboardCounter(metric=metric, period=CounterPeriod.ALL_TIME, period_start=ALL_TIME_START, value=value)
+        for metric, value in all_time.items()
+    ]
+    monetary = Donation.objects.filter(donation_type=DonationType.MONETARY, amount__isnull=False)
+    for period, period_start, total in _bucket_sums(monetary, 'donation_date', 'amount'):
+        counters.append(DashboardCounter(
+            metric='donations.monetary_amount', period=period, period_start=period_start, value=total
+        ))
+    for period, period_start, total in _bucket_sums(VolunteerHoursLog.objects.all(), 'date', 'hours_worked'):
+        counters.append(DashboardCounter(
+            metric='volunteer_hours.total', period=period, period_start=period_start, value=total
+        ))
+
+    with transaction.atomic():
+        DashboardCounter.objects.all().delete()
+        DashboardCounter.objects.bulk_create(counters, batch_size=500)
+    return len(counters)
+
+
+def read_dashboard_counters(month_start, year_start):
+    """
+    Build the contacts, volunteers, projects and donations dashboard sections
+    (plus the active campaign count) from the counter table in a single query.
+    Month rows from ``year_start`` onwards are enough for the month and year totals.
+    """
+    rows = DashboardCounter.objects.filter(
+        Q(period=CounterPeriod.ALL_TIME)
+        | Q(period=CounterPeriod.MONTH, period_start__gte=year_start)
+    ).values_list('metric', 'period', 'period_start', 'value')
+
+    all_time = defaultdict(Decimal)
+    this_month = defaultdict(Decimal)
+    this_year = defaultdict(Decimal)
+    for metric, period, period_start, value in rows:
+        if period == CounterPeriod.ALL_TIME:
+            all_time[metric] += value
+            continue
+        this_year[metric] += value
+        if period_start >= month_start:
+            this_month[metric] += value
+
+    def count(metric):
+        return int(all_time[metric])
+
+    return {
+        "contacts": {
+            "total": count('contacts.total'),
+            "individuals": count(f'contacts.type.{ContactType.INDIVIDUAL}'),
+            "organizations": count(f'contacts.type.{ContactType.ORGANIZATION}'),
+        },
+        "volunteers": {
+            "total": count('volunteers.total'),
+            "active": count(f'volunteers.status.{VolunteerStatus.ACTIVE}'),
+            "total_hours_logged_all_time": all_time['volunteer_hours.total'],
+            "total_hours_logged_this_month": this_month['volunteer_hours.total'],
+        },
+        "projects": {
+            "total": count('projects.total'),
+            "ongoing": count(f'projects.status.{ProjectStatus.IN_PROGRESS}'),
+            "completed": count(f'projects.status.{ProjectStatus.COMPLETED}'),
+        },
+        "donations": {
+            "total_monetary_donations_this_month": this_month['donations.monetary_amount'],
+            "total_monetary_donations_this_year": this_year['donations.monetary_amount'],
+            "total_donation_records_all_time": count('donations.total'),
+        },
+        "active_campaigns_count": count(f'campaigns.status.{CampaignStatus.ACTIVE}'),
+    }
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from reports.counters import rebuild_dashboard_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed dashboard counters from the contacts, volunteers, projects, donations and campaigns tables."
+
+    def handle(self, *args, **options):
+        written = rebuild_dashboard_counters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} dashboard counter rows."))
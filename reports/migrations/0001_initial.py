@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:09
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(help_text="E.g. 'contacts.total', 'donations.monetary_amount'", max_length=100)),
+                ('period', models.CharField(choices=[('ALL', 'All Time'), ('DAY', 'Day'), ('MON', 'Month')], default='ALL', max_length=3)),
+                ('period_start', models.DateField(default=datetime.date(1970, 1, 1), help_text='First day of the day/month bucket')),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Dashboard Counter',
+                'verbose_name_plural': 'Dashboard Counters',
+                'ordering': ['metric', 'period', 'period_start'],
+                'unique_together': {('metric', 'period', 'period_start')},
+            },
+        ),
+    ]
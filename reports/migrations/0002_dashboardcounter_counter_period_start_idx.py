@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dashboardcounter',
+            index=models.Index(fields=['period', 'period_start'], name='counter_period_start_idx'),
+        ),
+    ]
@@ -1,5 +1,42 @@
+import datetime
+
 from django.db import models
 
-# No new models for basic reporting summary for now.
-# This file is here to make 'reports' a valid Django app.
-# More complex reporting features might require models later (e.g., saved report configurations).
+# Counters for metrics that are not tied to a date (e.g. total contacts) use this
+# fixed period_start so that (metric, period, period_start) stays unique.
+ALL_TIME_START = datetime.date(1970, 1, 1)
+
+class CounterPeriod(models.TextChoices):
+    ALL_TIME = 'ALL', 'All Time'
+    DAY = 'DAY', 'Day'
+    MONTH = 'MON', 'Month'
+
+class DashboardCounter(models.Model):
+    """
+    A precomputed dashboard figure (a count or a sum) for one period.
+    Rows are kept up to date incrementally by the signal handlers in reports/signals.py
+    and can be rebuilt from scratch with `python manage.py rebuild_dashboard_counters`.
+    """
+    metric = models.CharField(max_length=100, help_text="E.g. 'contacts.total', 'donations.monetary_amount'")
+    period = models.CharField(
+        max_length=3,
+        choices=CounterPeriod.choices,
+        default=CounterPeriod.ALL_TIME,
+    )
+    period_start = models.DateField(default=ALL_TIME_START, help_text="First day of the day/month bucket")
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('metric', 'period', 'period_start')
+        ordering = ['metric', 'period', 'period_start']
+        indexes = [
+            models.Index(fields=['period', 'period_start'], name='counter_period_start_idx'), # Dashboard read
+        ]
+        verbose_name = "Dashboard Counter"
+        verbose_name_plural = "Dashboard Counters"
+
+    def __str__(self):
+        if self.period == CounterPeriod.ALL_TIME:
+            return f"{self.metric} = {self.value}"
+        return f"{self.metric} ({self.get_period_display()} {self.period_start}) = {self.value}"
@@ -0,0 +1,85 @@
+"""
+Donor RFM (recency, frequency, monetary value) segmentation.
+
+Each donor gets three scores from 1 to 5. A score is the donor's percentile rank
+on that measure, split into fifths. The ranks come from the grouped query in
+aggregates.donor_rfm_aggregates. Donors with the same value share a score, so
+every one-off donor gets the same frequency score.
+
+The donor's segment is then the first SEGMENTS rule their scores satisfy.
+Segments are listed in the order fundraisers work through them, and that
+order is also what ?ordering=segment sorts by.
+"""
+from decimal import Decimal
+
+from .aggregates import donor_rfm_aggregates
+
+CENTS = Decimal('0.01')
+
+# (key, label, rule on the recency, frequency and monetary scores and the donation count)
+SEGMENTS = [
+    ('champions', 'Champions', lambda r, f, m, n: r >= 4 and f >= 4),
+    ('loyal', 'Loyal donors', lambda r, f, m, n: r >= 3 and f >= 3),
+    ('new', 'New donors', lambda r, f, m, n: r >= 4 and n == 1),
+    ('promising', 'Promising', lambda r, f, m, n: r >= 4),
+    ('cant_lose', "Can't lose them", lambda r, f, m, n: r <= 2 and f >= 4 and m >= 4),
+    ('at_risk', 'At risk', lambda r, f, m, n: r <= 2 and f >= 3),
+    ('hibernating', 'Hibernating', lambda r, f, m, n: r <= 2),
+    ('need_attention', 'Need attention', lambda r, f, m, n: True),
+]
+SEGMENT_LABELS = {key: label for key, label, _ in SEGMENTS}
+SEGMENT_ORDER = {key: position for position, (key, _, _) in enumerate(SEGMENTS)}
+
+# ?ordering= names -> row keys. Segment sorts by SEGMENTS order, the rest by value.
+ORDERING_FIELDS = {
+    'segment': 'segment_order',
+    'rfm_score': 'rfm_total',
+    'recency': 'last_donation_date',
+    'frequency': 'donation_count',
+    'monetary': 'total_amount',
+    'average_amount': 'average_amount',
+}
+DEFAULT_ORDERING = ['segment', '-monetary']
+
+
+def score(percent_rank):
+    """1-5 from a 0-1 percentile rank: the bottom fifth scores 1, the top fifth 5."""
+    return min(5, 1 + int(percent_rank * 5))
+
+
+def segment_for(recency, frequency, monetary, donation_count):
+    return next(key for key, _, rule in SEGMENTS if rule(recency, frequency, monetary, donation_count))
+
+
+def donor_rfm_rows():
+    """
+    Every donor's RFM row, in DEFAULT_ORDERING. Rows are plain dicts (contact ids, dates,
+    Decimals, ints) so the whole list can be cached.
+    """
+    rows = []
+    for aggregate in donor_rfm_aggregates():
+        r, f, m = (score(aggregate[rank]) for rank in ('recency_rank', 'frequency_rank', 'monetary_rank'))
+        segment = segment_for(r, f, m, aggregate['donation_count'])
+        rows.append({
+            'contact_id': aggregate['donor_contact_id'],
+            'last_donation_date': aggregate['last_donation_date'],
+            'donation_count': aggregate['donation_count'],
+            # SQLite sums decimals as floats; quantize back to cents.
+            'total_amount': Decimal(str(aggregate['total_amount'])).quantize(CENTS),
+            'average_amount': Decimal(str(aggregate['average_amount'])).quantize(CENTS),
+            'recency_score': r,
+            'frequency_score': f,
+            'monetary_score': m,
+            'rfm_total': r + f + m,
+            'segment': segment,
+            'segment_order': SEGMENT_ORDER[segment],
+        })
+    return sort_rows(rows, DEFAULT_ORDERING)
+
+
+def sort_rows(rows, ordering):
+    """Sort by ``ordering`` (ORDERING_FIELDS names, '-' for descending), ties by contact id."""
+    rows = sorted(rows, key=lambda row: row['contact_id'])
+    for term in reversed(ordering): # Stable sorts applied from the last key to the first
+        rows.sort(key=lambda row: row[ORDERING_FIELDS[term.lstrip('-')]], reverse=term.startswith('-'))
+    return rows
@@ -0,0 +1,73 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from donations.signals import donations_bulk_created
+from .cache import SECTION_DEPENDENCIES, invalidate_for_model
+from .counters import TRACKED_MODELS, apply_counter_deltas
+
+
+def remember_previous_contributions(sender, instance, raw=False, **kwargs):
+    """
+    Before an existing row is updated, record what it currently contributes to the
+    counters so that post_save can apply only the difference.
+    """
+    instance._dashboard_previous_contributions = []
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    fields, contributions = TRACKED_MODELS[sender]
+    previous = sender._default_manager.filter(pk=instance.pk).only(*fields).first()
+    if previous is not None:
+        instance._dashboard_previous_contributions = contributions(previous)
+
+
+def update_counters_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _, contributions = TRACKED_MODELS[sender]
+    apply_counter_deltas(
+        added=contributions(instance),
+        removed=getattr(instance, '_dashboard_previous_contributions', []),
+    )
+    instance._dashboard_previous_contributions = []
+
+
+def update_counters_on_delete(sender, instance, **kwargs):
+    _, contributions = TRACKED_MODELS[sender]
+    apply_counter_deltas(removed=contributions(instance))
+
+
+def update_counters_on_bulk_create(sender, instances, **kwargs):
+    """bulk_create skips post_save, so bulk importers report their rows here instead."""
+    _, contributions = TRACKED_MODELS[sender]
+    apply_counter_deltas(added=[c for instance in instances for c in contributions(instance)])
+    invalidate_report_cache(sender)
+
+
+def connect_counter_signals():
+    for model in TRACKED_MODELS:
+        uid = f'reports.counters.{model._meta.label_lower}'
+        pre_save.connect(remember_previous_contributions, sender=model, dispatch_uid=uid)
+        post_save.connect(update_counters_on_save, sender=model, dispatch_uid=uid)
+        post_delete.connect(update_counters_on_delete, sender=model, dispatch_uid=uid)
+    donations_bulk_created.connect(update_counters_on_bulk_create, dispatch_uid='reports.counters.bulk_donations')
+
+
+def invalidate_report_cache(sender, raw=False, **kwargs):
+    """
+    Drop the cached report sections built from ``sender``. This happens straight away
+    and again once the surrounding transaction commits, so a request that read the
+    old rows in the meantime cannot leave a stale section behind.
+    """
+    if raw:
+        return
+    invalidate_for_model(sender)
+    transaction.on_commit(lambda: invalidate_for_model(sender))
+
+
+def connect_cache_signals():
+    for label in SECTION_DEPENDENCIES:
+        model = apps.get_model(label)
+        uid = f'reports.cache.{label}'
+        post_save.connect(invalidate_report_cache, sender=model, dispatch_uid=uid)
+        post_delete.connect(invalidate_report_cache, sender=model, dispatch_uid=uid)
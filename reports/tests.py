@@ -0,0 +1,484 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from django.contrib.auth.models import User
+from users.models import Token
+from contacts.models import Contact, ContactType
+from volunteers.models import Volunteer, VolunteerStatus
+from projects.models import Project, ProjectStatus, VolunteerHoursLog
+from donations.models import Donation, DonationType, PaymentMethod
+from fundraising.models import Campaign, CampaignStatus
+from inventory.models import InventoryCategory, InventoryItem, InventoryTransaction, InventoryTransactionType
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+from ngo_crm.pagination import KeysetPagination
+from unittest import skipUnless
+from django.core.management import call_command
+from django.core.cache import cache
+from .models import DashboardCounter, CounterPeriod
+from .aggregates import contact_metrics, volunteer_metrics, project_metrics, donation_metrics
+from .counters import read_dashboard_counters
+from fundraising.progress import rebuild_campaign_progress
+import datetime
+from io import StringIO
+from decimal import Decimal
+
+
+class DashboardSummaryReportAPITests(APITestCase):
+    def setUp(self):
+        self.api_user = User.objects.create_user(username='api_testuser_r', password='testpassword123')
+        self.token = Token.objects.create(user=self.api_user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('report-dashboard-summary')
+        cache.clear()
+
+        self.today = datetime.date.today()
+        self.donor = Contact.objects.create(
+            first_name="Report", last_name="Donor", email="report_donor@example.com", contact_type=ContactType.INDIVIDUAL
+        )
+        Contact.objects.create(first_name="Report Org", email="report_org@example.com", contact_type=ContactType.ORGANIZATION)
+        self.volunteer = Volunteer.objects.create(contact=self.donor, status=VolunteerStatus.ACTIVE)
+        Project.objects.create(name="Report Project", status=ProjectStatus.IN_PROGRESS)
+        VolunteerHoursLog.objects.create(volunteer=self.volunteer, date=self.today, hours_worked=Decimal("3.50"))
+        InventoryItem.objects.create(name="Report Item")
+
+    def _create_active_campaign(self, name, goal, raised):
+        campaign = Campaign.objects.create(
+            name=name, goal_amount=Decimal(goal), start_date=self.today, status=CampaignStatus.ACTIVE
+        )
+        Donation.objects.create(
+            donor_contact=self.donor, campaign=campaign, donation_date=self.today, amount=Decimal(raised),
+            donation_type=DonationType.MONETARY, payment_method=PaymentMethod.CASH
+        )
+        Donation.objects.create(
+            donor_contact=self.donor, campaign=campaign, donation_date=self.today,
+            donation_type=DonationType.IN_KIND
+        )
+        rebuild_campaign_progress() # ORM saves do not maintain the campaign's progress columns
+        return campaign
+
+    def test_dashboard_summary_values(self):
+        self._create_active_campaign("Report Campaign", "200.00", "50.00")
+        Campaign.objects.create(name="Planned Campaign", goal_amount=Decimal("10.00"), start_date=self.today)
+
+        response = self.client.get(self.url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['contacts'], {"total": 2, "individuals": 1, "organizations": 1})
+        self.assertEqual(response.data['volunteers']['active'], 1)
+        self.assertEqual(response.data['volunteers']['total_hours_logged_this_month'], Decimal("3.50"))
+        self.assertEqual(response.data['projects']['ongoing'], 1)
+        self.assertEqual(response.data['donations']['total_monetary_donations_this_month'], Decimal("50.00"))
+        self.assertEqual(response.data['donations']['total_donation_records_all_time'], 2)
+        self.assertEqual(response.data['fundraising']['active_campaigns_count'], 1)
+        details = response.data['fundraising']['active_campaigns_details'][0]
+        self.assertEqual(details['raised'], Decimal("50.00"))
+        self.assertEqual(details['progress_percent'], Decimal("25"))
+        self.assertEqual(response.data['inventory']['distinct_item_types'], 1)
+
+    def test_dashboard_query_count_independent_of_campaigns(self):
+        # 1 token lookup + dashboard counters + active campaigns + inventory count.
+        self._create_active_campaign("Campaign 1", "100.00", "10.00")
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        for i in range(2, 7):
+            self._create_active_campaign(f"Campaign {i}", "100.00", "10.00")
+        cache.clear()
+        with self.assertNumQueries(3): # The token is cached by the first request
+            response = self.client.get(self.url, format='json')
+        self.assertEqual(len(response.data['fundraising']['active_campaigns_details']), 6)
+
+    def test_dashboard_cache_hit_and_section_invalidation(self):
+        first = self.client.get(self.url, format='json')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertIn('generated_at', first.data)
+
+        with self.assertNumQueries(0): # Sections and the token both come from the cache
+            second = self.client.get(self.url, format='json')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data['generated_at'], first.data['generated_at'])
+
+        # A new contact only invalidates the contacts section.
+        Contact.objects.create(first_name="Late", email="late@example.com")
+        with self.assertNumQueries(1): # Dashboard counters
+            third = self.client.get(self.url, format='json')
+        self.assertEqual(third['X-Cache'], 'MISS')
+        self.assertEqual(third.data['contacts']['total'], 3)
+        self.assertEqual(third.data['inventory'], first.data['inventory'])
+
+
+class DashboardCounterTests(APITestCase):
+    def setUp(self):
+        self.today = datetime.date.today()
+        self.month_start = self.today.replace(day=1)
+        self.year_start = self.today.replace(month=1, day=1)
+        self.donor = Contact.objects.create(first_name="Counter", last_name="Donor", email="counter_donor@example.com")
+        self.volunteer = Volunteer.objects.create(contact=self.donor, status=VolunteerStatus.ACTIVE)
+        self.donation = Donation.objects.create(
+            donor_contact=self.donor, donation_date=self.today, amount=Decimal("40.00"),
+            donation_type=DonationType.MONETARY, payment_method=PaymentMethod.CARD
+        )
+        self.last_year_donation = Donation.objects.create(
+            donor_contact=self.donor, donation_date=self.year_start - datetime.timedelta(days=1),
+            amount=Decimal("15.00"), donation_type=DonationType.MONETARY, payment_method=PaymentMethod.CASH
+        )
+        VolunteerHoursLog.objects.create(volunteer=self.volunteer, date=self.today, hours_worked=Decimal("2.00"))
+        Project.objects.create(name="Counter Project", status=ProjectStatus.COMPLETED)
+
+    def assertCountersMatchLiveAggregates(self):
+        counters = read_dashboard_counters(self.month_start, self.year_start)
+        self.assertEqual(counters['contacts'], contact_metrics())
+        self.assertEqual(counters['volunteers'], volunteer_metrics(self.month_start))
+        self.assertEqual(counters['projects'], project_metrics())
+        self.assertEqual(counters['donations'], donation_metrics(self.month_start, self.year_start))
+
+    def test_counters_follow_creates_updates_and_deletes(self):
+        self.assertCountersMatchLiveAggregates()
+
+        self.donation.amount = Decimal("60.00")
+        self.donation.save()
+        self.last_year_donation.donation_date = self.today
+        self.last_year_donation.save()
+        self.volunteer.status = VolunteerStatus.INACTIVE
+        self.volunteer.save()
+        self.assertCountersMatchLiveAggregates()
+
+        self.donation.donation_type = DonationType.IN_KIND
+        self.donation.amount = None
+        self.donation.save()
+        self.last_year_donation.delete()
+        self.assertCountersMatchLiveAggregates()
+
+        # Deleting the volunteer cascades to its hours logs.
+        self.volunteer.delete()
+        self.assertCountersMatchLiveAggregates()
+
+    def test_rebuild_command_matches_incremental_counters(self):
+        incremental = read_dashboard_counters(self.month_start, self.year_start)
+        DashboardCounter.objects.all().delete()
+        call_command('rebuild_dashboard_counters', stdout=StringIO())
+        self.assertEqual(read_dashboard_counters(self.month_start, self.year_start), incremental)
+        self.assertTrue(DashboardCounter.objects.filter(
+            metric='donations.monetary_amount', period=CounterPeriod.DAY, period_start=self.today
+        ).exists())
+
+
+@skipUnless(connection.vendor == 'sqlite', "Query plan assertions use SQLite's EXPLAIN QUERY PLAN output.")
+class QueryPlanTests(APITestCase):
+    """
+    The dashboard and the large list endpoints must be served from an index, not a
+    full table scan. SQLite reports index use as 'USING INDEX <name>' (or
+    'USING COVERING INDEX <name>') in EXPLAIN QUERY PLAN.
+    """
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf'USING (COVERING )?INDEX {index_name}\b', plan)
+
+    def test_dashboard_queries_use_indexes(self):
+        today = datetime.date.today()
+        self.assertUsesIndex(
+            DashboardCounter.objects.filter(
+                Q(period=CounterPeriod.ALL_TIME) | Q(period=CounterPeriod.MONTH, period_start__gte=today.replace(month=1, day=1))
+            ),
+            'counter_period_start_idx',
+        )
+        self.assertUsesIndex(
+            Donation.objects.filter(donation_type=DonationType.MONETARY, donation_date__gte=today.replace(day=1)),
+            'donation_type_date_idx',
+        )
+        self.assertUsesIndex(VolunteerHoursLog.objects.filter(date__gte=today.replace(day=1)), 'hourslog_date_volunteer_idx')
+        self.assertUsesIndex(Campaign.objects.filter(status=CampaignStatus.ACTIVE), 'campaign_status_idx')
+        self.assertUsesIndex(Project.objects.filter(status=ProjectStatus.IN_PROGRESS), 'project_status_idx')
+        self.assertUsesIndex(Volunteer.objects.filter(status=VolunteerStatus.ACTIVE), 'volunteer_status_idx')
+
+    def test_list_queries_use_ordering_indexes(self):
+        self.assertUsesIndex(Donation.objects.all()[:50], 'donation_date_created_idx')
+        # A deep keyset page (see ngo_crm.pagination.KeysetPagination) seeks through the same index.
+        ordering = KeysetPagination().get_ordering(Donation.objects.all())
+        seek = KeysetPagination.seek_filter(ordering, [datetime.date.today(), timezone.now(), 1000], reverse=False)
+        self.assertUsesIndex(
+            Donation.objects.filter(seek).order_by('-donation_date', '-created_at', '-id')[:50], 'donation_date_created_idx'
+        )
+        self.assertUsesIndex(InventoryTransaction.objects.all()[:50], 'invtxn_date_item_idx')
+        self.assertUsesIndex(InventoryTransaction.objects.filter(item_id=1).order_by('-transaction_date')[:50], 'invtxn_item_date_idx')
+        self.assertUsesIndex(Contact.objects.all()[:50], 'contact_name_idx')
+
+    def test_reorder_report_uses_partial_index(self):
+        self.assertUsesIndex(
+            InventoryItem.objects.filter(quantity_on_hand__lte=F('reorder_level')).order_by('category_id', 'name'),
+            'invitem_reorder_idx',
+        )
+
+
+class InventoryReorderReportAPITests(APITestCase):
+    def setUp(self):
+        self.api_user = User.objects.create_user(username='api_testuser_reorder', password='testpassword123')
+        self.token = Token.objects.create(user=self.api_user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('report-inventory-reorder')
+
+        medical = InventoryCategory.objects.create(name="Medical")
+        food = InventoryCategory.objects.create(name="Food")
+        self.bandages = InventoryItem.objects.create(name="Bandages", category=medical, quantity_on_hand=Decimal("6"), reorder_level=Decimal("10"))
+        self.rice = InventoryItem.objects.create(name="Rice", category=food, quantity_on_hand=Decimal("20"), reorder_level=Decimal("20"))
+        InventoryItem.objects.create(name="Beans", category=food, quantity_on_hand=Decimal("50"), reorder_level=Decimal("20")) # Well stocked
+        InventoryItem.objects.create(name="Tarps", quantity_on_hand=Decimal("0"), reorder_level=Decimal("1")) # Uncategorised
+        for quantity in ("30", "30"): # 60 out over the 30-day window -> 2/day
+            InventoryTransaction.objects.create(item=self.bandages, transaction_type=InventoryTransactionType.OUT, quantity=Decimal(quantity))
+        old = InventoryTransaction.objects.create(item=self.rice, transaction_type=InventoryTransactionType.OUT, quantity=Decimal("100"))
+        InventoryTransaction.objects.filter(pk=old.pk).update(transaction_date=timezone.now() - datetime.timedelta(days=60))
+
+    def test_reorder_report_groups_items_by_category(self):
+        with self.assertNumQueries(3): # Auth, items, one grouped SUM of OUT transactions
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data['total_items'], 3)
+        self.assertEqual([group['category_name'] for group in response.data['categories']], ["Food", "Medical", None])
+
+        bandages = response.data['categories'][1]['items'][0]
+        self.assertEqual(bandages['out_quantity'], Decimal("60"))
+        self.assertEqual(bandages['daily_usage'], Decimal("2.00"))
+        self.assertEqual(bandages['days_of_cover'], Decimal("3.0"))
+        rice = response.data['categories'][0]['items'][0] # At (not below) its level; usage is outside the window
+        self.assertEqual(rice['name'], "Rice")
+        self.assertIsNone(rice['days_of_cover'])
+
+    def test_reorder_report_window(self):
+        response = self.client.get(self.url, {'window_days': 90})
+        rice = response.data['categories'][0]['items'][0]
+        self.assertEqual(rice['out_quantity'], Decimal("100"))
+        self.assertEqual(rice['days_of_cover'], Decimal("18.0"))
+        self.assertEqual(self.client.get(self.url, {'window_days': 0}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DonorRFMReportAPITests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='rfm_user', password='testpassword123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('report-donors-rfm')
+        cache.clear()
+
+        today = datetime.date.today()
+        # name: (days since last gift, number of gifts, amount per gift)
+        history = {
+            'Avery': (0, 5, '100.00'),    # r5 f5 m5: champion
+            'Blake': (10, 1, '20.00'),    # r4 f1: first gift, recent
+            'Casey': (100, 4, '100.00'),  # r2 f4 m4: lapsing big donor
+            'Devon': (400, 3, '30.00'),   # r1 f3: at risk
+            'Emery': (30, 2, '30.00'),    # r3 f2 m2
+        }
+        self.donors = {}
+        for name, (days_ago, count, amount) in history.items():
+            contact = Contact.objects.create(first_name=name, last_name="Donor", email=f"{name.lower()}@rfm.test")
+            self.donors[name] = contact
+            for i in range(count):
+                Donation.objects.create(
+                    donor_contact=contact, donation_date=today - datetime.timedelta(days=days_ago + 30 * i),
+                    amount=Decimal(amount), donation_type=DonationType.MONETARY, payment_method=PaymentMethod.CASH,
+                )
+        Donation.objects.create(donor_contact=self.donors['Blake'], donation_date=today, donation_type=DonationType.IN_KIND)
+
+    def names(self, response):
+        return [row['contact']['first_name'] for row in response.data['results']]
+
+    def test_scores_segments_and_default_order(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.names(response), ['Avery', 'Blake', 'Casey', 'Devon', 'Emery'])
+        self.assertEqual(
+            [row['segment'] for row in response.data['results']],
+            ['champions', 'new', 'cant_lose', 'at_risk', 'need_attention'],
+        )
+        avery = response.data['results'][0]
+        self.assertEqual(avery['rfm_score'], '555')
+        self.assertEqual((avery['donation_count'], avery['total_amount'], avery['average_amount']), (5, Decimal('500.00'), Decimal('100.00')))
+        self.assertEqual(avery['days_since_last_donation'], 0)
+        # The in-kind gift counts for neither recency nor frequency.
+        self.assertEqual(response.data['results'][1]['donation_count'], 1)
+        self.assertEqual(response.data['results'][1]['days_since_last_donation'], 10)
+        segments = {entry['segment']: entry['donors'] for entry in response.data['segments']}
+        self.assertEqual(segments['champions'], 1)
+        self.assertEqual(segments['loyal'], 0)
+
+    def test_filter_order_and_paginate(self):
+        response = self.client.get(self.url, {'segment': 'at_risk'})
+        self.assertEqual(self.names(response), ['Devon'])
+        response = self.client.get(self.url, {'ordering': '-recency'})
+        self.assertEqual(self.names(response), ['Avery', 'Blake', 'Emery', 'Casey', 'Devon'])
+        response = self.client.get(self.url, {'ordering': 'frequency,-monetary', 'page_size': 2, 'page': 2})
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(self.names(response), ['Devon', 'Casey'])
+
+        for params in ({'ordering': 'first_name'}, {'segment': 'whales'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), response.data)
+
+    def test_cached_until_a_donation_arrives(self):
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(1): # The page's donor names; the token is cached
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        Donation.objects.create(
+            donor_contact=self.donors['Devon'], donation_date=datetime.date.today(), amount=Decimal('5.00'),
+            donation_type=DonationType.MONETARY, payment_method=PaymentMethod.CASH,
+        )
+        response = self.client.get(self.url, {'ordering': '-recency'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['contact']['first_name'], 'Avery') # Tie on today, lower id first
+        devon = next(row for row in response.data['results'] if row['contact']['first_name'] == 'Devon')
+        self.assertEqual((devon['donation_count'], devon['days_since_last_donation']), (4, 0))
+
+
+class DonationTimeSeriesReportAPITests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='timeseries_user', password='testpassword123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('report-donations-timeseries')
+
+        donor = Contact.objects.create(first_name="Series", email="series@example.com")
+        self.campaign = Campaign.objects.create(name="Series Campaign", goal_amount=Decimal("500.00"), start_date=datetime.date(2024, 1, 1))
+        for day, amount, method, campaign in (
+            (datetime.date(2024, 1, 3), "100.00", PaymentMethod.CASH, None),
+            (datetime.date(2024, 1, 20), "50.00", PaymentMethod.CARD, self.campaign),
+            (datetime.date(2024, 3, 5), "25.50", PaymentMethod.CARD, self.campaign),
+            (datetime.date(2023, 12, 31), "999.00", PaymentMethod.CASH, None), # Outside the ranges below
+        ):
+            Donation.objects.create(
+                donor_contact=donor, campaign=campaign, donation_date=day, amount=Decimal(amount),
+                donation_type=DonationType.MONETARY, payment_method=method,
+            )
+        Donation.objects.create(donor_contact=donor, donation_date=datetime.date(2024, 1, 20), donation_type=DonationType.IN_KIND)
+
+    def test_monthly_buckets_are_gap_filled_and_split(self):
+        with self.assertNumQueries(2): # Token lookup + one grouped query
+            response = self.client.get(self.url, {'interval': 'month', 'from': '2024-01-01', 'to': '2024-04-30'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        buckets = response.data['buckets']
+        self.assertEqual([str(bucket['period_start']) for bucket in buckets], ['2024-01-01', '2024-02-01', '2024-03-01', '2024-04-01'])
+        self.assertEqual([bucket['total_amount'] for bucket in buckets], [Decimal("150.00"), 0, Decimal("25.50"), 0])
+        self.assertEqual([bucket['donation_count'] for bucket in buckets], [3, 0, 1, 0])
+
+        january = buckets[0]
+        self.assertEqual(str(january['period_end']), '2024-01-31')
+        self.assertEqual(january['by_donation_type']['MON'], {"count": 2, "amount": Decimal("150.00")})
+        self.assertEqual(january['by_donation_type']['INK'], {"count": 1, "amount": Decimal("0.00")})
+        self.assertEqual(january['by_payment_method']['CSH'], {"count": 1, "amount": Decimal("100.00")})
+        self.assertEqual(january['by_payment_method']['CRD'], {"count": 1, "amount": Decimal("50.00")})
+        self.assertEqual(buckets[1]['by_payment_method']['BNK'], {"count": 0, "amount": Decimal("0.00")})
+        self.assertEqual((response.data['total_amount'], response.data['donation_count']), (Decimal("175.50"), 4))
+
+    def test_weekly_and_daily_buckets_with_campaign_filter(self):
+        response = self.client.get(self.url, {'interval': 'week', 'from': '2024-01-03', 'to': '2024-01-21'})
+        # Weeks start on Monday: 2024-01-01, 01-08 and 01-15.
+        self.assertEqual([str(bucket['period_start']) for bucket in response.data['buckets']], ['2024-01-01', '2024-01-08', '2024-01-15'])
+        self.assertEqual([bucket['donation_count'] for bucket in response.data['buckets']], [1, 0, 2])
+
+        response = self.client.get(self.url, {'interval': 'day', 'from': '2024-01-19', 'to': '2024-01-21', 'campaign': self.campaign.pk})
+        self.assertEqual([bucket['total_amount'] for bucket in response.data['buckets']], [0, Decimal("50.00"), 0])
+        self.assertEqual(response.data['campaign'], self.campaign.pk)
+
+    def test_defaults_to_the_last_twelve_months(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['interval'], 'month')
+        self.assertEqual(len(response.data['buckets']), 12)
+        self.assertEqual(response.data['buckets'][-1]['period_start'], datetime.date.today().replace(day=1))
+
+    def test_invalid_parameters(self):
+        for params, field in (
+            ({'interval': 'year'}, 'interval'),
+            ({'from': 'yesterday'}, 'from'),
+            ({'from': '2024-02-01', 'to': '2024-01-01'}, 'from'),
+            ({'campaign': 999999}, 'campaign'),
+            ({'interval': 'day', 'from': '2020-01-01', 'to': '2024-01-01'}, 'interval'),
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn(field, response.data)
+
+
+class VolunteerHoursReportAPITests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='hours_report_user', password='testpassword123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('report-volunteer-hours')
+        cache.clear()
+
+        self.well = Project.objects.create(name="Well Repair", budget=Decimal("1000.00"))
+        self.garden = Project.objects.create(name="Community Garden")
+        self.ana, self.ben, self.cy = (
+            Volunteer.objects.create(contact=Contact.objects.create(first_name=name, email=f"{name.lower()}@hours.test"))
+            for name in ("Ana", "Ben", "Cy")
+        )
+        for volunteer, project, day, hours in (
+            (self.ana, self.well, datetime.date(2024, 1, 10), "6.00"),
+            (self.ana, self.well, datetime.date(2024, 3, 2), "4.00"),
+            (self.ben, self.well, datetime.date(2024, 1, 11), "2.50"),
+            (self.ben, self.garden, datetime.date(2024, 3, 3), "3.00"),
+            (self.cy, None, datetime.date(2024, 3, 4), "1.00"),
+        ):
+            VolunteerHoursLog.objects.create(volunteer=volunteer, project=project, date=day, hours_worked=Decimal(hours))
+
+    def test_rollups(self):
+        with self.assertNumQueries(5): # Token + totals, by volunteer, by project and by month
+            response = self.client.get(self.url, {'top': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+        self.assertEqual(data['totals'], {"hours": Decimal("16.50"), "entries": 5, "volunteers": 3, "projects": 2})
+        self.assertEqual(
+            [(row['first_name'], row['hours'], row['entries'], row['projects']) for row in data['by_volunteer']],
+            [("Ana", Decimal("10.00"), 2, 1), ("Ben", Decimal("5.50"), 2, 2), ("Cy", Decimal("1.00"), 1, 0)],
+        )
+        self.assertEqual([row['first_name'] for row in data['top_volunteers']], ["Ana", "Ben"])
+        self.assertEqual(
+            [(row['name'], row['hours'], row['volunteers'], row['budget_per_hour']) for row in data['by_project']],
+            [("Well Repair", Decimal("12.50"), 2, Decimal("80.00")), ("Community Garden", Decimal("3.00"), 1, None), (None, Decimal("1.00"), 1, None)],
+        )
+        self.assertEqual(
+            [(row['month'], row['hours']) for row in data['by_month']],
+            [(datetime.date(2024, 1, 1), Decimal("8.50")), (datetime.date(2024, 2, 1), 0), (datetime.date(2024, 3, 1), Decimal("8.00"))],
+        )
+
+    def test_filters_and_sections(self):
+        response = self.client.get(self.url, {'from': '2024-03-01', 'project': self.well.pk, 'sections': 'totals,by_volunteer'})
+        self.assertEqual(set(response.data) - {'filters', 'generated_at'}, {'totals', 'by_volunteer'})
+        self.assertEqual(response.data['totals']['hours'], Decimal("4.00"))
+        self.assertEqual([row['volunteer_id'] for row in response.data['by_volunteer']], [self.ana.pk])
+
+        for params in ({'sections': 'by_day'}, {'top': 0}, {'from': '2024-02-01', 'to': '2024-01-01'}, {'project': 'well'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn(next(iter(params)), response.data)
+
+    def test_etag_revalidation(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(0): # The version token and the auth token are both cached
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertNotEqual(self.client.get(self.url, {'top': 1})['ETag'], etag) # Parameters are part of the tag
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+
+        VolunteerHoursLog.objects.create(volunteer=self.cy, project=self.garden, date=datetime.date(2024, 3, 5), hours_worked=Decimal("2.00"))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['totals']['hours'], Decimal("18.50"))
@@ -0,0 +1,99 @@
+"""
+Donation time series for charts: one entry per day, week (Monday to Sunday) or month
+between two dates, including the buckets with no donations.
+
+The figures come from a single grouped query (aggregates.donation_bucket_aggregates).
+Empty buckets are then filled in here by walking the calendar, so a sparse history
+never costs one query per bucket.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from donations.models import DonationType, PaymentMethod
+from .aggregates import donation_bucket_aggregates
+
+CENTS = Decimal('0.01')
+INTERVALS = ['day', 'week', 'month']
+
+
+def bucket_start(date, interval):
+    if interval == 'week':
+        return date - timedelta(days=date.weekday())
+    if interval == 'month':
+        return date.replace(day=1)
+    return date
+
+
+def next_bucket(start, interval):
+    if interval == 'week':
+        return start + timedelta(days=7)
+    if interval == 'month':
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start + timedelta(days=1)
+
+
+def last_buckets_start(end, interval, count):
+    """Start of the earliest of the ``count`` buckets that end with the one containing ``end``."""
+    start = bucket_start(end, interval)
+    if interval == 'month':
+        months = start.year * 12 + start.month - count # Months since year 0, zero-based
+        return start.replace(year=months // 12, month=months % 12 + 1)
+    return start - timedelta(days=(count - 1) * (7 if interval == 'week' else 1))
+
+
+def bucket_starts(interval, start, end):
+    """Start dates of every bucket that overlaps ``start``..``end``."""
+    current = bucket_start(start, interval)
+    while current <= end:
+        yield current
+        current = next_bucket(current, interval)
+
+
+def bucket_count(interval, start, end):
+    if interval == 'day':
+        return (end - start).days + 1
+    if interval == 'week':
+        return (bucket_start(end, 'week') - bucket_start(start, 'week')).days // 7 + 1
+    return (end.year - start.year) * 12 + end.month - start.month + 1
+
+
+def _empty_bucket(period_start, interval):
+    return {
+        "period_start": period_start,
+        "period_end": next_bucket(period_start, interval) - timedelta(days=1),
+        "total_amount": Decimal(0),
+        "donation_count": 0,
+        "by_donation_type": {code: {"count": 0, "amount": Decimal(0)} for code in DonationType.values},
+        "by_payment_method": {code: {"count": 0, "amount": Decimal(0)} for code in PaymentMethod.values},
+    }
+
+
+def donation_timeseries(interval, start, end, campaign_id=None):
+    """
+    Every bucket from ``start`` to ``end``, oldest first. ``total_amount`` sums monetary
+    donations and ``donation_count`` counts all of them. ``by_payment_method`` covers
+    monetary donations only; one saved without a method counts as Other.
+    """
+    buckets = {period_start: _empty_bucket(period_start, interval) for period_start in bucket_starts(interval, start, end)}
+    for row in donation_bucket_aggregates(interval, start, end, campaign_id):
+        bucket = buckets[row['bucket']]
+        monetary = row['donation_type'] == DonationType.MONETARY
+        # SQLite sums decimals as floats; go through str() to get the cents back exactly.
+        amount = Decimal(str(row['total_amount'])) if monetary and row['total_amount'] is not None else Decimal(0)
+        bucket["donation_count"] += row['donation_count']
+        bucket["total_amount"] += amount
+        by_type = bucket["by_donation_type"].setdefault(row['donation_type'], {"count": 0, "amount": Decimal(0)})
+        by_type["count"] += row['donation_count']
+        by_type["amount"] += amount
+        if monetary:
+            by_method = bucket["by_payment_method"].setdefault(row['payment_method'] or PaymentMethod.OTHER, {"count": 0, "amount": Decimal(0)})
+            by_method["count"] += row['donation_count']
+            by_method["amount"] += amount
+
+    series = list(buckets.values())
+    for bucket in series:
+        bucket["total_amount"] = bucket["total_amount"].quantize(CENTS)
+        for split in (bucket["by_donation_type"], bucket["by_payment_method"]):
+            for entry in split.values():
+                entry["amount"] = entry["amount"].quantize(CENTS)
+    return series
@@ -1,6 +1,13 @@
 from django.urls import path
-from .views import DashboardSummaryReportAPIView
+from .views import (
+    DashboardSummaryReportAPIView, DonationTimeSeriesReportAPIView, DonorRFMReportAPIView, InventoryReorderReportAPIView,
+    VolunteerHoursReportAPIView,
+)
 
 urlpatterns = [
     path('summary/dashboard/', DashboardSummaryReportAPIView.as_view(), name='report-dashboard-summary'),
+    path('donations/timeseries/', DonationTimeSeriesReportAPIView.as_view(), name='report-donations-timeseries'),
+    path('donors/rfm/', DonorRFMReportAPIView.as_view(), name='report-donors-rfm'),
+    path('volunteer-hours/', VolunteerHoursReportAPIView.as_view(), name='report-volunteer-hours'),
+    path('inventory/reorder/', InventoryReorderReportAPIView.as_view(), name='report-inventory-reorder'),
 ]
@@ -1,110 +1,342 @@
-from django.utils import timezone
-from django.db.models import Sum, Count, Avg, F, ExpressionWrapper, fields
-from django.db.models.functions import Coalesce
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import permissions
-
-from contacts.models import Contact, ContactType
-from volunteers.models import Volunteer, VolunteerStatus
-from projects.models import Project, ProjectStatus, VolunteerHoursLog
-from donations.models import Donation, DonationType
-from fundraising.models import Campaign, CampaignStatus
-from inventory.models import InventoryItem
+from rest_framework import permissions, serializers
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from datetime import timedelta
 from decimal import Decimal
+from collections import Counter
+
+from contacts.models import Contact
+from fundraising.models import Campaign
+from projects.models import VolunteerHoursLog
+from ngo_crm.pagination import StandardResultsSetPagination
+from ngo_crm.serializers import query_param_list
+from ngo_crm.metrics import record_cache_lookups
+from .aggregates import (
+    active_campaign_metrics, hours_by_month, hours_by_project, hours_by_volunteer, hours_totals, inventory_metrics,
+    reorder_items,
+)
+from .cache import time_bucket, get_cached_sections, report_version, versioned_response_key
+from .counters import read_dashboard_counters
+from .rfm import DEFAULT_ORDERING, ORDERING_FIELDS, SEGMENTS, SEGMENT_LABELS, donor_rfm_rows, sort_rows
+from .timeseries import INTERVALS, bucket_count, bucket_starts, donation_timeseries, last_buckets_start
+
+def query_param(request, name, field, default=None):
+    """Validate query parameter ``name`` with a serializer ``field``; errors are a 400 keyed by the parameter."""
+    try:
+        return field.run_validation(request.query_params.get(name, default))
+    except serializers.ValidationError as exc:
+        raise serializers.ValidationError({name: exc.detail})
+
 
 class DashboardSummaryReportAPIView(APIView):
     """
     Provides a summary of key metrics for the CRM dashboard.
+    Contact, volunteer, project and donation figures are read from the precomputed
+    DashboardCounter rows (see reports/counters.py), so the cost of this endpoint does
+    not grow with the size of the donation or hours history.
+
+    Each section is cached per month/year bucket (see reports/cache.py). The
+    `X-Cache` header is HIT when every section came from the cache, and
+    `generated_at` is when the oldest section was computed.
     """
     permission_classes = [permissions.IsAuthenticated] # Or more specific permission
+    throttle_scope = 'reports'
+    report_name = 'dashboard'
+    sections = ['contacts', 'volunteers', 'projects', 'donations', 'fundraising', 'inventory']
+    counter_sections = {'contacts', 'volunteers', 'projects', 'donations', 'fundraising'}
+
+    def compute_sections(self, missing, month_start, year_start):
+        data = {}
+        if self.counter_sections.intersection(missing):
+            counters = read_dashboard_counters(month_start.date(), year_start.date())
+            for section in ('contacts', 'volunteers', 'projects', 'donations'):
+                data[section] = counters[section]
+        if 'fundraising' in missing:
+            data['fundraising'] = {
+                "active_campaigns_count": counters["active_campaigns_count"],
+                "active_campaigns_details": active_campaign_metrics()["active_campaigns_details"],
+            }
+        if 'inventory' in missing:
+            # total_estimated_value is omitted until InventoryItem has an average_cost field.
+            data['inventory'] = inventory_metrics()
+        return {section: data[section] for section in missing}
+
+    def get(self, request, *args, **kwargs):
+        now = timezone.now()
+        current_month_start, current_year_start = time_bucket(now)
+
+        sections, all_hit = get_cached_sections(
+            self.report_name, (current_month_start, current_year_start), self.sections,
+            lambda missing: self.compute_sections(missing, current_month_start, current_year_start),
+        )
+
+        summary_data = {section: sections[section]["data"] for section in self.sections}
+        summary_data["generated_at"] = min(entry["generated_at"] for entry in sections.values())
+        summary_data["report_generated_at"] = now.isoformat()
+
+        response = Response(summary_data)
+        response['X-Cache'] = 'HIT' if all_hit else 'MISS'
+        return response
+
+
+class InventoryReorderReportAPIView(APIView):
+    """
+    Items at or below their reorder level, grouped by category.
+    `?window_days=` (default 30, 1-365) sets how far back the OUT velocity behind
+    `days_of_cover` is measured. Served live (not cached): stock levels change with every transaction.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'reports'
+    default_window_days = 30
 
     def get(self, request, *args, **kwargs):
+        window_days = query_param(
+            request, 'window_days', serializers.IntegerField(min_value=1, max_value=365), self.default_window_days,
+        )
+
         now = timezone.now()
-        current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        current_year_start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        # Contact Stats
-        total_contacts = Contact.objects.count()
-        individual_contacts = Contact.objects.filter(contact_type=ContactType.INDIVIDUAL).count()
-        organization_contacts = Contact.objects.filter(contact_type=ContactType.ORGANIZATION).count()
-
-        # Volunteer Stats
-        total_volunteers = Volunteer.objects.count()
-        active_volunteers = Volunteer.objects.filter(status=VolunteerStatus.ACTIVE).count()
-
-        total_volunteer_hours_all_time = VolunteerHoursLog.objects.aggregate(total_hours=Coalesce(Sum('hours_worked'), Decimal(0)))['total_hours']
-        total_volunteer_hours_this_month = VolunteerHoursLog.objects.filter(date__gte=current_month_start).aggregate(total_hours=Coalesce(Sum('hours_worked'), Decimal(0)))['total_hours']
-
-        # Project Stats
-        total_projects = Project.objects.count()
-        ongoing_projects = Project.objects.filter(status=ProjectStatus.IN_PROGRESS).count()
-        completed_projects = Project.objects.filter(status=ProjectStatus.COMPLETED).count()
-
-        # Donation Stats
-        total_donations_this_month_amount = Donation.objects.filter(
-            donation_date__gte=current_month_start, donation_type=DonationType.MONETARY
-        ).aggregate(total=Coalesce(Sum('amount'), Decimal(0)))['total']
-
-        total_donations_this_year_amount = Donation.objects.filter(
-            donation_date__gte=current_year_start, donation_type=DonationType.MONETARY
-        ).aggregate(total=Coalesce(Sum('amount'), Decimal(0)))['total']
-
-        total_donations_all_time_count = Donation.objects.count()
-
-        # Fundraising Stats
-        active_campaigns_count = Campaign.objects.filter(status=CampaignStatus.ACTIVE).count()
-
-        # Aggregate funds raised vs goals for active campaigns
-        # This is more complex if done in one query; can be simplified or done per campaign
-        active_campaigns_summary = []
-        for campaign in Campaign.objects.filter(status=CampaignStatus.ACTIVE):
-            raised = campaign.donations.filter(donation_type=DonationType.MONETARY).aggregate(total=Coalesce(Sum('amount'), Decimal(0)))['total']
-            active_campaigns_summary.append({
-                "name": campaign.name,
-                "goal": campaign.goal_amount,
-                "raised": raised,
-                "progress_percent": (raised / campaign.goal_amount * 100) if campaign.goal_amount > 0 else 0
+        groups = {}
+        for row in reorder_items(now - timedelta(days=window_days), window_days):
+            item = row["item"]
+            group = groups.setdefault(item.category_id, {
+                "category_id": item.category_id,
+                "category_name": item.category.name if item.category else None,
+                "items": [],
+            })
+            group["items"].append({
+                "id": item.pk,
+                "name": item.name,
+                "unit_of_measure": item.unit_of_measure,
+                "quantity_on_hand": item.quantity_on_hand,
+                "reorder_level": item.reorder_level,
+                "out_quantity": row["out_quantity"],
+                "daily_usage": row["daily_usage"],
+                "days_of_cover": row["days_of_cover"],
             })
 
-        # Inventory Stats
-        distinct_inventory_items = InventoryItem.objects.count()
-        # total_inventory_value = InventoryItem.objects.annotate(
-        #     item_value=ExpressionWrapper(F('quantity_on_hand') * F('average_cost'), output_field=fields.DecimalField()) # Assuming average_cost field exists
-        # ).aggregate(total_value=Coalesce(Sum('item_value'), Decimal(0)))['total_value']
-        # Assuming no average_cost for now, so total_inventory_value is omitted or simplified
-
-        summary_data = {
-            "contacts": {
-                "total": total_contacts,
-                "individuals": individual_contacts,
-                "organizations": organization_contacts,
-            },
-            "volunteers": {
-                "total": total_volunteers,
-                "active": active_volunteers,
-                "total_hours_logged_all_time": total_volunteer_hours_all_time,
-                "total_hours_logged_this_month": total_volunteer_hours_this_month,
-            },
-            "projects": {
-                "total": total_projects,
-                "ongoing": ongoing_projects,
-                "completed": completed_projects,
-            },
-            "donations": {
-                "total_monetary_donations_this_month": total_donations_this_month_amount,
-                "total_monetary_donations_this_year": total_donations_this_year_amount,
-                "total_donation_records_all_time": total_donations_all_time_count,
-            },
-            "fundraising": {
-                "active_campaigns_count": active_campaigns_count,
-                "active_campaigns_details": active_campaigns_summary, # List of summaries
-            },
-            "inventory": {
-                "distinct_item_types": distinct_inventory_items,
-                # "total_estimated_value": total_inventory_value, # If calculable
-            },
+        # Named categories alphabetically, uncategorised items last.
+        categories = sorted(groups.values(), key=lambda group: (group["category_name"] is None, group["category_name"] or ''))
+        return Response({
+            "window_days": window_days,
+            "total_items": sum(len(group["items"]) for group in categories),
+            "categories": categories,
             "report_generated_at": now.isoformat(),
+        })
+
+
+class DonorRFMReportAPIView(APIView):
+    """
+    Recency, frequency and monetary value per donor, with 1-5 scores and an RFM segment
+    (see reports/rfm.py), paginated. `?segment=` limits the list to one segment and
+    `?ordering=` sorts by segment, rfm_score, recency, frequency, monetary or average_amount
+    (default `segment,-monetary`).
+
+    The scored donor list is built by one grouped query over monetary donations and cached
+    as a whole until a donation or contact changes (see reports/cache.py); each page then
+    costs one query for the donors' names.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'reports'
+    pagination_class = StandardResultsSetPagination
+    report_name = 'donors_rfm'
+
+    def get_ordering(self, request):
+        terms = [term.strip() for term in request.query_params.get('ordering', '').split(',') if term.strip()]
+        invalid = [term for term in terms if term.lstrip('-') not in ORDERING_FIELDS]
+        if invalid:
+            raise serializers.ValidationError({"ordering": [
+                f"Cannot order by {', '.join(invalid)}. Choose from: {', '.join(ORDERING_FIELDS)}."
+            ]})
+        return terms or DEFAULT_ORDERING
+
+    def compute(self, missing):
+        rows = donor_rfm_rows()
+        return {"donors": {"rows": rows, "segments": Counter(row["segment"] for row in rows)}}
+
+    def get(self, request, *args, **kwargs):
+        segment = query_param(request, 'segment', serializers.ChoiceField(choices=list(SEGMENT_LABELS), allow_null=True))
+        ordering = self.get_ordering(request)
+
+        sections, all_hit = get_cached_sections(self.report_name, time_bucket(), ["donors"], self.compute)
+        report = sections["donors"]["data"]
+        rows = report["rows"]
+        if segment:
+            rows = [row for row in rows if row["segment"] == segment]
+        if ordering != DEFAULT_ORDERING:
+            rows = sort_rows(rows, ordering)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        contacts = Contact.objects.only('first_name', 'last_name', 'email').in_bulk([row["contact_id"] for row in page])
+        today = timezone.localdate()
+        results = []
+        for row in page:
+            contact = contacts.get(row["contact_id"])
+            results.append({
+                "contact": {
+                    "id": row["contact_id"],
+                    "first_name": contact.first_name if contact else None,
+                    "last_name": contact.last_name if contact else None,
+                    "email": contact.email if contact else None,
+                },
+                "last_donation_date": row["last_donation_date"],
+                "days_since_last_donation": (today - row["last_donation_date"]).days,
+                "donation_count": row["donation_count"],
+                "total_amount": row["total_amount"],
+                "average_amount": row["average_amount"],
+                "recency_score": row["recency_score"],
+                "frequency_score": row["frequency_score"],
+                "monetary_score": row["monetary_score"],
+                "rfm_score": f'{row["recency_score"]}{row["frequency_score"]}{row["monetary_score"]}',
+                "segment": row["segment"],
+                "segment_label": SEGMENT_LABELS[row["segment"]],
+            })
+
+        response = paginator.get_paginated_response(results)
+        response.data["segments"] = [
+            {"segment": key, "label": label, "donors": report["segments"].get(key, 0)} for key, label, _ in SEGMENTS
+        ]
+        response.data["generated_at"] = sections["donors"]["generated_at"]
+        response['X-Cache'] = 'HIT' if all_hit else 'MISS'
+        return response
+
+
+class DonationTimeSeriesReportAPIView(APIView):
+    """
+    Donation totals per day, week or month for charts, with empty buckets included.
+    `?interval=day|week|month` (default month), `?from=` and `?to=` (dates, inclusive;
+    by default the last 30 days, 12 weeks or 12 whole months up to today) and `?campaign=`.
+
+    One grouped query over the donations in range (see reports/timeseries.py). Served
+    live, not cached: the cache keys could not cover every from/to/campaign combination.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'reports'
+    default_interval = 'month'
+    default_buckets = {'day': 30, 'week': 12, 'month': 12}
+    max_buckets = 1000
+
+    def get(self, request, *args, **kwargs):
+        interval = query_param(request, 'interval', serializers.ChoiceField(choices=INTERVALS), self.default_interval)
+        end = query_param(request, 'to', serializers.DateField(), timezone.localdate())
+        start = query_param(
+            request, 'from', serializers.DateField(), last_buckets_start(end, interval, self.default_buckets[interval]),
+        )
+        campaign = query_param(
+            request, 'campaign', serializers.PrimaryKeyRelatedField(queryset=Campaign.objects.only('pk'), allow_null=True),
+        )
+        if start > end:
+            raise serializers.ValidationError({"from": ["Must not be after `to`."]})
+        if bucket_count(interval, start, end) > self.max_buckets:
+            raise serializers.ValidationError({"interval": [
+                f"The range spans more than {self.max_buckets} {interval} buckets; use a longer interval or a shorter range."
+            ]})
+
+        buckets = donation_timeseries(interval, start, end, campaign.pk if campaign else None)
+        return Response({
+            "interval": interval,
+            "from": start,
+            "to": end,
+            "campaign": campaign.pk if campaign else None,
+            "total_amount": sum(bucket["total_amount"] for bucket in buckets),
+            "donation_count": sum(bucket["donation_count"] for bucket in buckets),
+            "buckets": buckets,
+            "report_generated_at": timezone.now().isoformat(),
+        })
+
+
+class VolunteerHoursReportAPIView(APIView):
+    """
+    Volunteer hours rolled up by volunteer, by project (against its budget) and by month,
+    plus the top volunteers. `?from=`/`?to=` (dates, inclusive) and `?project=` narrow the
+    logs, `?top=` (default 10, at most 100) sizes the top list and `?sections=` picks which
+    of SECTIONS to build. Each grouping is one query.
+
+    Responses are cached and carry an ETag derived from the report's version token (see
+    reports/cache.py), so `If-None-Match` revalidation is a 304 without touching the hours.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'reports'
+    report_name = 'volunteer_hours'
+    sections = ['totals', 'by_volunteer', 'top_volunteers', 'by_project', 'by_month']
+    default_top = 10
+
+    def get_params(self, request):
+        params = {
+            "from": query_param(request, 'from', serializers.DateField(allow_null=True)),
+            "to": query_param(request, 'to', serializers.DateField(allow_null=True)),
+            "project": query_param(request, 'project', serializers.IntegerField(min_value=1, allow_null=True)),
+            "top": query_param(request, 'top', serializers.IntegerField(min_value=1, max_value=100), self.default_top),
         }
+        if params["from"] and params["to"] and params["from"] > params["to"]:
+            raise serializers.ValidationError({"from": ["Must not be after `to`."]})
+        sections = query_param_list(request, 'sections') or set(self.sections)
+        unknown = sections - set(self.sections)
+        if unknown:
+            raise serializers.ValidationError({"sections": [
+                f"Unknown section(s): {', '.join(sorted(unknown))}. Choose from: {', '.join(self.sections)}."
+            ]})
+        params["sections"] = ','.join(section for section in self.sections if section in sections)
+        return params
+
+    def compute(self, params):
+        logs = VolunteerHoursLog.objects.all()
+        if params["from"]:
+            logs = logs.filter(date__gte=params["from"])
+        if params["to"]:
+            logs = logs.filter(date__lte=params["to"])
+        if params["project"]:
+            logs = logs.filter(project_id=params["project"])
+        sections = params["sections"].split(',')
+
+        data = {}
+        if 'totals' in sections:
+            data["totals"] = hours_totals(logs)
+        if 'by_volunteer' in sections or 'top_volunteers' in sections:
+            volunteers = list(hours_by_volunteer(logs))
+            if 'by_volunteer' in sections:
+                data["by_volunteer"] = volunteers
+            if 'top_volunteers' in sections:
+                data["top_volunteers"] = volunteers[:params["top"]]
+        if 'by_project' in sections:
+            data["by_project"] = [
+                {**row, "budget_per_hour": (row["budget"] / row["hours"]).quantize(Decimal('0.01')) if row["budget"] and row["hours"] else None}
+                for row in hours_by_project(logs)
+            ]
+        if 'by_month' in sections:
+            months = {row["month"]: row for row in hours_by_month(logs)}
+            # Months without hours are filled in, so charts get a continuous axis.
+            data["by_month"] = [
+                months.get(month) or {"month": month, "hours": Decimal(0), "entries": 0, "volunteers": 0}
+                for month in (bucket_starts('month', min(months), max(months)) if months else [])
+            ]
+        return data
+
+    def get(self, request, *args, **kwargs):
+        params = self.get_params(request)
+        key, etag = versioned_response_key(self.report_name, report_version(self.report_name), params)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        data = cache.get(key)
+        hit = data is not None
+        record_cache_lookups(f'reports.{self.report_name}.response', hits=int(hit), misses=int(not hit))
+        if not hit:
+            data = {
+                **self.compute(params),
+                "filters": {name: params[name] for name in ('from', 'to', 'project')},
+                "generated_at": timezone.now().isoformat(),
+            }
+            cache.set(key, data, settings.REPORT_CACHE_TIMEOUT)
 
-        return Response(summary_data)
+        response = Response(data)
+        response['ETag'] = etag
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        patch_cache_control(response, private=True, no_cache=True) # Clients may keep it, but must revalidate
+        return response
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class UsersConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "users"
+
+    def ready(self):
+        # Drop cached API tokens when a token is deleted (logout) or its user changes (deactivation).
+        from .signals import connect_token_cache_signals
+        connect_token_cache_signals()
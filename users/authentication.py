@@ -0,0 +1,173 @@
+"""
+Authentication with expiring API tokens (users.models.Token), with a cache in front
+of the Token + User lookup.
+
+ExpiringTokenAuthentication runs one Token-join-User query on every API request.
+CachedTokenAuthentication looks the key up in two tiers first:
+
+* an in-process LRU of at most AUTH_TOKEN_CACHE_SIZE tokens, each trusted for
+  AUTH_TOKEN_CACHE_LOCAL_TTL seconds;
+* optionally a shared Django cache (AUTH_TOKEN_CACHE_ALIAS, e.g. Redis or the
+  file cache) shared by all workers, with entries kept for AUTH_TOKEN_CACHE_TTL.
+
+Deleting a token (logout) or saving or deleting its user (deactivation, password
+or permission changes) drops it from the shared tier and from this process's LRU
+(see users/signals.py). Other processes' LRUs cannot be reached, so there a
+revoked token keeps working for at most AUTH_TOKEN_CACHE_LOCAL_TTL seconds.
+
+Cached tokens are still checked for expiry on every request. A refresh of the
+expiry is written to the database and to both tiers.
+
+Cached users are handed out as copies, so per-request state such as Django's
+permission cache never leaks from one request into the next.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from ngo_crm.metrics import record_cache_lookups
+
+from .models import Token
+
+
+class TokenCache:
+    """Two-tier (in-process LRU, then optional shared cache) map of token key -> Token with its user loaded."""
+
+    def __init__(self, max_size, local_ttl, shared_alias=None, shared_ttl=300):
+        self.max_size = max_size
+        self.local_ttl = local_ttl
+        self.shared_alias = shared_alias
+        self.shared_ttl = shared_ttl
+        self._entries = OrderedDict() # key -> (expires at, token)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            max_size=settings.AUTH_TOKEN_CACHE_SIZE,
+            local_ttl=settings.AUTH_TOKEN_CACHE_LOCAL_TTL,
+            shared_alias=settings.AUTH_TOKEN_CACHE_ALIAS,
+            shared_ttl=settings.AUTH_TOKEN_CACHE_TTL,
+        )
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    @staticmethod
+    def shared_key(key):
+        # Keys are hashed so raw tokens never show up in cache key listings.
+        return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    record_cache_lookups('auth_token', hits=1)
+                    return entry[1]
+                del self._entries[key]
+        if self.shared is not None:
+            token = self.shared.get(self.shared_key(key))
+            if token is not None:
+                self._set_local(key, token, now)
+                record_cache_lookups('auth_token', hits=1)
+                return token
+        record_cache_lookups('auth_token', misses=1)
+        return None
+
+    def set(self, key, token):
+        self._set_local(key, token, time.monotonic())
+        if self.shared is not None:
+            self.shared.set(self.shared_key(key), token, self.shared_ttl)
+
+    def _set_local(self, key, token, now):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (now + self.local_ttl, token)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys=(), user_id=None):
+        """Drop ``keys``, and every locally cached token of ``user_id``, from both tiers."""
+        keys = set(keys)
+        with self._lock:
+            if user_id is not None:
+                keys.update(key for key, (_, token) in self._entries.items() if token.user_id == user_id)
+            for key in keys:
+                self._entries.pop(key, None)
+        if keys and self.shared is not None:
+            self.shared.delete_many([self.shared_key(key) for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache.from_settings()
+
+
+class ExpiringTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication over users.Token: expired tokens are rejected, and a token in use
+    has its expiry pushed forward once AUTH_TOKEN_REFRESH_INTERVAL has passed.
+    """
+    model = Token
+
+    def get_token(self, key):
+        try:
+            return self.get_model().objects.select_related('user').get(key=key)
+        except self.get_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+    def refresh(self, token, now):
+        token.refresh(now)
+
+    def authenticate_credentials(self, key):
+        token = self.get_token(key)
+        now = timezone.now()
+        if token.has_expired(now):
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        if token.refresh_due(now):
+            self.refresh(token, now)
+        return (token.user, token)
+
+
+class CachedTokenAuthentication(ExpiringTokenAuthentication):
+    """ExpiringTokenAuthentication that serves repeat requests for a token from ``token_cache`` without a query."""
+    cache = token_cache
+
+    def get_token(self, key):
+        token = self.cache.get(key)
+        # A copy cached before another worker refreshed the token can look expired; ask the database.
+        if token is not None and not token.has_expired():
+            return token
+        token = super().get_token(key)
+        if token.user.is_active and not token.has_expired():
+            self.cache.set(key, token)
+        return token
+
+    def refresh(self, token, now):
+        super().refresh(token, now)
+        self.cache.set(token.key, token)
+
+    def authenticate_credentials(self, key):
+        user, token = super().authenticate_credentials(key)
+        token, user = copy.copy(token), copy.copy(user)
+        token.user = user
+        return (user, token)
@@ -0,0 +1,81 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from contacts.models import Contact
+from contacts.views import ContactViewSet
+from users.authentication import CachedTokenAuthentication, ExpiringTokenAuthentication
+from users.models import Token
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec on GET /api/contacts/ with ExpiringTokenAuthentication (uncached) and CachedTokenAuthentication. "
+        "Runs in-process against a throwaway in-memory SQLite database (the real database is never touched), "
+        "where a query costs far less than a round trip to a database server, so the gain is a lower bound."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per authentication class (default: 2000)")
+        parser.add_argument('--contacts', type=int, default=20, help="Contacts in the database (default: 20)")
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--rounds', type=int, default=5, help="Alternating timed rounds; the best is reported (default: 5)")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("The benchmark builds an in-memory SQLite database; run it with the SQLite settings.")
+        # Always in memory: with a file test database, autoclobber would delete the file under a running test suite.
+        connection.settings_dict['TEST'] = {**connection.settings_dict['TEST'], 'NAME': ':memory:'}
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # DEBUG would record every query and skew the timings.
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+                self.run_benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run_benchmark(self, options):
+        Contact.objects.bulk_create([
+            Contact(first_name=f"Bench{i}", last_name="Contact", email=f"bench{i}@example.org") for i in range(options['contacts'])
+        ])
+        token = Token.objects.create(user=User.objects.create_user(username='benchmark', password='benchmark'))
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        url = reverse('contact-list') + f"?page_size={options['page_size']}"
+
+        original = ContactViewSet.authentication_classes, ContactViewSet.throttle_classes
+        ContactViewSet.throttle_classes = [] # Thousands of requests from one user would soon be throttled
+        classes = (ExpiringTokenAuthentication, CachedTokenAuthentication)
+        rates, queries = {cls.__name__: [] for cls in classes}, {}
+        try:
+            # Rounds alternate between the classes so machine noise hits both alike; the best round counts.
+            for _ in range(options['rounds']):
+                for authentication_class in classes:
+                    name = authentication_class.__name__
+                    ContactViewSet.authentication_classes = [authentication_class]
+                    CachedTokenAuthentication.cache.clear()
+                    client.get(url) # Fills the token cache
+                    reset_queries() # Each request clears the query log; start the capture from empty
+                    with CaptureQueriesContext(connection) as captured:
+                        client.get(url)
+                    queries[name] = len(captured) # Read now: the next request clears the log again
+                    started = time.perf_counter()
+                    for _ in range(options['requests'] // options['rounds']):
+                        response = client.get(url)
+                    rates[name].append((options['requests'] // options['rounds']) / (time.perf_counter() - started))
+                    if response.status_code != 200:
+                        raise CommandError(f"{name}: GET {url} returned {response.status_code}")
+        finally:
+            ContactViewSet.authentication_classes, ContactViewSet.throttle_classes = original
+        results = {name: (max(rates[name]), queries[name]) for name in rates}
+
+        self.stdout.write(f"{'authentication':<28}{'req/s':>10}{'queries/req':>13}")
+        for name, (rate, queries) in results.items():
+            self.stdout.write(f"{name:<28}{rate:>10.0f}{queries:>13}")
+        baseline, cached = results['ExpiringTokenAuthentication'][0], results['CachedTokenAuthentication'][0]
+        self.stdout.write(self.style.SUCCESS(f"Cached token authentication: {(cached / baseline - 1) * 100:+.1f}% requests/sec"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.models import Token
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired API tokens in batches, one DELETE statement per batch. "
+        "Safe to run at any time (e.g. nightly from cron): expired tokens are already rejected."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Tokens deleted per statement (default: 5000)")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        purged = Token.objects.purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} expired token(s)."))
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:49
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_existing_tokens(apps, schema_editor):
+    # Tokens issued before tokens expired keep working, with a full lifetime from now.
+    OldToken = apps.get_model('authtoken', 'Token')
+    Token = apps.get_model('users', 'Token')
+    expires_at = timezone.now() + timedelta(seconds=settings.AUTH_TOKEN_LIFETIME)
+    Token.objects.bulk_create(
+        [Token(key=old.key, user_id=old.user_id, expires_at=expires_at) for old in OldToken.objects.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('authtoken', '0004_alter_tokenproxy_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Token',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.RunPython(copy_existing_tokens, migrations.RunPython.noop),
+    ]
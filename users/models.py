@@ -0,0 +1,77 @@
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, models
+from django.utils import timezone
+
+
+class TokenQuerySet(models.QuerySet):
+    def purge_expired(self, now=None, batch_size=5000):
+        """
+        Delete tokens that expired by ``now`` and return how many went. Each batch is one
+        plain SQL DELETE by key: nothing references a token and expired tokens are already
+        rejected (even from the token cache), so QuerySet.delete()'s per-row collection and
+        delete signals are not needed.
+        """
+        now = now or timezone.now()
+        connection = connections[self.db]
+        table, key = (connection.ops.quote_name(name) for name in (self.model._meta.db_table, self.model._meta.pk.column))
+        purged = 0
+        while True:
+            keys = list(self.filter(expires_at__lte=now).values_list('key', flat=True)[:batch_size])
+            if not keys:
+                return purged
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {table} WHERE {key} IN ({', '.join(['%s'] * len(keys))})", keys)
+                purged += cursor.rowcount
+
+
+class Token(models.Model):
+    """
+    An API token that expires AUTH_TOKEN_LIFETIME seconds after it was issued or last
+    refreshed. Every login issues a new one, so a user has one token per session.
+    Authentication slides expires_at forward while the token is in use, at most once
+    every AUTH_TOKEN_REFRESH_INTERVAL seconds (see users.authentication).
+    """
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.ForeignKey(User, related_name='auth_tokens', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True) # Indexed for purge_expired_tokens
+
+    objects = TokenQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Token for {self.user} (expires {self.expires_at:%Y-%m-%d %H:%M})"
+
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = self.generate_key()
+        if self.expires_at is None:
+            self.expires_at = timezone.now() + self.lifetime()
+        return super().save(*args, **kwargs)
+
+    @staticmethod
+    def generate_key():
+        return secrets.token_hex(20)
+
+    @staticmethod
+    def lifetime():
+        return timedelta(seconds=settings.AUTH_TOKEN_LIFETIME)
+
+    def has_expired(self, now=None):
+        return self.expires_at <= (now or timezone.now())
+
+    def refresh_due(self, now=None):
+        """True once AUTH_TOKEN_REFRESH_INTERVAL has passed since the token was issued or last refreshed."""
+        refreshed_at = self.expires_at - self.lifetime()
+        return refreshed_at + timedelta(seconds=settings.AUTH_TOKEN_REFRESH_INTERVAL) <= (now or timezone.now())
+
+    def refresh(self, now=None):
+        """Push expires_at a full lifetime past ``now`` with one UPDATE."""
+        self.expires_at = (now or timezone.now()) + self.lifetime()
+        Token.objects.filter(pk=self.pk).update(expires_at=self.expires_at)
@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+
+from .authentication import token_cache
+from .models import Token
+
+
+def drop_cached_token(sender, instance, **kwargs):
+    token_cache.invalidate([instance.key])
+
+
+def drop_cached_user_tokens(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which authentication does not depend on.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    keys = Token.objects.filter(user_id=instance.pk).values_list('key', flat=True) if instance.pk else []
+    token_cache.invalidate(keys, user_id=instance.pk)
+
+
+def connect_token_cache_signals():
+    User = get_user_model()
+    post_delete.connect(drop_cached_token, sender=Token, dispatch_uid='users.token_cache.token')
+    post_save.connect(drop_cached_user_tokens, sender=User, dispatch_uid='users.token_cache.user_save')
+    post_delete.connect(drop_cached_user_tokens, sender=User, dispatch_uid='users.token_cache.user_delete')
@@ -1,8 +1,18 @@
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
+from datetime import timedelta
+from io import StringIO
+
 from django.contrib.auth.models import User
-from rest_framework.authtoken.models import Token
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db.models.signals import post_delete
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from .models import Token
+from .authentication import CachedTokenAuthentication, TokenCache
 
 class UserAuthTests(APITestCase):
 
@@ -160,3 +170,184 @@ class UserAuthTests(APITestCase):
         url = reverse('user-profile')
         response = self.client.get(url, format='json')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN) # Expect 403 if not authenticated
+
+
+class ExpiringTokenTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='session_user', password='testpassword123')
+        self.url = reverse('user-profile')
+        CachedTokenAuthentication.cache.clear()
+
+    def login(self):
+        return self.client.post(reverse('user-login'), {'username': 'session_user', 'password': 'testpassword123'}, format='json')
+
+    def get_profile(self, key):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+        return self.client.get(self.url)
+
+    def test_each_login_issues_a_new_token_with_one_lookup(self):
+        first = self.login().data
+        with self.assertNumQueries(2): # The user by username, then the token INSERT
+            second = self.login().data
+        self.assertNotEqual(first['token'], second['token'])
+        self.assertIn('expires_at', second)
+        for key in (first['token'], second['token']):
+            self.assertEqual(self.get_profile(key).status_code, status.HTTP_200_OK)
+
+    def test_registration_returns_an_expiring_token(self):
+        response = self.client.post(reverse('user-register'), {'username': 'new_user', 'password': 'testpassword123'}, format='json')
+        token = Token.objects.get(user__username='new_user')
+        self.assertEqual(response.data['token'], token.key)
+        self.assertAlmostEqual(token.expires_at, timezone.now() + Token.lifetime(), delta=timedelta(minutes=1))
+
+    def test_expired_token_is_rejected(self):
+        token = Token.objects.create(user=self.user, expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.get_profile(token.key)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN) # 403 as for any bad token
+        self.assertEqual(response.data['detail'], 'Token has expired.')
+
+    @override_settings(AUTH_TOKEN_REFRESH_INTERVAL=60)
+    def test_token_in_use_is_refreshed_once_per_interval(self):
+        issued_at = timezone.now() - timedelta(minutes=2)
+        token = Token.objects.create(user=self.user, expires_at=issued_at + Token.lifetime())
+        self.assertEqual(self.get_profile(token.key).status_code, status.HTTP_200_OK)
+        token.refresh_from_db()
+        self.assertGreater(token.expires_at, issued_at + Token.lifetime() + timedelta(minutes=1))
+        with self.assertNumQueries(0): # Cached, and refreshed less than a minute ago
+            self.assertEqual(self.get_profile(token.key).status_code, status.HTTP_200_OK)
+
+    def test_token_refreshed_by_another_worker_is_reloaded(self):
+        token = Token.objects.create(user=self.user)
+        self.get_profile(token.key)
+        CachedTokenAuthentication.cache.get(token.key).expires_at = timezone.now() - timedelta(seconds=1) # A stale copy
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_profile(token.key).status_code, status.HTTP_200_OK)
+
+    def test_logout_ends_only_this_session(self):
+        first, second = Token.objects.create(user=self.user), Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + first.key)
+        self.assertEqual(self.client.post(reverse('user-logout')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_profile(first.key).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.get_profile(second.key).status_code, status.HTTP_200_OK)
+
+    def test_rotate_replaces_the_token(self):
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        response = self.client.post(reverse('user-token-rotate'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['token'], token.key)
+        self.assertEqual(self.get_profile(token.key).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.get_profile(response.data['token']).status_code, status.HTTP_200_OK)
+
+    def test_profile_has_no_password_field(self):
+        response = self.get_profile(Token.objects.create(user=self.user).key)
+        self.assertNotIn('password', response.data)
+        self.assertEqual(response.data['id'], self.user.pk)
+
+    def test_purge_expired_tokens_command(self):
+        expired = timezone.now() - timedelta(seconds=1)
+        Token.objects.bulk_create([Token(key=f'expired{i}', user=self.user, expires_at=expired) for i in range(3)])
+        live = Token.objects.create(user=self.user)
+        out = StringIO()
+        call_command('purge_expired_tokens', batch_size=2, stdout=out)
+        self.assertIn('Purged 3 expired token(s).', out.getvalue())
+        self.assertEqual(list(Token.objects.values_list('key', flat=True)), [live.key])
+
+    def test_purge_expired_deletes_in_batches_without_delete_signals(self):
+        now = timezone.now()
+        Token.objects.bulk_create([Token(key=f'expired{i}', user=self.user, expires_at=now) for i in range(5)])
+        live = Token.objects.create(user=self.user, expires_at=now + timedelta(seconds=1))
+        deleted = []
+        receiver = lambda sender, instance, **kwargs: deleted.append(instance.key)
+        post_delete.connect(receiver, sender=Token)
+        try:
+            with self.assertNumQueries(7): # (SELECT a batch of keys + DELETE) x 3, then an empty SELECT
+                self.assertEqual(Token.objects.purge_expired(now=now, batch_size=2), 5)
+        finally:
+            post_delete.disconnect(receiver, sender=Token)
+        self.assertEqual(deleted, [])
+        self.assertEqual(list(Token.objects.values_list('key', flat=True)), [live.key])
+        self.assertEqual(Token.objects.purge_expired(now=now), 0)
+
+
+class AuthThrottlingTests(APITestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_registration_and_login_are_throttled_per_ip_address(self):
+        rates = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'auth': '2/min'}
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}):
+            for username in ('first', 'second'):
+                response = self.client.post(reverse('user-register'), {'username': username, 'password': 'testpassword123'}, format='json')
+                self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            response = self.client.post(reverse('user-login'), {'username': 'first', 'password': 'testpassword123'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertGreater(int(response['Retry-After']), 0)
+            response = self.client.post(reverse('user-login'), {'username': 'first', 'password': 'testpassword123'}, format='json', REMOTE_ADDR='10.0.0.2')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cached_token_user', password='testpassword123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('user-profile')
+
+    def test_repeat_requests_skip_the_token_query(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['username'], 'cached_token_user')
+
+    def test_logout_revokes_the_cached_token(self):
+        self.client.get(self.url)
+        self.assertEqual(self.client.post(reverse('user-logout')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN) # 403 as for any bad token
+
+    def test_deactivation_revokes_the_cached_token(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN) # 403 as for any bad token
+
+    def test_cached_user_is_copied_per_request(self):
+        authentication = CachedTokenAuthentication()
+        first, _ = authentication.authenticate_credentials(self.token.key)
+        first._perm_cache = {'contacts.delete_contact'}
+        second, token = authentication.authenticate_credentials(self.token.key)
+        self.assertIsNot(first, second)
+        self.assertFalse(hasattr(second, '_perm_cache'))
+        self.assertIs(token.user, second)
+
+
+class TokenCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def token(self, key, user_id=1):
+        return Token(key=key, user=User(pk=user_id, username=f'user{user_id}'))
+
+    def test_lru_is_bounded(self):
+        tokens = TokenCache(max_size=2, local_ttl=60)
+        for key in ('a', 'b'):
+            tokens.set(key, self.token(key))
+        tokens.get('a') # 'b' is now the least recently used
+        tokens.set('c', self.token('c'))
+        self.assertIsNone(tokens.get('b'))
+        self.assertEqual([tokens.get(key).key for key in ('a', 'c')], ['a', 'c'])
+
+    def test_local_entries_expire(self):
+        tokens = TokenCache(max_size=10, local_ttl=0)
+        tokens.set('a', self.token('a'))
+        self.assertIsNone(tokens.get('a'))
+
+    def test_shared_tier_is_seen_and_invalidated_across_workers(self):
+        worker_one = TokenCache(max_size=10, local_ttl=60, shared_alias='default')
+        worker_two = TokenCache(max_size=10, local_ttl=60, shared_alias='default')
+        worker_one.set('a', self.token('a', user_id=7))
+        self.assertEqual(worker_two.get('a').user_id, 7)
+        worker_one.invalidate(user_id=7) # Finds 'a' in its own LRU by user
+        self.assertIsNone(worker_one.get('a'))
+        worker_two.clear() # Its LRU copy lasts until the local TTL runs out
+        self.assertIsNone(worker_two.get('a'))
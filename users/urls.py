@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import UserRegistrationView, CustomObtainAuthTokenView, UserLogoutView, UserDetailView
+from .views import UserRegistrationView, CustomObtainAuthTokenView, UserLogoutView, UserDetailView, TokenRotateView
 
 urlpatterns = [
     path('register/', UserRegistrationView.as_view(), name='user-register'),
     path('login/', CustomObtainAuthTokenView.as_view(), name='user-login'), # Obtain token
     path('logout/', UserLogoutView.as_view(), name='user-logout'),
+    path('token/rotate/', TokenRotateView.as_view(), name='user-token-rotate'),
     path('profile/', UserDetailView.as_view(), name='user-profile'), # Get current user details
 ]
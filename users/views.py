@@ -1,10 +1,13 @@
 from django.contrib.auth.models import User
+from django.db import transaction
 from rest_framework import generics, permissions, status
-from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
+from .models import Token
+
 # Serializer for User Registration (can be expanded)
 from rest_framework import serializers
 
@@ -28,34 +31,56 @@ class UserSerializer(serializers.ModelSerializer):
         )
         return user
 
+
+class UserProfileSerializer(serializers.ModelSerializer):
+    """Read-only view of a user; unlike UserSerializer it has no password field at all."""
+
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'email', 'first_name', 'last_name', 'date_joined', 'last_login')
+        read_only_fields = fields
+
+
+def token_response(token):
+    return {'token': token.key, 'expires_at': token.expires_at}
+
+
 class UserRegistrationView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny] # Anyone can register
+    throttle_scope = 'auth' # Throttled per IP address
 
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
-        token, created = Token.objects.get_or_create(user=user)
+        token = Token.objects.create(user=user) # A new user has no token yet; no lookup needed
         headers = self.get_success_headers(serializer.data)
         return Response(
             {
                 'user': serializer.data, # Or a more limited user representation
-                'token': token.key
+                **token_response(token),
             },
             status=status.HTTP_201_CREATED,
             headers=headers
         )
 
 class CustomObtainAuthTokenView(ObtainAuthToken):
+    """
+    Log in with a username and password. Every login issues a fresh token (one per session), so
+    the only lookup is the user by username (a unique index) followed by the token INSERT.
+    """
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES # ObtainAuthToken turns throttling off
+    throttle_scope = 'auth' # Throttled per IP address
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
-        token, created = Token.objects.get_or_create(user=user)
+        token = Token.objects.create(user=user)
         return Response({
-            'token': token.key,
+            **token_response(token),
             'user_id': user.pk,
             'username': user.username,
             'email': user.email
@@ -65,17 +90,29 @@ class UserLogoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
-        try:
-            # Delete the token to invalidate it
-            request.user.auth_token.delete()
-            return Response({"detail": "Successfully logged out."}, status=status.HTTP_200_OK)
-        except (AttributeError, Token.DoesNotExist):
+        # Delete the token this request was made with; the user's other sessions stay logged in.
+        if not isinstance(request.auth, Token):
             return Response({"detail": "No active token found or already logged out."}, status=status.HTTP_400_BAD_REQUEST)
+        request.auth.delete()
+        return Response({"detail": "Successfully logged out."}, status=status.HTTP_200_OK)
+
+
+class TokenRotateView(APIView):
+    """Swap the token this request was made with for a new one, e.g. after it may have leaked."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.auth, Token):
+            return Response({"detail": "Only token-authenticated requests can rotate their token."}, status=status.HTTP_400_BAD_REQUEST)
+        request.auth.delete()
+        token = Token.objects.create(user=request.user)
+        return Response(token_response(token), status=status.HTTP_200_OK)
 
 
 # Optional: View to get current user details
 class UserDetailView(generics.RetrieveAPIView):
-    serializer_class = UserSerializer # Or a more detailed/controlled User serializer
+    serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0002_contact_contact_name_idx_and_more'),
+        ('volunteers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='volunteer',
+            index=models.Index(fields=['status'], name='volunteer_status_idx'),
+        ),
+    ]
@@ -27,6 +27,9 @@ class Volunteer(models.Model):
 
     class Meta:
         ordering = ['contact__first_name', 'contact__last_name']
+        indexes = [
+            models.Index(fields=['status'], name='volunteer_status_idx'),
+        ]
 
     def __str__(self):
         return f"Volunteer: {self.contact}"
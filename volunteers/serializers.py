@@ -2,8 +2,9 @@ from rest_framework import serializers
 from .models import Volunteer
 from contacts.models import Contact # Import Contact model
 from contacts.serializers import ContactSerializer # For potential future use (e.g. full nested display)
+from ngo_crm.serializers import DynamicFieldsMixin
 
-class VolunteerSerializer(serializers.ModelSerializer):
+class VolunteerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     # 'contact' is the OneToOneField primary key to the Contact model.
     # For writing, we expect the PK of an existing Contact.
     contact = serializers.PrimaryKeyRelatedField(
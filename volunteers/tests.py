@@ -2,7 +2,7 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth.models import User
-from rest_framework.authtoken.models import Token
+from users.models import Token
 from contacts.models import Contact, ContactType
 from .models import Volunteer, VolunteerStatus
 
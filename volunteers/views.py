@@ -10,6 +10,10 @@ class VolunteerViewSet(viewsets.ModelViewSet):
     queryset = Volunteer.objects.select_related('contact').all()
     serializer_class = VolunteerSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filterset_fields = {
+        'status': ['exact', 'in'],
+        'joined_date': ['gte', 'lte'],
+    }
 
     def create(self, request, *args, **kwargs):
         contact_payload = request.data.get('contact_data')